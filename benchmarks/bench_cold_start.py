@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# Cold-start check for the recommender engine, each run in a fresh interpreter.
+#   python benchmarks/bench_cold_start.py --runs 10 --budget-ms 50   # exit 1 if importing got heavy
+# import_ms: `import recommender` alone (must not pull in pandas/numpy/streamlit)
+# first_query_ms: first recommend() in the process (loads the catalog snapshot), then a second query for comparison
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+HEAVY = ("pandas", "numpy", "streamlit", "tkinter", "pyarrow")
+
+IMPORT_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import recommender
+t1 = time.perf_counter()
+print(json.dumps({"import_ms": (t1 - t0) * 1000, "heavy": [m for m in %r if m in sys.modules]}))
+""" % (HEAVY,)
+
+QUERY_PROBE = """
+import json, time
+t0 = time.perf_counter()
+from recommender import Recommender
+engine = Recommender(watch=False)
+songs, total = engine.recommend(%r, n=10)
+t1 = time.perf_counter()
+engine.recommend(%r, n=10)
+t2 = time.perf_counter()
+print(json.dumps({"first_query_ms": (t1 - t0) * 1000, "second_query_ms": (t2 - t1) * 1000, "total": total}))
+"""
+
+REFERENCE_PROBE = """
+import json, time
+t0 = time.perf_counter()
+import catalog
+print(json.dumps({"import_catalog_ms": (time.perf_counter() - t0) * 1000}))
+"""
+
+def probe(code, env):
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def main():
+    ap = argparse.ArgumentParser(description="Time importing the recommender and its first query in fresh processes.")
+    ap.add_argument("--runs", type=int, default=10)
+    ap.add_argument("--mood", default="love")
+    ap.add_argument("--budget-ms", type=float, help="fail if the median import time exceeds this")
+    args = ap.parse_args()
+    env = dict(os.environ, PYTHONPATH=ROOT, CATALOG_WATCH="0")
+    env.pop("MOOD_SERVICE_URL", None)
+    # one warm-up run builds the snapshot so every timed query run reads it, like a cron job would
+    probe(QUERY_PROBE % (args.mood, args.mood), env)
+    imports = [probe(IMPORT_PROBE, env) for _ in range(args.runs)]
+    queries = [probe(QUERY_PROBE % (args.mood, args.mood), env) for _ in range(args.runs)]
+    refs = [probe(REFERENCE_PROBE, env) for _ in range(args.runs)]
+    heavy = sorted({m for r in imports for m in r["heavy"]})
+    report = {
+        "runs": args.runs,
+        "import_recommender_ms": round(statistics.median(r["import_ms"] for r in imports), 2),
+        "import_catalog_ms": round(statistics.median(r["import_catalog_ms"] for r in refs), 2),
+        "first_query_ms": round(statistics.median(r["first_query_ms"] for r in queries), 2),
+        "second_query_ms": round(statistics.median(r["second_query_ms"] for r in queries), 2),
+        "heavy_modules_on_import": heavy,
+    }
+    print(json.dumps(report, indent=2))
+    failures = []
+    if heavy:
+        failures.append(f"importing recommender loaded {', '.join(heavy)}")
+    if args.budget_ms is not None and report["import_recommender_ms"] > args.budget_ms:
+        failures.append(f"import took {report['import_recommender_ms']}ms > budget {args.budget_ms}ms")
+    for f in failures:
+        print("FAIL:", f, file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# link_health against a local stand-in HTTP server: verdicts, pooling, per-host rate limits, the verdict cache,
+# and the ranking both catalog backends derive from it.
+#   python benchmarks/bench_link_health.py --links 2000 --latency-ms 20
+# The stand-in answers /ok* 200, /gone* 404, /nohead* 405 to HEAD (200 chunked to GET), /busy* 503, and
+# /oembed with 404 for video ids starting with "x" (or "A"-"F" in the catalog pass). "127.0.0.1" and
+# "localhost" are two hosts to the checker, so their pools and rate limits are separate.
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from collections import defaultdict
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+WORK = tempfile.mkdtemp(prefix="linkhealth-")
+# before the project imports: the verdict db and snapshot dir are read at import time
+os.environ.update(LINK_HEALTH_DB=os.path.join(WORK, "health.sqlite"), CATALOG_SNAPSHOT_DIR=os.path.join(WORK, "cache"),
+                  LINK_HEALTH_RERANK="0", CATALOG_WATCH="0")
+sys.path.insert(0, os.path.join(HERE, ".."))
+sys.path.insert(0, HERE)
+import link_health  # noqa: E402
+from synth import write_catalog_dir  # noqa: E402
+
+# ---------- Stand-in server ----------
+class StandIn:
+    def __init__(self, latency=0.0, dead_ids="x"):
+        self.latency = latency
+        self.dead_ids = dead_ids
+        self.connections = 0
+        self.starts = defaultdict(list)  # Host header -> request arrival times
+        self.loop = asyncio.new_event_loop()
+        ready = threading.Event()
+        threading.Thread(target=self._run, args=(ready,), daemon=True).start()
+        ready.wait()
+
+    def _run(self, ready):
+        asyncio.set_event_loop(self.loop)
+        server = self.loop.run_until_complete(asyncio.start_server(self._client, "127.0.0.1", 0))
+        self.port = server.sockets[0].getsockname()[1]
+        ready.set()
+        self.loop.run_forever()
+
+    async def _client(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                method, target, _ = line.decode().split()
+                headers = {}
+                while (h := await reader.readline()) not in (b"\r\n", b""):
+                    k, _, v = h.decode().partition(":")
+                    headers[k.strip().lower()] = v.strip()
+                self.starts[headers.get("host", "").split(":")[0]].append(time.monotonic())
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                code, chunked = self._route(method, target)
+                body = b'{"title": "stand-in"}' if method == "GET" and code == 200 else b""
+                if chunked:
+                    writer.write(f"HTTP/1.1 {code} X\r\nTransfer-Encoding: chunked\r\n\r\n".encode()
+                                 + f"{len(body):x}\r\n".encode() + body + b"\r\n0\r\n\r\n")
+                else:
+                    writer.write(f"HTTP/1.1 {code} X\r\nContent-Length: {len(body)}\r\n\r\n".encode()
+                                 + (body if method == "GET" else b""))
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    def _route(self, method, target):
+        path, _, query = target.partition("?")
+        if path == "/oembed":
+            video = urllib.parse.parse_qs(urllib.parse.urlsplit(urllib.parse.parse_qs(query)["url"][0]).query)["v"][0]
+            return (404 if video[:1] in self.dead_ids else 200), False
+        if path.startswith("/ok"):
+            return 200, False
+        if path.startswith("/gone"):
+            return 404, False
+        if path.startswith("/nohead"):
+            return (405, False) if method == "HEAD" else (200, True)
+        if path.startswith("/busy"):
+            return 503, False
+        return 404, False
+
+# ---------- Checks ----------
+def sample_links(port, count):
+    # (url, expected status), spread over two hosts
+    kinds = [("ok", "ok"), ("gone", "dead"), ("nohead", "ok"), ("busy", "error")]
+    out = []
+    for i in range(count):
+        host = "127.0.0.1" if i % 2 else "localhost"
+        kind, expected = kinds[i % len(kinds)]
+        out.append((f"http://{host}:{port}/{kind}/{i}", expected))
+    out += [("https://youtu.be/abcdefghijk?si=x", "ok"), ("https://youtu.be/xbcdefghijk", "dead"),
+            ("https://www.youtube.com/watch?v=abcdefghij2", "ok"),
+            ("https://www.youtube.com/results?search_query=kesariya", "skip"), ("not a link", "dead")]
+    return out
+
+def check_verdicts(server, count):
+    links = sample_links(server.port, count)
+    checker = link_health.LinkChecker(concurrency=16, rate=0, oembed_url=f"http://127.0.0.1:{server.port}/oembed")
+    results = asyncio.run(checker.check_all([u for u, _ in links]))
+    wrong = [(u, results[u], e) for u, e in links if results[u][0] != e]
+    assert not wrong, f"wrong verdicts: {wrong[:5]}"
+    print(f"verdicts: ok  ({checker.requests} requests over {checker.connections_opened} connections)")
+    # two hosts plus the oembed stand-in (same host as one of them), CONNECTIONS_PER_HOST each
+    assert checker.connections_opened <= 2 * link_health.CONNECTIONS_PER_HOST, "connections not reused"
+
+def check_rate(server, rate, per_host=40):
+    server.starts.clear()
+    urls = [f"http://{h}:{server.port}/ok/{i}" for i in range(per_host) for h in ("127.0.0.1", "localhost")]
+    t0 = time.perf_counter()
+    asyncio.run(link_health.LinkChecker(concurrency=64, rate=rate).check_all(urls))
+    seconds = time.perf_counter() - t0
+    for host, starts in server.starts.items():
+        gaps = [b - a for a, b in zip(starts, starts[1:])]
+        # arrival jitter on a loaded box; the schedule itself is exact
+        assert min(gaps) > 0.7 / rate, f"{host}: requests {min(gaps) * 1000:.1f}ms apart at {rate}/s"
+    floor = (per_host - 1) / rate
+    print(f"rate limit: ok  ({rate:g}/s per host, {per_host} links on each of 2 hosts in {seconds:.2f}s, "
+          f"limit allows no less than {floor:.2f}s)")
+
+def check_cache(server):
+    db = os.path.join(WORK, "cache-check.sqlite")
+    cache = link_health.HealthCache(db)
+    urls = [f"http://127.0.0.1:{server.port}/ok/{i}" for i in range(50)] + [f"http://127.0.0.1:{server.port}/busy/1"]
+    checker = link_health.LinkChecker(rate=0)
+    first = link_health.check_links(urls, cache, checker)
+    second = link_health.check_links(urls, cache, link_health.LinkChecker(rate=0))
+    assert len(first) == 51 and len(second) == 0, (len(first), len(second))
+    # errors expire first; an hour later only the 503 is due again, a week later everything is
+    assert cache.due(urls, time.time() + 2 * 3600) == urls[-1:]
+    assert len(cache.due(urls, time.time() + 8 * 86400)) == 51
+    print("verdict cache: ok  (second run checked 0 of 51; expiry by status)")
+
+def throughput(server, count):
+    urls = [f"http://{'127.0.0.1' if i % 2 else 'localhost'}:{server.port}/ok/{i}" for i in range(count)]
+    for concurrency in (1, 8, 32):
+        checker = link_health.LinkChecker(concurrency=concurrency, rate=0)
+        t0 = time.perf_counter()
+        asyncio.run(checker.check_all(urls))
+        seconds = time.perf_counter() - t0
+        print(f"throughput: concurrency={concurrency:>2}  {count / seconds:8.0f} links/s  "
+              f"({checker.connections_opened} connections for {checker.requests} requests)")
+
+def check_ranking(server, rows):
+    # the catalog's own links through the checker, then the order both backends serve
+    import catalog
+    from recommender import Recommender, ResultCache
+    sources = write_catalog_dir(os.path.join(WORK, "csv"), rows)
+    memory = Recommender(sources=sources, watch=False, cache=ResultCache(ttl=0), store="memory")
+    sqlite = Recommender(sources=sources, watch=False, cache=ResultCache(ttl=0), store="sqlite")
+    before = memory.recommend("love", n=None)[0]
+    sqlite.recommend("love", n=1)
+    server.dead_ids = "ABCDEF"
+    checker = link_health.LinkChecker(concurrency=32, rate=0, oembed_url=f"http://127.0.0.1:{server.port}/oembed")
+    t0 = time.perf_counter()
+    results = link_health.check_links(catalog.load_catalog(sources)["Link"], checker=checker)
+    seconds = time.perf_counter() - t0
+    counts = {s: sum(1 for v in results.values() if v[0] == s) for s in ("ok", "dead", "skip")}
+    # no restart: both engines pick the verdicts up on their next query
+    after = memory.recommend("love", n=None)[0]
+    assert sorted(map(tuple, before.values)) == sorted(map(tuple, after.values)), "re-rank changed the rows"
+    tiers = link_health.link_ranks(after["Link"])
+    for ds in after["Dataset"].unique():
+        t = tiers[(after["Dataset"] == ds).to_numpy()]
+        assert (t[1:] >= t[:-1]).all(), f"{ds}: verified links not first"
+    for mood in [""] + memory.moods():
+        for sources_ in (None, ["Hindi"], ["Telugu"]):
+            m, total = memory.recommend(mood, sources_, n=None)
+            for offset in (0, 7, total // 2):
+                a, _ = memory.recommend(mood, sources_, n=25, offset=offset)
+                b, _ = sqlite.recommend(mood, sources_, n=25, offset=offset)
+                assert a.equals(b), f"backends differ: {mood!r} {sources_} offset {offset}"
+    # what a new batch of verdicts costs each backend: every link's rank re-read and applied
+    link_health.HealthCache().put_many([(u, "dead", 404, time.time()) for u in list(results)[:100]])
+    t0 = time.perf_counter()
+    memory.recommend("love", n=1)
+    rerank_memory = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    sqlite.recommend("love", n=1)
+    rerank_sqlite = time.perf_counter() - t0
+    print(f"ranking: ok  ({len(results)} catalog links checked in {seconds:.1f}s: {counts}; memory and sqlite agree; "
+          f"re-rank after new verdicts at {rows} rows: memory {rerank_memory:.2f}s, sqlite {rerank_sqlite:.2f}s)")
+
+def main():
+    ap = argparse.ArgumentParser(description="Check link_health against a local stand-in server.")
+    ap.add_argument("--links", type=int, default=2000)
+    ap.add_argument("--latency-ms", type=float, default=20)
+    ap.add_argument("--rows", type=int, default=20000, help="synthetic catalog size for the ranking check")
+    args = ap.parse_args()
+    server = StandIn()
+    check_verdicts(server, 400)
+    check_rate(server, 20)
+    check_cache(server)
+    server.latency = args.latency_ms / 1000
+    throughput(server, args.links)
+    server.latency = 0
+    check_ranking(server, args.rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# Compound mood queries (MoodIndex position arrays, bitsets for exclusions) vs the DataFrame filters they replace.
+#   python benchmarks/bench_mood_query.py --rows 100000 1000000
+# exactness: for a set of compound queries, both backends (MoodIndex, SqliteStore) return exactly the rows a
+# pandas filter over canonical tags selects, in MoodIndex order (dataset priority, then catalog order).
+# timing: median per query of the index selection (positions only) and of the pandas filter, plus the
+# memory of the bitsets the exclusions built.
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+WORK = tempfile.mkdtemp(prefix="moodquery-")
+# before the project imports: a private snapshot dir, and no link verdicts reordering the reference
+os.environ.update(CATALOG_SNAPSHOT_DIR=os.path.join(WORK, "cache"), LINK_HEALTH_DB=os.path.join(WORK, "none.sqlite"))
+sys.path.insert(0, os.path.join(HERE, ".."))
+sys.path.insert(0, HERE)
+import catalog_store  # noqa: E402
+from catalog import build_catalog  # noqa: E402
+from mood_index import MoodIndex  # noqa: E402
+from mood_taxonomy import canonical_tags, mood_query  # noqa: E402
+from synth import write_catalog_dir  # noqa: E402
+
+QUERIES = [
+    mood_query(["happy", "energetic"], ["sad"], ["Telugu"]),
+    mood_query(["love"]),
+    mood_query(["romantic", "party", "sad"], [], ["Hindi", "Telugu"]),
+    mood_query([], ["romantic", "happy"]),
+    mood_query(["sad"], [], ["Hindi"]),
+    mood_query(),
+]
+
+def reference(combined, priority, query):
+    # the DataFrame way: canonical tags per row, isin filters, then sort into priority order
+    tags = combined["mood_norm"].map(lambda m: canonical_tags(m) if isinstance(m, str) else set())
+    keep = tags.map(lambda t: bool(t & set(query.moods))) if query.moods else pd.Series(True, index=combined.index)
+    if query.datasets is not None:
+        keep &= combined["Dataset"].isin(query.datasets)
+    if query.exclude:
+        keep &= ~tags.map(lambda t: bool(t & set(query.exclude)))
+    rank = combined["Dataset"].map({d: i for i, d in enumerate(priority)})
+    rows = np.flatnonzero(keep.to_numpy())
+    return rows[np.lexsort((rows, rank.to_numpy()[rows]))]
+
+def filter_time(combined, query, repeat=3):
+    # what a per-query DataFrame filter costs once the canonical mood column exists
+    canon = combined["mood_norm"].map(lambda m: min(canonical_tags(m)) if isinstance(m, str) and m.strip() else "")
+    out = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        keep = canon.isin(query.moods) if query.moods else pd.Series(True, index=combined.index)
+        if query.datasets is not None:
+            keep &= combined["Dataset"].isin(query.datasets)
+        if query.exclude:
+            keep &= ~canon.isin(query.exclude)
+        combined.index[keep.to_numpy()]
+        out.append(time.perf_counter() - t0)
+    return statistics.median(out)
+
+def check_multi_tag():
+    index = MoodIndex(pd.DataFrame({"mood_norm": ["happy/energetic", "love", None, "sad, emotional"],
+                                    "Dataset": ["Telugu", "Telugu", "Hindi", "Hindi"]}))
+    got = lambda q: index.query_positions(mood_query(*q)).tolist()
+    assert got((["energetic"],)) == [0] and got((["romantic"],)) == [1], "multi-tag rows"
+    assert got(([], ["sad"])) == [0, 1, 2] and got(([], [], ["Hindi"])) == [2, 3], "exclude / dataset"
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, nargs="+", default=[100_000])
+    args = ap.parse_args()
+    check_multi_tag()
+    sources = write_catalog_dir(os.path.join(WORK, "small"), 5000)
+    combined, _ = build_catalog(sources)
+    index = MoodIndex(combined, [n for _, n in sources])
+    store, _ = catalog_store.load_store(sources)
+    for q in QUERIES:
+        ref = reference(combined, index.priority, q)
+        assert np.array_equal(index.query_positions(q), ref), f"MoodIndex differs: {q}"
+        a, total = index.recommend_query(q)
+        b, count = store.recommend_query(q)
+        assert total == count == len(ref) and a.equals(b), f"SqliteStore differs: {q}"
+        a, _ = index.recommend_query(q, n=25, offset=10)
+        b, _ = store.recommend_query(q, n=25, offset=10)
+        assert a.equals(b), f"pages differ: {q}"
+    print("exactness: ok")
+
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as d:
+            sources = write_catalog_dir(d, rows)
+            combined, _ = build_catalog(sources)
+        t0 = time.perf_counter()
+        index = MoodIndex(combined, [n for _, n in sources])
+        build = time.perf_counter() - t0
+        for q in QUERIES[:4]:
+            times = []
+            for _ in range(7):
+                t0 = time.perf_counter()
+                index.query_positions(q)
+                times.append(time.perf_counter() - t0)
+            print(f"rows={len(combined):>9,d}  {str(q):<90}  index={statistics.median(times) * 1000:7.2f}ms  "
+                  f"dataframe={filter_time(combined, q) * 1000:7.2f}ms")
+        bits = index.mood_bits()
+        print(f"rows={len(combined):>9,d}  MoodIndex build {build:.2f}s, bitsets {bits.nbytes() / 1e6:.1f}MB for "
+              f"{len(bits.bits)} of {len(index.canonical_moods())} moods")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# Equivalence check and timing for prepare_dataset vs prepare_dataset_vectorized.
+#   python benchmarks/bench_prepare.py --rows 1000000
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from catalog import default_sources, prepare_dataset, prepare_dataset_vectorized, read_csv_try  # noqa: E402
+
+# ---------- Synthetic frames ----------
+LINK_SAMPLES = [
+    "https://youtu.be/tflQ33g6I8I?si=ofBAPYve-PBURrNK", "HTTP://example.com/x", "tflQ33g6I8I",
+    "www.youtube.com/watch?v=abc", "m.youtube.com/watch?v=abc", "youtu.be/abc", "example.org",
+    "not a link", "  spaced.io  ", "", np.nan, "nan", "bad id!", "a.b c",
+    "https://www.youtube.com/watch?feature=share&v=YO7rue3nKX0#t=5", "HTTPS://M.YOUTUBE.COM/watch?v=EmPXDiPdaZYx",
+]
+TITLE_SAMPLES = ["Kesariya", "Brahmāstra", "Tum Hi Ho", "", np.nan, "Rock & Roll", "50% off", "  pad  ", "Ādi+Shakti", "0"]
+
+def telugu_like(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "S.No": np.arange(1, rows + 1),
+        "Song Name": rng.choice(np.array(TITLE_SAMPLES, dtype=object), rows),
+        "Artist": rng.choice(np.array(["Sid Sriram", "", np.nan, "S.p balasubramanyam,k.s chitra"], dtype=object), rows),
+        "mood": rng.choice(np.array(["love", " Sad", "HAPPY ", np.nan], dtype=object), rows),
+        "Movie": rng.choice(np.array(["Ala Vaikuntapuramlo", "Jai Bhim", np.nan], dtype=object), rows),
+        "Youtube link": rng.choice(np.array(LINK_SAMPLES, dtype=object), rows),
+        # later link columns only matter where the first one is unusable
+        "Youtube link.1": rng.choice(np.array(LINK_SAMPLES + [np.nan] * 6, dtype=object), rows),
+        "Youtube link.2": rng.choice(np.array(["https://youtube.com/shorts/tflQ33g6I8I", np.nan], dtype=object), rows),
+        "Youtube link.3": np.nan,
+        "Youtube link.4": rng.choice(np.array(["tflQ33g6I8I", np.nan], dtype=object), rows),
+    })
+
+def hindi_like(rows, seed=1):
+    rng = np.random.default_rng(seed)
+    titles = np.array([f"{t} {i}" if isinstance(t, str) and t else t for i, t in enumerate(rng.choice(np.array(TITLE_SAMPLES, dtype=object), rows))], dtype=object)
+    return pd.DataFrame({
+        "Song Name": titles,
+        "Movie": rng.choice(np.array(["Brahmāstra", "Aashiqui 2", "", np.nan], dtype=object), rows),
+        "Mood": rng.choice(np.array(["Romantic", "Sad", "Emotional"], dtype=object), rows),
+    })
+
+def as_csv_frame(df):
+    # round-trip through CSV so dtypes match what read_csv_try produces
+    from io import StringIO
+    buf = StringIO()
+    df.to_csv(buf, index=False)
+    buf.seek(0)
+    return pd.read_csv(buf)
+
+# ---------- Checks ----------
+def check_equivalent(df, name):
+    expected = prepare_dataset(df, name)
+    got = prepare_dataset_vectorized(df, name)
+    pd.testing.assert_frame_equal(expected, got)
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - t0
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    args = ap.parse_args()
+
+    root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+    for path, name in default_sources(root):
+        if os.path.exists(path):
+            check_equivalent(read_csv_try(path), name)
+    for seed in range(3):
+        check_equivalent(as_csv_frame(telugu_like(5000, seed)), "Telugu")
+        check_equivalent(as_csv_frame(hindi_like(5000, seed)), "Hindi")
+        check_equivalent(telugu_like(2000, seed), "Telugu")
+        check_equivalent(hindi_like(2000, seed), "Hindi")
+    print("equivalence: ok")
+
+    for label, df in (("telugu-style", as_csv_frame(telugu_like(args.rows))), ("hindi-style", as_csv_frame(hindi_like(args.rows)))):
+        ref = timed(prepare_dataset, df, "X")
+        vec = timed(prepare_dataset_vectorized, df, "X")
+        print(f"{label:13s} rows={args.rows:>9,d}  prepare_dataset={ref:7.2f}s  vectorized={vec:6.2f}s  speedup={ref / vec:5.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# In-memory catalog vs the SQLite store (catalog_store): load time, query latency and resident memory.
+#   python benchmarks/bench_store.py --rows 100000 1000000
+# Each backend runs in a fresh interpreter over the same synthetic catalog:
+#   build_s    CSVs -> ready to query (snapshot / store file written)
+#   open_s     a later process start: snapshot or store file -> ready to query
+#   rss_mb     resident memory after open (process baseline with pandas imported is reported separately)
+#   query_ms   median recommend(mood, n=100) over every mood, paged from the start and from the middle
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+sys.path.insert(0, HERE)
+from synth import write_catalog_dir  # noqa: E402
+
+PROBE = """
+import json, statistics, sys, time
+sys.path.insert(0, %(root)r)
+import pandas, numpy
+import metrics
+from recommender import Recommender, ResultCache
+sources = %(sources)r
+
+def rss():
+    return metrics._rss() / 1e6
+
+base = rss()
+t0 = time.perf_counter()
+engine = Recommender(sources=sources, watch=False, cache=ResultCache(ttl=0), store=%(store)r)
+moods = engine.moods()
+open_s = time.perf_counter() - t0
+after = rss()
+first, middle = [], []
+for mood in moods:
+    _, total = engine.recommend(mood, n=0)
+    t = time.perf_counter()
+    engine.recommend(mood, n=100)
+    first.append(time.perf_counter() - t)
+    t = time.perf_counter()
+    engine.recommend(mood, n=100, offset=total // 2)
+    middle.append(time.perf_counter() - t)
+print(json.dumps({"open_s": open_s, "base_mb": base, "rss_mb": after, "songs": engine.song_count(),
+                  "query_ms": statistics.median(first) * 1000, "query_mid_ms": statistics.median(middle) * 1000}))
+"""
+
+def probe(store, sources, snapshot_dir):
+    env = dict(os.environ, CATALOG_SNAPSHOT_DIR=snapshot_dir, CATALOG_WATCH="0")
+    code = PROBE % {"root": ROOT, "sources": sources, "store": store}
+    out = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def main():
+    ap = argparse.ArgumentParser(description="Compare the in-memory catalog with the SQLite store.")
+    ap.add_argument("--rows", type=int, nargs="+", default=[100_000])
+    args = ap.parse_args()
+    report = []
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as d:
+            sources = write_catalog_dir(os.path.join(d, "csv"), rows)
+            for store in ("memory", "sqlite"):
+                snapshots = os.path.join(d, f"cache-{store}")
+                cold = probe(store, sources, snapshots)   # builds the snapshot / store file
+                warm = probe(store, sources, snapshots)   # what every later start pays
+                size = sum(os.path.getsize(os.path.join(snapshots, f)) for f in os.listdir(snapshots))
+                report.append({"rows": rows, "store": store, "songs": warm["songs"], "build_s": round(cold["open_s"], 2),
+                               "open_s": round(warm["open_s"], 3), "base_mb": round(warm["base_mb"]),
+                               "rss_mb": round(warm["rss_mb"]), "disk_mb": round(size / 1e6, 1),
+                               "query_ms": round(warm["query_ms"], 3), "query_mid_ms": round(warm["query_mid_ms"], 3)})
+                print(json.dumps(report[-1]), flush=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# Time-to-first-rows for a large result: the old fill_table (insert every row) vs VirtualTable.
+# Needs a display (run under xvfb-run on headless machines).
+#   python benchmarks/bench_tk_table.py --rows 100000
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tkinter as tk
+from tkinter import ttk
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+sys.path.insert(0, HERE)
+import catalog  # noqa: E402
+from synth import write_telugu  # noqa: E402
+from virtual_table import BackgroundQuery, VirtualTable, table_rows  # noqa: E402
+
+COLS = ("#","Title","Artist","Movie","Mood","Dataset","Link")
+
+def legacy_fill(tree, df):
+    # mood_based_song_recommendation.fill_table before virtualization
+    for r in tree.get_children():
+        tree.delete(r)
+    for row in table_rows(df, 0, len(df)):
+        tree.insert("", "end", values=row)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=100_000)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "telugu.csv")
+        write_telugu(path, args.rows)
+        result = catalog.prepare_dataset_vectorized(catalog.read_csv_try(path), "Telugu")
+
+    root = tk.Tk()
+    root.geometry("1000x650")
+    report = {"rows": len(result)}
+
+    old = ttk.Treeview(root, columns=COLS, show="headings")
+    old.pack(fill="both", expand=True)
+    root.update()
+    t0 = time.perf_counter()
+    legacy_fill(old, result)
+    root.update_idletasks()
+    report["legacy_fill_table_s"] = round(time.perf_counter() - t0, 4)
+    old.destroy()
+
+    table = VirtualTable(root, COLS)
+    table.frame.pack(fill="both", expand=True)
+    root.update()
+    t0 = time.perf_counter()
+    table.set_rows(len(result), lambda a, b: table_rows(result, a, b))
+    root.update_idletasks()
+    report["virtual_first_rows_s"] = round(time.perf_counter() - t0, 4)
+    report["virtual_items_materialized"] = len(table.tree.get_children())
+
+    t0 = time.perf_counter()
+    for _ in range(200):
+        table.scroll(1, "pages")
+    root.update_idletasks()
+    report["virtual_scroll_page_ms"] = round((time.perf_counter() - t0) / 200 * 1000, 3)
+
+    # end-to-end: query on a worker thread, first rows painted on the Tk thread
+    index = catalog.MoodIndex(result, ["Telugu"])
+    worker = BackgroundQuery(root)
+    done = {}
+    t0 = time.perf_counter()
+
+    def on_done(res, error):
+        final, _ = res
+        table.set_rows(len(final), lambda a, b: table_rows(final, a, b))
+        root.update_idletasks()
+        done["t"] = time.perf_counter() - t0
+        root.quit()
+    worker.submit(lambda: index.recommend(""), on_done)
+    root.mainloop()
+    report["worker_query_to_first_rows_s"] = round(done["t"], 4)
+    root.destroy()
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# Load test for service.py: keep-alive connections hammering /recommend (and optionally the batch endpoint).
+#   python service.py --port 8765 &
+#   python benchmarks/loadtest.py --url http://127.0.0.1:8765 --concurrency 64 --duration 10
+#   python benchmarks/loadtest.py --spawn      # start a local instance on a free port first
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.parse
+import urllib.request
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+async def _request(reader, writer, host, method, path, body=b""):
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Length: {len(body)}\r\n\r\n".encode("latin1") + body
+    )
+    await writer.drain()
+    status_line = await reader.readline()
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        k, _, v = line.decode("latin1").partition(":")
+        if k.strip().lower() == "content-length":
+            length = int(v)
+    await reader.readexactly(length)
+    return int(status_line.split()[1])
+
+async def _worker(url, moods, deadline, batch_ratio, n, latencies, errors):
+    parts = urllib.parse.urlsplit(url)
+    reader, writer = await asyncio.open_connection(parts.hostname, parts.port)
+    rng = random.Random()
+    try:
+        while time.perf_counter() < deadline:
+            if rng.random() < batch_ratio:
+                body = json.dumps({"moods": rng.sample(moods, min(5, len(moods))), "n": n}).encode("utf-8")
+                method, path = "POST", "/recommend/batch"
+            else:
+                body = b""
+                method, path = "GET", "/recommend?" + urllib.parse.urlencode({"mood": rng.choice(moods), "n": n})
+            t0 = time.perf_counter()
+            status = await _request(reader, writer, parts.netloc, method, path, body)
+            latencies.append(time.perf_counter() - t0)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+def percentile(sorted_vals, p):
+    if not sorted_vals:
+        return None
+    k = min(len(sorted_vals) - 1, max(0, int(round(p / 100 * len(sorted_vals))) - 1))
+    return sorted_vals[k]
+
+async def run(url, concurrency, duration, batch_ratio, n):
+    with urllib.request.urlopen(url.rstrip("/") + "/moods") as resp:
+        moods = json.loads(resp.read())["moods"] or [""]
+    latencies, errors = [], []
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*[_worker(url, moods, deadline, batch_ratio, n, latencies, errors) for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    lat = sorted(latencies)
+    return {
+        "url": url, "concurrency": concurrency, "duration_s": round(elapsed, 3), "requests": len(lat),
+        "errors": len(errors), "requests_per_sec": round(len(lat) / elapsed, 1),
+        "p50_ms": round(percentile(lat, 50) * 1000, 3) if lat else None,
+        "p99_ms": round(percentile(lat, 99) * 1000, 3) if lat else None,
+        "max_ms": round(lat[-1] * 1000, 3) if lat else None,
+    }
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _spawn():
+    port = _free_port()
+    proc = subprocess.Popen([sys.executable, os.path.join(HERE, "..", "service.py"), "--port", str(port)],
+                            cwd=os.path.join(HERE, ".."), stdout=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(200):
+        try:
+            urllib.request.urlopen(url + "/moods", timeout=1).close()
+            return proc, url
+        except OSError:
+            time.sleep(0.05)
+    proc.kill()
+    raise RuntimeError("service did not come up")
+
+def main():
+    ap = argparse.ArgumentParser(description="Measure requests/sec and latency percentiles of service.py.")
+    ap.add_argument("--url", default="http://127.0.0.1:8765")
+    ap.add_argument("--spawn", action="store_true", help="start service.py on a free port for the run")
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--duration", type=float, default=10.0)
+    ap.add_argument("--batch-ratio", type=float, default=0.1, help="share of requests sent to /recommend/batch")
+    ap.add_argument("-n", type=int, default=10, help="songs per recommendation")
+    args = ap.parse_args()
+    proc = None
+    url = args.url
+    if args.spawn:
+        proc, url = _spawn()
+    try:
+        report = asyncio.run(run(url, args.concurrency, args.duration, args.batch_ratio, args.n))
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait()
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
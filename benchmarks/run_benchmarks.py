@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# Stage benchmarks over synthetic catalogs, reported as JSON.
+#   python benchmarks/run_benchmarks.py --sizes 1000,10000,100000 --out bench.json
+#   python benchmarks/run_benchmarks.py --save-baseline benchmarks/baseline.json
+#   python benchmarks/run_benchmarks.py --baseline benchmarks/baseline.json --threshold 0.25   # exit 1 on regression
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+sys.path.insert(0, HERE)
+import catalog  # noqa: E402
+from mood_index import MoodIndex  # noqa: E402
+from mood_taxonomy import mood_query  # noqa: E402
+from recommender import ResultCache  # noqa: E402
+from synth import write_catalog_dir  # noqa: E402
+from virtual_table import table_rows  # noqa: E402
+
+# ---------- Render payloads (same work as the two front ends) ----------
+def fill_table_rows(df):
+    # mood_based_song_recommendation.fill_table minus the Treeview calls (every row, as before virtualization)
+    return table_rows(df, 0, len(df))
+
+def dataframe_payload(final, n=100):
+    # app.py display_df + what st.dataframe serializes (arrow table) + the markdown link loop
+    display_df = final.head(n).copy()
+    display_df.index = range(1, len(display_df)+1)
+    table = display_df[["Title","Movie","Mood","Dataset","Link"]]
+    try:
+        import pyarrow as pa
+        payload = pa.Table.from_pandas(table)
+    except ImportError:
+        payload = table.to_dict("records")
+    lines = [f"{i}. {row['Title']}** — [{row['Link']}]({row['Link']})" for i, row in display_df.iterrows()]
+    return payload, lines
+
+# ---------- Measurement ----------
+def measure(fn, with_memory):
+    gc.collect()
+    t0 = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - t0
+    peak = None
+    if with_memory:
+        del result
+        gc.collect()
+        tracemalloc.start()
+        result = fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result, seconds, peak
+
+def record(results, rows, stage, seconds, peak, work, unit):
+    results.append({
+        "rows": rows, "stage": stage, "seconds": round(seconds, 6),
+        "throughput": round(work / seconds, 2) if seconds > 0 else None, "unit": unit,
+        "peak_bytes": peak,
+    })
+
+def bench_size(rows, workdir, with_memory, render_cap):
+    results = []
+    sources = write_catalog_dir(os.path.join(workdir, str(rows)), rows)
+    raws = {}
+    for path, name in sources:
+        raw, s, peak = measure(lambda: catalog.read_csv_try(path), with_memory)
+        raws[name] = raw
+        record(results, rows, f"read_csv_try[{name}]", s, peak, len(raw), "rows/s")
+    prepared = {}
+    for name, raw in raws.items():
+        prep, s, peak = measure(lambda: catalog.prepare_dataset_vectorized(raw, name), with_memory)
+        prepared[name] = prep
+        record(results, rows, f"prepare_dataset[{name}]", s, peak, len(raw), "rows/s")
+    del raws
+    parts = [prepared[name] for _, name in sources]
+    def combine_dedupe():
+        # build_catalog's concat + fingerprint dedupe
+        combined = pd.concat(parts, ignore_index=True)
+        fps = catalog.fingerprints(combined)
+        keep = catalog.canonical_rows(fps, combined["Dataset"].map({name: i for i, (_, name) in enumerate(sources)}))
+        return combined.take(keep).reset_index(drop=True)
+    combined, s, peak = measure(combine_dedupe, with_memory)
+    record(results, rows, "combine_dedupe", s, peak, sum(len(p) for p in parts), "rows/s")
+    del prepared, parts
+    index, s, peak = measure(lambda: MoodIndex(combined, [name for _, name in sources]), with_memory)
+    record(results, rows, "mood_index_build", s, peak, len(combined), "rows/s")
+    moods = index.moods()
+    def run_queries():
+        return [index.query(m, ["All"]) for m in moods]
+    finals, s, peak = measure(run_queries, with_memory)
+    record(results, rows, "mood_query", s, peak, len(moods), "queries/s")
+    cache = ResultCache()
+    def run_cached_queries():
+        # Recommender.recommend's path on a warm shared cache (app.py asks for 100 rows)
+        out = []
+        for m in moods:
+            key = (None, 1, m, None, 100, 0)
+            hit = cache.get(key)
+            if hit is None:
+                hit = index.recommend(m, None, 100)
+                cache.put(key, hit, len(hit[0]))
+            out.append(hit)
+        return out
+    run_cached_queries()
+    _, s, peak = measure(run_cached_queries, with_memory)
+    record(results, rows, "mood_query_cached", s, peak, len(moods), "queries/s")
+    # what both front ends send (app.py, mood_based_song_recommendation.py): compound queries, total plus the
+    # first page. "Everything but" queries are the one kind that passes over the whole catalog, so they are timed apart
+    canon = index.canonical_moods()
+    queries = [mood_query([c]) for c in canon] + [mood_query([a, b], [c]) for a, b, c in zip(canon, canon[1:], canon[2:])]
+    _, s, peak = measure(lambda: [index.recommend_query(q, n=100) for q in queries], with_memory)
+    record(results, rows, "recommend_query", s, peak, len(queries), "queries/s")
+    excludes = [mood_query([], [c]) for c in canon[:5]]
+    _, s, peak = measure(lambda: [index.recommend_query(q, n=100) for q in excludes], with_memory)
+    record(results, rows, "recommend_query_exclude", s, peak, len(excludes), "queries/s")
+    biggest = max(finals, key=len) if finals else combined.head(0)
+    del finals
+    shown = biggest.head(render_cap)
+    _, s, peak = measure(lambda: fill_table_rows(shown), with_memory)
+    record(results, rows, "render_fill_table", s, peak, len(shown), "rows/s")
+    _, s, peak = measure(lambda: dataframe_payload(biggest), with_memory)
+    record(results, rows, "render_st_dataframe", s, peak, min(100, len(biggest)), "rows/s")
+    return results
+
+# ---------- Baseline comparison ----------
+def compare(results, baseline, threshold):
+    # a stage regresses when throughput drops, or peak memory grows, by more than threshold
+    old = {(r["rows"], r["stage"]): r for r in baseline.get("results", [])}
+    failures = []
+    for r in results:
+        b = old.get((r["rows"], r["stage"]))
+        if not b:
+            continue
+        if b.get("throughput") and r.get("throughput") is not None and r["throughput"] < b["throughput"] * (1 - threshold):
+            failures.append(f"{r['stage']} @ {r['rows']} rows: throughput {r['throughput']:.0f} < baseline {b['throughput']:.0f} {r['unit']}")
+        if b.get("peak_bytes") and r.get("peak_bytes") and r["peak_bytes"] > b["peak_bytes"] * (1 + threshold):
+            failures.append(f"{r['stage']} @ {r['rows']} rows: peak {r['peak_bytes']} > baseline {b['peak_bytes']} bytes")
+    return failures
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark catalog stages on synthetic data.")
+    ap.add_argument("--sizes", default="1000,10000,100000", help="comma-separated row counts (up to 10000000)")
+    ap.add_argument("--out", help="write the JSON report here (default: stdout)")
+    ap.add_argument("--baseline", help="compare against this stored report and exit 1 on regression")
+    ap.add_argument("--save-baseline", help="also write the report here as the new baseline")
+    ap.add_argument("--threshold", type=float, default=0.25, help="allowed relative regression (default 0.25)")
+    ap.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass (faster at 10M rows)")
+    ap.add_argument("--render-cap", type=int, default=100_000, help="max rows pushed through fill_table")
+    ap.add_argument("--workdir", help="where to write synthetic CSVs (default: a temp dir, removed afterwards)")
+    args = ap.parse_args()
+
+    sizes = [int(float(s)) for s in args.sizes.split(",") if s.strip()]
+    workdir = args.workdir or tempfile.mkdtemp(prefix="moodbench-")
+    try:
+        results = []
+        for rows in sizes:
+            results.extend(bench_size(rows, workdir, not args.no_memory, args.render_cap))
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {"python": platform.python_version(), "pandas": pd.__version__, "machine": platform.machine(),
+                 "cpus": os.cpu_count(), "time": time.strftime("%Y-%m-%dT%H:%M:%S")},
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            failures = compare(results, json.load(f), args.threshold)
+        for line in failures:
+            print("REGRESSION: " + line, file=sys.stderr)
+        if failures:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
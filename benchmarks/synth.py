@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# Synthetic catalogs shaped like the bundled CSVs.
+#   python benchmarks/synth.py --rows 1000000 --out /tmp/catalogs
+# telugu: S.No,Song Name,Artist,mood,Movie + eight "Youtube link" columns (first one mostly filled), utf-8
+# hindi:  Song Name,Movie,Mood, no link column, latin1 (exercises read_csv_try's fallback)
+import argparse
+import csv
+import os
+
+import numpy as np
+
+UTF8_WORDS = ["Samajavaragamana", "Butta", "Bomma", "Kesariya", "Brahmāstra", "Chirugaali", "Ādi", "Shakti",
+              "Neetho", "Cheppana", "Tum", "Hi", "Ho", "Galliyan", "Naatu", "Srivalli", "Oo", "Antava"]
+LATIN1_WORDS = ["Kesariya", "Café", "Señorita", "Tum", "Hi", "Ho", "Galliyan", "Déjà", "Vu", "Apna", "Bana", "Le",
+                "Raataan", "Lambiyan", "Ilahi", "Zindagi", "Naïve", "Kal"]
+TELUGU_MOODS = ["love", "sad", "happy", "motivational", "party", "devotional", "melody", "energetic", " Love ", "SAD"]
+HINDI_MOODS = ["Romantic", "Sad", "Emotional", "Happy", "Party", "Soothing", "Patriotic", "Energetic"]
+ARTISTS = ["Sid Sriram", "Armaan Malik", "S.p balasubramanyam,k.s chitra", "Anurag Kulkarni", ""]
+MOVIES = ["Ala Vaikuntapuramlo", "Jai Bhim", "Aathadu", "Pushpa", "Aashiqui 2", "Ek Villain", "Bhediya", ""]
+ALNUM = np.array(list("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789_-"))
+
+def _titles(rng, words, start, count):
+    picks = rng.choice(np.array(words, dtype=object), size=(count, 2))
+    # roughly 1 in 20 titles repeats an earlier one, so dedupe has real work to do
+    ids = np.arange(start, start + count)
+    ids = np.where(rng.random(count) < 0.05, ids // 2, ids)
+    return [f"{a} {b} {i}" for (a, b), i in zip(picks, ids)]
+
+def _video_ids(rng, count):
+    return ["".join(row) for row in rng.choice(ALNUM, size=(count, 11))]
+
+def write_telugu(path, rows, seed=0, block=500_000):
+    rng = np.random.default_rng(seed)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["S.No", "Song Name", "Artist", "mood", "Movie"] + ["Youtube link"] * 8)
+        for start in range(0, rows, block):
+            n = min(block, rows - start)
+            titles = _titles(rng, UTF8_WORDS, start, n)
+            moods = rng.choice(TELUGU_MOODS, n)
+            artists = rng.choice(ARTISTS, n)
+            movies = rng.choice(MOVIES, n)
+            vids = _video_ids(rng, n)
+            kind = rng.random(n)
+            for i in range(n):
+                if kind[i] < 0.80:
+                    link = f"https://youtu.be/{vids[i]}?si=abcdEFGHijklMNOP"
+                elif kind[i] < 0.90:
+                    link = vids[i]
+                elif kind[i] < 0.95:
+                    link = f"www.youtube.com/watch?v={vids[i]}"
+                else:
+                    link = ""
+                w.writerow([start + i + 1, titles[i], artists[i], moods[i], movies[i], link, "", "", "", "", "", "", ""])
+
+def write_hindi(path, rows, seed=1, block=500_000, encoding="latin1"):
+    rng = np.random.default_rng(seed)
+    words = LATIN1_WORDS if encoding == "latin1" else UTF8_WORDS
+    with open(path, "w", encoding=encoding, newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["Song Name", "Movie", "Mood"])
+        for start in range(0, rows, block):
+            n = min(block, rows - start)
+            # offset ids so Hindi titles don't all collide with Telugu ones
+            titles = _titles(rng, words, start + 10 * rows, n)
+            movies = rng.choice(MOVIES, n)
+            moods = rng.choice(HINDI_MOODS, n)
+            w.writerows(zip(titles, movies, moods))
+
+def write_catalog_dir(directory, rows, seed=0):
+    # rows split evenly; manifest keeps the Telugu-first priority of the real catalogs
+    os.makedirs(directory, exist_ok=True)
+    tel = os.path.join(directory, "telugu_songs_dataset.csv")
+    hin = os.path.join(directory, "hindi_songs_dataset.csv")
+    write_telugu(tel, rows - rows // 2, seed=seed)
+    write_hindi(hin, rows // 2, seed=seed + 1)
+    with open(os.path.join(directory, "catalogs.json"), "w", encoding="utf-8") as f:
+        f.write('{"catalogs": [{"file": "telugu_songs_dataset.csv", "dataset": "Telugu"}, '
+                '{"file": "hindi_songs_dataset.csv", "dataset": "Hindi"}]}\n')
+    return [(tel, "Telugu"), (hin, "Hindi")]
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Write a synthetic Telugu + Hindi catalog directory.")
+    ap.add_argument("--rows", type=int, default=100_000)
+    ap.add_argument("--out", required=True)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+    for path, name in write_catalog_dir(args.out, args.rows, args.seed):
+        print(f"{name}: {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
@@ -0,0 +1,852 @@
+import codecs
+import hashlib
+import itertools
+import json
+import os
+import re
+import threading
+import unicodedata
+import urllib.parse
+
+import numpy as np
+import pandas as pd
+
+import link_health
+import metrics
+from mood_index import MoodIndex
+
+# ---------- Configuration: put your files here ----------
+# every *.csv in CATALOG_DIR is a catalog; catalogs.json (optional) names them and sets priority
+CATALOG_DIR = os.environ.get("CATALOG_DIR", ".")
+MANIFEST_NAME = "catalogs.json"
+PARALLEL_MIN_BYTES = 8 * 1024 * 1024
+
+SNAPSHOT_DIR = os.environ.get("CATALOG_SNAPSHOT_DIR", ".catalog_cache")
+SNAPSHOT_VERSION = 3
+# keep catalogs resident as compact_catalog.CompactCatalog (categoricals + link codes) instead of a plain DataFrame
+COMPACT = os.environ.get("CATALOG_COMPACT", "0") == "1"
+CLEAN_COLUMNS = ["Title","Artist","Movie","Mood","mood_norm","Link","Dataset"]
+# which fields make two rows "the same song" (comma separated, e.g. "Title,Movie,Artist"); overrides catalogs.json "dedupe"
+DEDUPE_KEYS = os.environ.get("CATALOG_DEDUPE_KEYS", "")
+
+# ---------- Utilities ----------
+def read_csv_try(path):
+    if not path or not os.path.exists(path):
+        raise FileNotFoundError(f"CSV not found: {path}")
+    try:
+        return pd.read_csv(path, encoding="utf-8")
+    except Exception:
+        try:
+            return pd.read_csv(path, encoding="latin1")
+        except Exception as e:
+            raise RuntimeError(f"Failed to read CSV {path}: {e}")
+
+def detect_mood_col(df):
+    if df is None or df.empty:
+        return None
+    candidates = ['mood','moods','feeling','feels','song_mood','emotion','sentiment']
+    cols_map = {c.lower(): c for c in df.columns}
+    for cand in candidates:
+        if cand in cols_map:
+            return cols_map[cand]
+    for low, orig in cols_map.items():
+        if 'mood' in low or 'feel' in low or 'sent' in low or 'emotion' in low:
+            return orig
+    return None
+
+def detect_link_col(df):
+    if df is None or df.empty:
+        return None
+    candidates = ['youtube_link','youtube','link','url','video_url']
+    cols_map = {c.lower(): c for c in df.columns}
+    for cand in candidates:
+        if cand in cols_map:
+            return cols_map[cand]
+    for low, orig in cols_map.items():
+        if 'youtube' in low or 'link' in low or 'url' in low:
+            return orig
+    return None
+
+def detect_link_cols(df):
+    # every link-like column, detect_link_col's pick first; repeated headers arrive as "x", "x.1", "x.2", ...
+    first = detect_link_col(df)
+    if first is None:
+        return []
+    rest = [c for c in df.columns if c != first and any(k in c.lower() for k in ("youtube", "link", "url"))]
+    return [first] + rest
+
+def normalize_mood_series(df, mood_col):
+    if mood_col is None:
+        return pd.Series([''] * len(df))
+    return df[mood_col].astype(str).str.strip().str.lower().fillna('')
+
+def is_youtube_id(s):
+    return bool(re.fullmatch(r'[A-Za-z0-9_-]{11}', s or ''))
+
+def fix_telugu_link(val):
+    if pd.isna(val):
+        return ''
+    s = str(val).strip()
+    if not s:
+        return ''
+    if re.match(r'^https?://', s, flags=re.I):
+        return s
+    if is_youtube_id(s):
+        return f'https://youtu.be/{s}'
+    if s.startswith('www.'):
+        return 'https://' + s
+    if 'youtube' in s or 'youtu.be' in s:
+        return 'https://' + s
+    if '.' in s and ' ' not in s:
+        return 'https://' + s
+    return ''
+
+def make_youtube_search_link(title, artist=None, movie=None):
+    parts = []
+    if title:
+        parts.append(str(title))
+    if artist:
+        parts.append(str(artist))
+    if movie:
+        parts.append(str(movie))
+    q = " ".join(parts).strip()
+    if not q:
+        return ''
+    return 'https://www.youtube.com/results?search_query=' + urllib.parse.quote_plus(q)
+
+# one pattern for every YouTube video URL form fix_telugu_link can produce -> the 11-char video id
+# (kept RE2-compatible so pyarrow can run it too)
+YOUTUBE_VIDEO_RE = re.compile(
+    r'(?i)^https?://(?:www\.|m\.|music\.)?(?:youtu\.be/|youtube\.com/(?:watch\?(?:[^#]*?&)?v=|shorts/|embed/|live/|v/))'
+    r'(?P<id>[A-Za-z0-9_-]{11})(?:$|[^A-Za-z0-9_-])')
+
+def resolve_link(values, title, artist=None, movie=None):
+    # first usable link among a row's link columns, YouTube videos as https://youtu.be/<id>,
+    # else a YouTube search for the song
+    for val in values:
+        link = fix_telugu_link(val)
+        if link:
+            m = YOUTUBE_VIDEO_RE.match(link)
+            return f'https://youtu.be/{m.group(1)}' if m else link
+    return make_youtube_search_link(title, artist, movie)
+
+def first_col_like(df, possibilities):
+    if df is None or df.empty:
+        return None
+    cols = list(df.columns)
+    lowmap = {c.lower(): c for c in cols}
+    for p in possibilities:
+        if p.lower() in lowmap:
+            return lowmap[p.lower()]
+    for c in cols:
+        if 'title' in c.lower() or 'song' in c.lower() or 'name' in c.lower():
+            return c
+    return cols[0] if cols else None
+
+# ---------- Prepare dataset helper ----------
+def prepare_dataset(df, dataset_name):
+    if df is None or df.empty:
+        return pd.DataFrame(columns=CLEAN_COLUMNS)
+    df = df.copy()
+    mood_col = detect_mood_col(df)
+    if mood_col is None:
+        raise RuntimeError(f"Could not detect mood column in dataset '{dataset_name}'")
+    df["mood_norm"] = normalize_mood_series(df, mood_col)
+    title_col = first_col_like(df, ['song_name','title','song','track','name'])
+    # artist detection
+    artist_col = None
+    for c in df.columns:
+        if 'artist' in c.lower() or 'singer' in c.lower():
+            artist_col = c
+            break
+    movie_col = None
+    for c in df.columns:
+        if any(x in c.lower() for x in ("movie","film","album")):
+            movie_col = c
+            break
+    link_cols = detect_link_cols(df)
+    df["resolved_link"] = df.apply(lambda r: resolve_link([r[c] for c in link_cols], r.get(title_col,""), r.get(artist_col,"") if artist_col else "", r.get(movie_col,"") if movie_col else ""), axis=1)
+    link_col = "resolved_link"
+    idx = df.index
+    title_s = df[title_col].astype(str) if title_col in df.columns else pd.Series("", index=idx)
+    artist_s = df[artist_col].astype(str) if artist_col and artist_col in df.columns else pd.Series("", index=idx)
+    movie_s = df[movie_col].astype(str) if movie_col and movie_col in df.columns else pd.Series("", index=idx)
+    mood_s = df[mood_col].astype(str) if mood_col in df.columns else pd.Series("", index=idx)
+    mood_norm_s = df["mood_norm"]
+    link_s = df[link_col].astype(str) if link_col in df.columns else pd.Series("", index=idx)
+    clean = pd.DataFrame({
+        "Title": title_s.values,
+        "Artist": artist_s.values,
+        "Movie": movie_s.values,
+        "Mood": mood_s.values,
+        "mood_norm": mood_norm_s.values,
+        "Link": link_s.values,
+        "Dataset": [dataset_name] * len(df)
+    })
+    return clean
+
+# ---------- Vectorized prepare (same output as prepare_dataset, no row-wise apply) ----------
+_SCHEME_RE = re.compile(r'^https?://', flags=re.I)
+_YOUTUBE_ID_RE = re.compile(r'[A-Za-z0-9_-]{11}')
+_PLUS_SAFE_RE = re.compile(r'[A-Za-z0-9_.~ -]*')
+SEARCH_PREFIX = 'https://www.youtube.com/results?search_query='
+
+def detect_columns(df):
+    # same detection as prepare_dataset; only looks at the header, so a one-row frame is enough
+    probe = df.head(1).copy()
+    mood_col = detect_mood_col(probe)
+    if mood_col is None:
+        return None
+    probe["mood_norm"] = ""
+    title_col = first_col_like(probe, ['song_name','title','song','track','name'])
+    artist_col = None
+    for c in probe.columns:
+        if 'artist' in c.lower() or 'singer' in c.lower():
+            artist_col = c
+            break
+    movie_col = None
+    for c in probe.columns:
+        if any(x in c.lower() for x in ("movie","film","album")):
+            movie_col = c
+            break
+    return {"mood": mood_col, "title": title_col, "artist": artist_col, "movie": movie_col, "links": detect_link_cols(probe)}
+
+def needed_columns(cols):
+    # the source columns a detect_columns result reads, each once
+    names = [cols["mood"], cols["title"], cols["artist"], cols["movie"]] + cols["links"]
+    return [c for c in dict.fromkeys(names) if c is not None]
+
+def _query_part(s):
+    # " " + str(v) where make_youtube_search_link would include v (truthy values, NaN counts as "nan")
+    # via object: a blank column reads as float64 NaN, which astype(str) would leave as a float
+    na = s.isna()
+    text = s.astype(object).where(~na, "nan").astype(str)
+    if pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s):
+        keep = (na | s.ne(0)).to_numpy()
+    else:
+        keep = (na | text.str.len().gt(0)).to_numpy()
+    return pd.Series(np.where(keep, " " + text.to_numpy(dtype=object), ""), index=s.index, dtype=object)
+
+def quote_plus_series(q):
+    # plain ASCII queries only need spaces swapped; everything else goes through quote_plus once per unique value
+    q = q.astype(str)
+    simple = q.str.fullmatch(_PLUS_SAFE_RE.pattern).to_numpy(dtype=bool)
+    out = q.str.replace(" ", "+", regex=False).to_numpy(dtype=object)
+    if not simple.all():
+        rest = q[~simple]
+        codes, uniques = pd.factorize(rest)
+        quoted = np.array([urllib.parse.quote_plus(u) for u in uniques], dtype=object)
+        out[~simple] = quoted[codes]
+    return pd.Series(out, index=q.index, dtype=object)
+
+def search_links_vectorized(title_s, artist_s=None, movie_s=None):
+    q = _query_part(title_s)
+    if artist_s is not None:
+        q = q + _query_part(artist_s)
+    if movie_s is not None:
+        q = q + _query_part(movie_s)
+    q = q.str.strip()
+    empty = q.str.len().eq(0).to_numpy()
+    links = SEARCH_PREFIX + quote_plus_series(q)
+    return links.where(~empty, "")
+
+def fix_links_vectorized(s):
+    na = s.isna().to_numpy()
+    s = s.astype(object).where(~na, "").astype(str).str.strip()
+    has_scheme = s.str.match(_SCHEME_RE.pattern, case=False).to_numpy(dtype=bool)
+    is_id = s.str.fullmatch(_YOUTUBE_ID_RE.pattern).to_numpy(dtype=bool)
+    hostish = (
+        s.str.startswith("www.")
+        | s.str.contains("youtube", regex=False)
+        | s.str.contains("youtu.be", regex=False)
+        | (s.str.contains(".", regex=False) & ~s.str.contains(" ", regex=False))
+    ).to_numpy(dtype=bool)
+    vals = s.to_numpy(dtype=object)
+    out = np.select(
+        [has_scheme, is_id, hostish],
+        ["" + vals, "https://youtu.be/" + vals, "https://" + vals],
+        default="",
+    )
+    return pd.Series(out, index=s.index, dtype=object)
+
+def extract_video_ids(links):
+    # object array of links -> object array of video ids (None where the link is not a YouTube video)
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+    except ImportError:
+        ids = pd.Series(links, dtype=object).str.extract(YOUTUBE_VIDEO_RE, expand=False)
+        return ids.astype(object).where(ids.notna(), None).to_numpy(dtype=object)
+    # arrow's regex engine is several times faster than a per-cell re.search here
+    m = pc.extract_regex(pa.array(links, type=pa.string()), YOUTUBE_VIDEO_RE.pattern)
+    ids = m.field("id").to_numpy(zero_copy_only=False).astype(object)
+    ids[~m.is_valid().to_numpy(zero_copy_only=False)] = None
+    return ids
+
+def resolve_links_vectorized(link_cols, title_s, artist_s=None, movie_s=None):
+    # resolve_link for whole columns: coalesce the link columns left to right (each one only looked at
+    # for rows still without a link), canonicalize YouTube videos, then search links for whatever is left
+    out = np.full(len(title_s), "", dtype=object)
+    todo = np.arange(len(title_s))
+    for s in link_cols:
+        if not len(todo):
+            break
+        present = todo[s.iloc[todo].notna().to_numpy()]
+        if not len(present):
+            continue
+        fixed = fix_links_vectorized(s.iloc[present]).to_numpy(dtype=object)
+        found = fixed != ""
+        out[present[found]] = fixed[found]
+        todo = todo[out[todo] == ""]
+    has = np.flatnonzero(out != "")
+    if len(has):
+        ids = extract_video_ids(out[has])
+        video = ids != None  # noqa: E711
+        out[has[video]] = "https://youtu.be/" + ids[video]
+    empty = np.flatnonzero(out == "")
+    if len(empty):
+        pick = lambda s: s.iloc[empty] if s is not None else None
+        out[empty] = search_links_vectorized(pick(title_s), pick(artist_s), pick(movie_s)).to_numpy(dtype=object)
+    return pd.Series(out, index=title_s.index, dtype=object)
+
+def prepare_dataset_vectorized(df, dataset_name, cols=None):
+    if df is None or df.empty:
+        return pd.DataFrame(columns=CLEAN_COLUMNS)
+    cols = detect_columns(df) if cols is None else cols
+    if cols is None:
+        raise RuntimeError(f"Could not detect mood column in dataset '{dataset_name}'")
+    title_col, artist_col, movie_col, mood_col = cols["title"], cols["artist"], cols["movie"], cols["mood"]
+    idx = df.index
+    mood_norm_s = normalize_mood_series(df, mood_col)
+    link_s = resolve_links_vectorized(
+        [df[c] for c in cols["links"]],
+        df[title_col] if title_col in df.columns else pd.Series("", index=idx),
+        df[artist_col] if artist_col else None,
+        df[movie_col] if movie_col else None,
+    ).astype(str)
+    title_s = df[title_col].astype(str) if title_col in df.columns else pd.Series("", index=idx)
+    artist_s = df[artist_col].astype(str) if artist_col and artist_col in df.columns else pd.Series("", index=idx)
+    movie_s = df[movie_col].astype(str) if movie_col and movie_col in df.columns else pd.Series("", index=idx)
+    mood_s = df[mood_col].astype(str) if mood_col in df.columns else pd.Series("", index=idx)
+    clean = pd.DataFrame({
+        "Title": title_s.values,
+        "Artist": artist_s.values,
+        "Movie": movie_s.values,
+        "Mood": mood_s.values,
+        "mood_norm": mood_norm_s.values,
+        "Link": link_s.values,
+        "Dataset": [dataset_name] * len(df)
+    })
+    return clean
+
+# ---------- Streaming CSV ingestion ----------
+STREAM_CHUNK_ROWS = 200_000
+STREAM_MIN_BYTES = 64 * 1024 * 1024
+
+def sniff_encoding(path, block_size=1 << 20):
+    # utf-8 if the whole file decodes, else latin1 (same outcome as read_csv_try, without parsing twice)
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    try:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(block_size), b""):
+                decoder.decode(block)
+            decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        return "latin1"
+    return "utf-8"
+
+_detect_cache = {}
+
+def detect_columns_cached(header):
+    # catalogs in the same schema share one detection result
+    key = tuple(header)
+    if key not in _detect_cache:
+        probe = pd.DataFrame([[""] * len(key)], columns=list(key))
+        _detect_cache[key] = detect_columns(probe)
+    return _detect_cache[key]
+
+def sniff_header(path, encoding):
+    # column names exactly as read_csv would name them (duplicates become "x.1", "x.2", ...)
+    header = list(pd.read_csv(path, encoding=encoding, nrows=0).columns)
+    return header, detect_columns_cached(header)
+
+def iter_prepared_chunks(path, dataset_name, chunksize=STREAM_CHUNK_ROWS):
+    if not path or not os.path.exists(path):
+        raise FileNotFoundError(f"CSV not found: {path}")
+    encoding = sniff_encoding(path)
+    header, cols = sniff_header(path, encoding)
+    if cols is None:
+        raise RuntimeError(f"Could not detect mood column in dataset '{dataset_name}'")
+    positions = sorted(header.index(c) for c in needed_columns(cols))
+    names = [header[p] for p in positions]
+    # read by position: duplicate headers (e.g. eight "Youtube link" columns) get their read_csv names back
+    reader = pd.read_csv(path, encoding=encoding, usecols=positions, dtype=str, chunksize=chunksize)
+    for chunk in metrics.timed_iter("csv_parse", reader):
+        chunk.columns = names
+        with metrics.stage("prepare", rows=len(chunk)):
+            prepared = prepare_dataset_vectorized(chunk, dataset_name, cols=cols)
+        yield prepared
+
+def read_prepared(path, dataset_name, chunksize=STREAM_CHUNK_ROWS):
+    # small files: one read_csv_try; large ones stream so parse memory is bounded by the chunk
+    if os.path.getsize(path) < STREAM_MIN_BYTES:
+        with metrics.stage("csv_parse") as m:
+            raw = read_csv_try(path)
+            m.rows = len(raw)
+        if raw.empty:
+            return pd.DataFrame(columns=CLEAN_COLUMNS)
+        with metrics.stage("prepare", rows=len(raw)):
+            return prepare_dataset_vectorized(raw, dataset_name, cols=detect_columns_cached(raw.columns))
+    parts = [p for p in iter_prepared_chunks(path, dataset_name, chunksize) if not p.empty]
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=CLEAN_COLUMNS)
+
+# ---------- Catalog discovery ----------
+def dataset_name_from_filename(filename):
+    # "telugu_songs1_dataset.csv" -> "Telugu"
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    words = [w for w in re.split(r'[_\-\s]+', stem) if w and not re.fullmatch(r'(songs?\d*|dataset|data|catalog|\d+)', w, flags=re.I)]
+    return " ".join(w.capitalize() for w in words) or stem
+
+def read_manifest(directory):
+    path = os.path.join(directory, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    entries = data.get("catalogs", []) if isinstance(data, dict) else data
+    return [e for e in entries if isinstance(e, dict) and e.get("file")]
+
+def default_sources(directory=None):
+    # [(path, dataset)] in priority order: manifest entries by "priority" (then listing order),
+    # then any other CSVs in the directory alphabetically with names taken from the filename
+    directory = CATALOG_DIR if directory is None else directory
+    listed = []
+    for i, entry in enumerate(read_manifest(directory)):
+        path = os.path.join(directory, entry["file"])
+        name = entry.get("dataset") or dataset_name_from_filename(entry["file"])
+        listed.append((entry.get("priority", i), i, path, name))
+    listed.sort(key=lambda t: (t[0], t[1]))
+    sources = [(path, name) for _, _, path, name in listed]
+    known = {os.path.abspath(p) for p, _ in sources}
+    try:
+        files = sorted(f for f in os.listdir(directory) if f.lower().endswith(".csv"))
+    except OSError:
+        files = []
+    for f in files:
+        path = os.path.join(directory, f)
+        if os.path.abspath(path) not in known:
+            sources.append((path, dataset_name_from_filename(f)))
+    return sources
+
+# ---------- Dedupe fingerprints ----------
+def _normalize_uniques(uniques):
+    text = pd.Series(uniques).astype(str)
+    # NFKC leaves ASCII alone and casefold is lower() there, so only non-ASCII values need the slow path
+    ascii_ = text.str.isascii().to_numpy(dtype=bool)
+    lowered = text.str.lower()
+    spaced = lowered.str.contains(r"\s\s|[\t\n\r\x0b\x0c]").to_numpy(dtype=bool)
+    norm = lowered.str.strip().to_numpy(dtype=object)
+    if spaced.any():
+        norm[spaced] = lowered[spaced].str.replace(r"\s+", " ", regex=True).str.strip().to_numpy(dtype=object)
+    rest = text[~ascii_].to_numpy(dtype=object)
+    norm[~ascii_] = [" ".join(unicodedata.normalize("NFKC", u).casefold().split()) for u in rest]
+    return norm
+
+def normalize_text_series(s):
+    # NFKC + casefold + collapsed whitespace; missing -> "". Normalizes each distinct value once.
+    codes, uniques = pd.factorize(s, use_na_sentinel=True)
+    return np.append(_normalize_uniques(uniques), "")[codes]
+
+def fingerprints(df, keys=("Title",)):
+    # one uint64 per row: hash of the normalized key fields ("Ｌｏｖｅ  Me" and "love me" collide on purpose)
+    fps = np.zeros(len(df), dtype=np.uint64)
+    for k in keys:
+        codes, uniques = pd.factorize(df[k], use_na_sentinel=True)
+        # hash distinct values only; categorize=False because they are already unique
+        hashed = pd.util.hash_array(np.append(_normalize_uniques(uniques), ""), categorize=False)[codes]
+        fps = fps * np.uint64(1000003) ^ hashed
+    return fps
+
+def dedupe_config(sources):
+    # {"keys": [...], "priority": [...]} from the "dedupe" block of the sources' catalogs.json, e.g.
+    #   "dedupe": {"keys": ["Title", "Movie"], "priority": ["Hindi", "Telugu"]}
+    # priority decides which copy of a song survives (default: source priority); keys default to Title
+    directory = os.path.dirname(sources[0][0]) if sources else CATALOG_DIR
+    path = os.path.join(directory, MANIFEST_NAME)
+    conf = {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        conf = data.get("dedupe", {}) if isinstance(data, dict) else {}
+    keys = [k.strip() for k in DEDUPE_KEYS.split(",") if k.strip()] or conf.get("keys") or ["Title"]
+    unknown = [k for k in keys if k not in CLEAN_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown dedupe key(s): {', '.join(unknown)}")
+    return {"keys": list(keys), "priority": list(conf.get("priority", []))}
+
+def dedupe_ranks(sources, config):
+    # dataset -> rank for picking the canonical copy (lower wins)
+    names = [name for _, name in sources]
+    order = [d for d in config["priority"] if d in names] + [d for d in names if d not in config["priority"]]
+    return {d: i for i, d in enumerate(order)}
+
+def canonical_rows(fps, ranks):
+    # positions of the rows that survive dedupe, in their original order: for every fingerprint the row
+    # with the lowest rank, ties going to the earliest row
+    ranks = np.asarray(ranks, dtype=np.int64)
+    if len(ranks) and np.all(ranks[1:] >= ranks[:-1]):
+        # rows already in rank order (the default): a single hash pass
+        return np.flatnonzero(~pd.Index(fps).duplicated(keep="first"))
+    order = np.lexsort((np.arange(len(fps)), ranks))
+    return np.sort(order[~pd.Index(fps[order]).duplicated(keep="first")])
+
+# ---------- Catalog build ----------
+def _prepare_source(path, name):
+    # process-pool worker: never raises, so one bad file can't take the others down
+    try:
+        return read_prepared(path, name), None
+    except Exception as e:
+        return None, f"Could not load {name} CSV: {e}"
+
+def build_combined(sources=None, warn=print, max_workers=None):
+    # read + prepare each (path, dataset) in priority order, then keep the canonical copy of every song
+    return build_catalog(sources, warn, max_workers)[0]
+
+def build_catalog(sources=None, warn=print, max_workers=None):
+    # -> (combined, fingerprints); fingerprints[i] belongs to combined row i
+    sources = default_sources() if sources is None else sources
+    present = [(path, name) for path, name in sources if os.path.exists(path)]
+    total = sum(os.path.getsize(path) for path, _ in present)
+    if len(present) > 1 and total >= PARALLEL_MIN_BYTES and max_workers != 1:
+        from concurrent.futures import ProcessPoolExecutor
+        workers = min(len(present), max_workers or os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_prepare_source, *zip(*present)))
+    else:
+        results = [_prepare_source(path, name) for path, name in present]
+    parts = []
+    for frame, error in results:
+        if error:
+            warn(error)
+        else:
+            parts.append(frame)
+    parts = [p for p in parts if not p.empty]
+    if not parts:
+        return pd.DataFrame(columns=CLEAN_COLUMNS), np.empty(0, dtype=np.uint64)
+    with metrics.stage("combine_dedupe", rows=sum(len(p) for p in parts)):
+        combined = pd.concat(parts, ignore_index=True)
+        config = dedupe_config(sources)
+        fps = fingerprints(combined, config["keys"])
+        rank = dedupe_ranks(sources, config)
+        keep = canonical_rows(fps, combined["Dataset"].map(rank))
+        return combined.take(keep).reset_index(drop=True), fps[keep]
+
+# ---------- Snapshot cache ----------
+_hash_memo = {}
+_memory = {}
+_live = {}
+# every entry gets a fresh version, so anything keyed on it (recommender.ResultCache) can't outlive its catalog
+_versions = itertools.count(1)
+_lock = threading.Lock()
+# separate so a slow neighbor build never blocks plain catalog reads, nor a "more like this" lookup
+_similarity_lock = threading.Lock()
+_similarity_build_lock = threading.Lock()
+# held by the one re-rank running in the background; re-rank subscribers (service views) get each new entry
+_health_lock = threading.Lock()
+_rerank_listeners = []
+
+def file_signature(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return {"path": os.path.abspath(path), "missing": True}
+    stamp = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    digest = _hash_memo.get(stamp)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        digest = h.hexdigest()
+        _hash_memo[stamp] = digest
+    return {"path": stamp[0], "size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest}
+
+def catalog_key(sources=None):
+    sources = default_sources() if sources is None else sources
+    payload = {"version": SNAPSHOT_VERSION, "dedupe": dedupe_config(sources),
+               "sources": [[name, file_signature(path)] for path, name in sources]}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()[:24]
+
+def _snapshot_path(key):
+    try:
+        import pyarrow  # noqa: F401
+        ext = "parquet"
+    except ImportError:
+        ext = "pkl"
+    return os.path.join(SNAPSHOT_DIR, f"catalog-{key}.{ext}")
+
+def _read_snapshot(path):
+    # -> (combined, fingerprints); the fingerprints ride along as an extra column
+    if path.endswith(".parquet"):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        # read_parquet hands string columns back in ~128K-row chunks, and take() across chunks is >10x slower
+        # than on one array - that cost lands on every query. Hand the chunked copy's memory back afterwards.
+        df = pq.read_table(path).combine_chunks().to_pandas()
+        pa.default_memory_pool().release_unused()
+    else:
+        df = pd.read_pickle(path)
+    return df.drop(columns=["fingerprint"]), df["fingerprint"].to_numpy(dtype=np.uint64)
+
+def _remove_stale(path, prefix):
+    # old snapshots for other source versions are dead weight
+    for name in os.listdir(os.path.dirname(path)):
+        full = os.path.join(os.path.dirname(path), name)
+        if name.startswith(prefix) and full != path and ".tmp" not in name:
+            try:
+                os.remove(full)
+            except OSError:
+                pass
+
+def _write_snapshot(df, fps, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    df = df.assign(fingerprint=fps)
+    tmp = path + ".tmp"
+    if path.endswith(".parquet"):
+        df.to_parquet(tmp, index=False)
+    else:
+        df.to_pickle(tmp)
+    os.replace(tmp, path)
+    _remove_stale(path, "catalog-")
+
+def load_catalog(sources=None, rebuild=False, warn=print):
+    # memory (shared by every session in this process) -> on-disk snapshot -> full build
+    return _load_entry(sources, rebuild, warn)["combined"]
+
+def load_mood_index(sources=None, warn=print):
+    return _load_entry(sources, False, warn)["index"]
+
+def load_entry(sources=None, warn=print):
+    # {"combined", "index", "fingerprints", "version", "health"} for the current catalog
+    return _load_entry(sources, False, warn)
+
+def _build_index(combined, sources):
+    # -> (MoodIndex, link verdict stamp it was ranked with)
+    health = link_health.current()
+    with metrics.stage("index_build", rows=len(combined)):
+        ranks = link_health.link_ranks(combined["Link"]) if health is not None else None
+        return MoodIndex(combined, [name for _, name in sources], link_rank=ranks), health
+
+def _with_link_health(entry, sources, warn):
+    # re-rank when link_health has new verdicts. The rows don't change, so the entry keeps answering (in its
+    # old order) while the new index builds in the background and is swapped in, as catalog_watcher does
+    if entry.get("health") != link_health.current():
+        rerank_later(sources, warn)
+    return entry
+
+def on_rerank(listener):
+    # listener(entry) after each re-ranked entry is installed (from the re-rank thread)
+    _rerank_listeners.append(listener)
+
+def rerank_later(sources, warn=print):
+    # start a background re-rank unless one is already running
+    if _health_lock.acquire(blocking=False):
+        threading.Thread(target=_rerank, args=(sources, warn), name="link-rerank", daemon=True).start()
+
+def _rerank(sources, warn):
+    try:
+        key = catalog_key(sources)
+        latest = _live.get(tuple(sources)) or _memory.get(key)
+        if latest is None or latest.get("health") == link_health.current():
+            return
+        index, health = _build_index(latest["combined"], sources)
+        # an update that landed during the build has rows this index lacks; the next lookup re-ranks that one
+        entry = install_catalog(sources, latest["combined"], index, latest["fingerprints"], persist=False, warn=warn,
+                                health=health, replaces=latest)
+        if entry is not None:
+            for listener in list(_rerank_listeners):
+                listener(entry)
+    except Exception as e:
+        warn(f"Could not re-rank catalog by link health: {e}")
+    finally:
+        _health_lock.release()
+
+def _load_entry(sources, rebuild, warn):
+    sources = default_sources() if sources is None else sources
+    # a running CatalogWatcher keeps this entry current, so readers skip the stat/hash check entirely
+    live = _live.get(tuple(sources))
+    if live is not None and not rebuild:
+        return _with_link_health(live, sources, warn)
+    key = catalog_key(sources)
+    with _lock:
+        cached = _memory.get(key) if not rebuild else None
+    if cached is not None:
+        return _with_link_health(cached, sources, warn)
+    with _lock:
+        if not rebuild and key in _memory:
+            return _memory[key]
+        path = _snapshot_path(key)
+        combined = None
+        if not rebuild and os.path.exists(path):
+            try:
+                with metrics.stage("snapshot_read") as m:
+                    combined, fps = _read_snapshot(path)
+                    m.rows = len(combined)
+            except Exception as e:
+                warn(f"Ignoring unreadable catalog snapshot {path}: {e}")
+        if combined is None:
+            combined, fps = build_catalog(sources, warn=warn)
+            try:
+                _write_snapshot(combined, fps, path)
+            except Exception as e:
+                warn(f"Could not write catalog snapshot {path}: {e}")
+        _memory.clear()
+        if COMPACT:
+            from compact_catalog import CompactCatalog
+            combined = CompactCatalog.from_frame(combined)
+        index, health = _build_index(combined, sources)
+        _memory[key] = {"combined": combined, "index": index, "fingerprints": fps, "version": next(_versions), "health": health}
+        if tuple(sources) in _live:
+            _live[tuple(sources)] = _memory[key]
+        return _memory[key]
+
+def install_catalog(sources, combined, index, fps, persist=True, warn=print, health=None, replaces=None):
+    # swap in an already-built catalog (catalog_watcher after an incremental append, or a link re-rank);
+    # health: the link_health stamp the index was ranked with. replaces: install only while this entry is
+    # still the current one (else nothing is installed and this returns None)
+    key = catalog_key(sources)
+    entry = {"combined": combined, "index": index, "fingerprints": fps, "version": next(_versions), "health": health}
+    previous = _current_entry(sources)
+    # before the swap, so no reader sees this entry without the neighbors it inherits
+    _carry_similarity(previous, entry)
+    with _lock:
+        if replaces is not None and (_live.get(tuple(sources)) or _memory.get(key)) is not replaces:
+            return None
+        _memory.clear()
+        _memory[key] = entry
+        if tuple(sources) in _live:
+            _live[tuple(sources)] = entry
+    if persist:
+        try:
+            _write_snapshot(combined if isinstance(combined, pd.DataFrame) else combined.to_frame(), fps, _snapshot_path(key))
+        except Exception as e:
+            warn(f"Could not write catalog snapshot: {e}")
+    sim = entry.get("similarity")
+    if sim is not None and sim.complete < len(fps):
+        _complete_later(entry, sources, key, warn)
+    return entry
+
+def set_live(sources, entry):
+    with _lock:
+        if entry is None:
+            _live.pop(tuple(sources), None)
+        else:
+            _live[tuple(sources)] = entry
+
+def rebuild_catalog(sources=None, warn=print):
+    return load_catalog(sources, rebuild=True, warn=warn)
+
+# ---------- "More like this" ----------
+def _carry_similarity(previous, entry):
+    # the previous catalog's neighbors stay valid for its rows when the new one only appended rows; the new
+    # rows get none until _complete_similarity fills them in (lookups top them up with same-mood songs meanwhile)
+    sim = previous.get("similarity") if previous else None
+    if sim is None:
+        return
+    old, fps = previous["fingerprints"], entry["fingerprints"]
+    if len(fps) < len(old) or not np.array_equal(fps[:len(old)], old):
+        return
+    entry["similarity"] = sim if len(fps) == len(old) else sim.extended(fps)
+
+def _current_entry(sources):
+    with _lock:
+        return _live.get(tuple(sources)) or next(iter(_memory.values()), None)
+
+def _complete_later(entry, sources, key, warn):
+    threading.Thread(target=_complete_similarity, args=(entry, sources, key, warn), name="similarity", daemon=True).start()
+
+def _complete_similarity(entry, sources, key, warn, force=False):
+    # neighbors for the rows the entry's SimilarityIndex is still missing (all of them on first use, appended
+    # rows after a watcher update), then saved next to the catalog snapshot. Skipped for a catalog that has been
+    # replaced meanwhile: the newer one carries this index forward and completes it itself.
+    try:
+        with _similarity_build_lock:
+            sim = entry["similarity"]
+            if sim.complete == len(sim.neighbors) or not (force or _current_entry(sources) is entry):
+                return
+            combined = entry["combined"]
+            with metrics.stage("similarity_build", rows=len(combined) - sim.complete):
+                sim = sim.completed(combined if isinstance(combined, pd.DataFrame) else combined.to_frame())
+            entry["similarity"] = sim
+            path = os.path.join(SNAPSHOT_DIR, f"similar-{key}.npz")
+            os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+            sim.save(path)
+            _remove_stale(path, "similar-")
+            # an update that landed during the build inherited the unfinished index; hand it this one instead
+            latest = _current_entry(sources)
+            inherited = latest.get("similarity") if latest is not None and latest is not entry else None
+            if inherited is not None and inherited.complete < sim.complete:
+                _carry_similarity(entry, latest)
+    except Exception as e:
+        warn(f"Could not build similarity index: {e}")
+
+def _entry_similarity(entry, sources, warn, wait=False):
+    # the entry's SimilarityIndex: memory -> similar-<key>.npz -> built in the background, so a lookup never
+    # waits for the neighbor join (wait=True does, for a rebuild job). Until then rows have no neighbors.
+    from similarity import SimilarityIndex
+    sim, key = entry.get("similarity"), None
+    if sim is not None and (sim.complete == len(sim.neighbors) or not wait):
+        return sim
+    with _similarity_lock:
+        sim = entry.get("similarity")
+        if sim is None:
+            key = catalog_key(sources)
+            path = os.path.join(SNAPSHOT_DIR, f"similar-{key}.npz")
+            if os.path.exists(path):
+                try:
+                    sim = SimilarityIndex.load(path)
+                except Exception as e:
+                    warn(f"Ignoring unreadable similarity snapshot {path}: {e}")
+            if sim is None or len(sim.neighbors) != len(entry["fingerprints"]):
+                sim = SimilarityIndex.pending(entry["fingerprints"])
+            entry["similarity"] = sim
+    if sim.complete < len(sim.neighbors):
+        if wait:
+            _complete_similarity(entry, sources, key or catalog_key(sources), warn, force=True)
+        elif key is not None:
+            # first lookup for this catalog; carried-forward indexes are already being completed
+            _complete_later(entry, sources, key, warn)
+    return entry["similarity"]
+
+def load_similarity(sources=None, warn=print):
+    sources = default_sources() if sources is None else sources
+    return _entry_similarity(_load_entry(sources, False, warn), sources, warn, wait=True)
+
+def similar_songs(song, sources=None, n=10, warn=print, wait=False):
+    # -> (MoodIndex, rows): up to n catalog rows like `song` (a dict with at least the dedupe key fields),
+    # best first; the song itself is found by its dedupe fingerprint. rows index that MoodIndex's catalog.
+    # wait: see _entry_similarity
+    from similarity import more_like_this
+    sources = default_sources() if sources is None else sources
+    entry = _load_entry(sources, False, warn)
+    sim = _entry_similarity(entry, sources, warn, wait)
+    keys = dedupe_config(sources)["keys"]
+    fp = fingerprints(pd.DataFrame([{k: song.get(k) for k in keys}]), keys)[0]
+    row = sim.row_of(fp)
+    if row < 0:
+        return entry["index"], np.empty(0, dtype=np.int64)
+    return entry["index"], more_like_this(entry["index"], sim, row, n)
+
+def all_moods_of(combined):
+    return sorted([m for m in combined["mood_norm"].unique() if str(m).strip()]) if not combined.empty else []
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Build the prepared song catalog snapshot.")
+    ap.add_argument("--rebuild", action="store_true", help="ignore any existing snapshot and rebuild from the CSVs")
+    args = ap.parse_args()
+    df = load_catalog(rebuild=args.rebuild)
+    if args.rebuild:
+        # the "more like this" neighbors are built in the background otherwise; a rebuild job pays for them up front
+        load_similarity()
+    print(f"{len(df)} songs, {len(all_moods_of(df))} moods -> {_snapshot_path(catalog_key())}")
@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+# SQLite catalog store: the prepared, deduplicated catalog on disk instead of in RAM.
+#   CATALOG_STORE=sqlite streamlit run app.py      # both front ends page through it via recommender.Recommender
+#   python catalog_store.py --rebuild              # build .catalog_cache/store-<key>.sqlite ahead of time
+#   python catalog_store.py --search "kesariya arijit"
+# Same surface as MoodIndex (moods(), priority, recommend(mood, sources, n, offset), song_count()) plus
+# search(text, ...) over an FTS5 index of title/artist/movie, compound mood queries (recommend_query) paged in
+# SQL, and "more like this" (similar) from a neighbors table built in the file on first use. Rows and their
+# order match the in-memory catalog, including the link_health ranking, which is refreshed in place when new
+# verdicts land.
+import json
+import os
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+import catalog
+import link_health
+import metrics
+from mood_taxonomy import query_tags, tags_by_mood
+
+STORE_VERSION = 4
+INSERT_BATCH = 50_000
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE staging (fp INTEGER PRIMARY KEY, pos INTEGER, ds_rank INTEGER,
+                      Title TEXT, Artist TEXT, Movie TEXT, Mood TEXT, mood_norm TEXT, Link TEXT, Dataset TEXT);
+-- id is the row's position in the in-memory catalog (+1), so ORDER BY id is catalog order;
+-- health is the row's link_health rank (MoodIndex link_rank)
+CREATE TABLE songs (id INTEGER PRIMARY KEY, fp INTEGER, ds_rank INTEGER, health INTEGER,
+                    Title TEXT, Artist TEXT, Movie TEXT, Mood TEXT, mood_norm TEXT, Link TEXT, Dataset TEXT);
+-- similarity top-k per song, best first: song ids as int32 bytes (filled by build_neighbors)
+CREATE TABLE neighbors (id INTEGER PRIMARY KEY, ids BLOB);
+"""
+# built after the bulk insert; both end in (health, implicit rowid), so (mood, dataset) pages come out in
+# MoodIndex order
+INDEXES = """
+CREATE INDEX songs_mood ON songs (mood_norm, ds_rank, health);
+CREATE INDEX songs_dataset ON songs (ds_rank, health);
+CREATE INDEX songs_fp ON songs (fp);
+CREATE VIRTUAL TABLE songs_fts USING fts5 (Title, Artist, Movie, content='songs', content_rowid='id',
+                                           tokenize='unicode61 remove_diacritics 2');
+INSERT INTO songs_fts (rowid, Title, Artist, Movie) SELECT id, Title, Artist, Movie FROM songs;
+"""
+COLUMNS = ", ".join(catalog.CLEAN_COLUMNS)
+
+# ---------- Build ----------
+def _prepared_chunks(path, name):
+    # read_prepared's two paths, without concatenating the streamed chunks
+    if os.path.getsize(path) < catalog.STREAM_MIN_BYTES:
+        yield catalog.read_prepared(path, name)
+    else:
+        yield from catalog.iter_prepared_chunks(path, name)
+
+def _sql_values(df, cols):
+    # NaN -> NULL
+    return [df[c].astype(object).where(df[c].notna(), None).to_numpy() for c in cols]
+
+def _apply_health(conn):
+    # songs.health from the current link verdicts, writing only rows whose rank changed; -> the verdicts' stamp
+    health = link_health.current()
+    rows = pd.DataFrame(conn.execute("SELECT id, Link, health FROM songs").fetchall(), columns=["id", "Link", "health"])
+    ranks = link_health.link_ranks(rows["Link"]) if health is not None and len(rows) else None
+    if ranks is None:
+        ranks = np.full(len(rows), link_health.UNKNOWN_RANK, dtype=np.int8)
+    changed = np.flatnonzero(ranks != rows["health"].to_numpy(dtype=np.int64))
+    ids = rows["id"].to_numpy(dtype=np.int64)
+    conn.executemany("UPDATE songs SET health = ? WHERE id = ?", zip(ranks[changed].tolist(), ids[changed].tolist()))
+    conn.execute("INSERT OR REPLACE INTO meta VALUES ('health', ?)", (json.dumps(health),))
+    return health
+
+def _apply_neighbors(conn):
+    # similarity's top-k neighbors over every song, as in catalog's similar-<key>.npz (same rows, same order)
+    from similarity import feature_matrix, top_k_neighbors
+    frame = pd.DataFrame(conn.execute("SELECT Title, Artist, Movie, mood_norm FROM songs ORDER BY id").fetchall(),
+                         columns=["Title", "Artist", "Movie", "mood_norm"])
+    neighbors, _ = top_k_neighbors(*feature_matrix(frame))
+    del frame
+    conn.execute("DELETE FROM neighbors")
+    for s in range(0, len(neighbors), INSERT_BATCH):
+        block = neighbors[s:s + INSERT_BATCH]
+        conn.executemany("INSERT INTO neighbors VALUES (?, ?)",
+                         ((s + i + 1, (row[row >= 0] + 1).astype(np.int32).tobytes()) for i, row in enumerate(block)))
+    conn.execute("INSERT OR REPLACE INTO meta VALUES ('neighbors', '1')")
+
+def build_neighbors(path):
+    # fill an existing store's neighbors table; readers keep working meanwhile
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        with conn:
+            with metrics.stage("store_neighbors"):
+                _apply_neighbors(conn)
+    finally:
+        conn.close()
+
+def refresh_health(path):
+    # re-rank an existing store after link_health wrote new verdicts; readers keep working meanwhile
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        with conn:
+            with metrics.stage("store_health"):
+                return _apply_health(conn)
+    finally:
+        conn.close()
+
+def build_store(sources, path, warn=print):
+    # sources in dedupe order into a staging table keyed by fingerprint (first copy wins, as canonical_rows),
+    # then copied out in catalog order. Memory stays at one prepared chunk.
+    tmp = path + ".tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    config = catalog.dedupe_config(sources)
+    dedupe = catalog.dedupe_ranks(sources, config)
+    conn = sqlite3.connect(tmp)
+    try:
+        # the file is private until os.replace, so durability doesn't matter; the journal only backs the savepoints
+        conn.executescript("PRAGMA journal_mode = MEMORY; PRAGMA synchronous = OFF;" + SCHEMA)
+        present = [(i, p, name) for i, (p, name) in enumerate(sources) if os.path.exists(p)]
+        datasets = []
+        order = sorted(present, key=lambda s: (dedupe.get(s[2], len(dedupe)), s[0]))
+        for i, p, name in order:
+            # positions: source index in the high bits keeps catalog (source) order whatever the dedupe order
+            pos = i << 40
+            # a source that fails part way leaves nothing behind, like a failed read in build_catalog
+            conn.execute("SAVEPOINT source")
+            try:
+                for chunk in _prepared_chunks(p, name):
+                    if chunk.empty:
+                        continue
+                    fps = catalog.fingerprints(chunk, config["keys"]).view(np.int64)
+                    positions = np.arange(pos, pos + len(chunk), dtype=np.int64)
+                    pos += len(chunk)
+                    with metrics.stage("store_insert", rows=len(chunk)):
+                        for s in range(0, len(chunk), INSERT_BATCH):
+                            part = chunk.iloc[s:s + INSERT_BATCH]
+                            rows = zip(fps[s:s + INSERT_BATCH].tolist(), positions[s:s + INSERT_BATCH].tolist(),
+                                       *_sql_values(part, catalog.CLEAN_COLUMNS))
+                            conn.executemany(f"INSERT OR IGNORE INTO staging (fp, pos, {COLUMNS}) "
+                                             f"VALUES (?, ?, {', '.join('?' * len(catalog.CLEAN_COLUMNS))})", rows)
+            except Exception as e:
+                conn.execute("ROLLBACK TO source")
+                warn(f"Could not load {name} CSV: {e}")
+            conn.execute("RELEASE source")
+        # MoodIndex's dataset priority: source order, among datasets that kept any rows
+        kept = {d for (d,) in conn.execute("SELECT DISTINCT Dataset FROM staging")}
+        for _, name in sources:
+            if name in kept and name not in datasets:
+                datasets.append(name)
+        conn.executemany("UPDATE staging SET ds_rank = ? WHERE Dataset = ?", [(r, d) for r, d in enumerate(datasets)])
+        with metrics.stage("store_index"):
+            conn.execute(f"INSERT INTO songs (fp, ds_rank, health, {COLUMNS}) SELECT fp, ds_rank, ?, {COLUMNS} "
+                         f"FROM staging ORDER BY pos", (link_health.UNKNOWN_RANK,))
+            conn.execute("DROP TABLE staging")
+            _apply_health(conn)
+            conn.executescript(INDEXES)
+        count = conn.execute("SELECT COUNT(*) FROM songs").fetchone()[0]
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", [("version", str(STORE_VERSION)), ("songs", str(count)),
+                                                            ("priority", "\n".join(datasets)),
+                                                            ("dedupe", json.dumps(config["keys"]))])
+        conn.commit()
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+    os.replace(tmp, path)
+
+# ---------- Queries ----------
+class SqliteStore:
+    # read-only view of one store file; one connection per thread (Streamlit sessions, the Tk worker)
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        # every thread's connection, so close() can let go of the file before it is deleted
+        self._conns = []
+        meta = dict(self._conn().execute("SELECT key, value FROM meta"))
+        if int(meta.get("version", 0)) != STORE_VERSION:
+            raise ValueError(f"{path}: store version {meta.get('version')} != {STORE_VERSION}")
+        self.priority = [d for d in meta["priority"].split("\n") if d]
+        health = json.loads(meta.get("health", "null"))
+        self.health = tuple(health) if health is not None else None
+        self.dedupe_keys = json.loads(meta["dedupe"])
+        self.neighbors_ready = "neighbors" in meta
+        self._count = int(meta["songs"])
+        self._moods = None
+        self._tags = None
+        self._resolver = None
+        self._query_resolver = None
+        self._counts = {}
+        self._neighbors_job = None
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            with _conns_lock:
+                self._conns.append(conn)
+        return conn
+
+    def _frame(self, rows):
+        return pd.DataFrame(rows, columns=catalog.CLEAN_COLUMNS).astype("str")
+
+    def moods(self):
+        if self._moods is None:
+            rows = self._conn().execute("SELECT DISTINCT mood_norm FROM songs WHERE mood_norm IS NOT NULL")
+            self._moods = sorted(m for (m,) in rows if str(m).strip())
+        return list(self._moods)
+
+    def song_count(self):
+        return self._count
+
+    def _ranks(self, sources):
+        # dataset ranks to read, in priority order (None = every dataset)
+        if sources and "All" not in sources:
+            return [r for r, d in enumerate(self.priority) if d in sources]
+        return None
+
+    def _mood_counts(self, mood):
+        # {ds_rank: rows} for one raw mood ("" = every row); index only, and fixed for this file so counted once
+        counts = self._counts.get(mood)
+        if counts is None:
+            if len(self._counts) > 4096:
+                # typed moods that match nothing shouldn't grow this forever
+                self._counts.clear()
+            where, args = ("mood_norm = ?", [mood]) if mood else ("1", [])
+            counts = self._counts[mood] = dict(self._conn().execute(f"SELECT ds_rank, COUNT(*) FROM songs WHERE {where} GROUP BY ds_rank", args))
+        return counts
+
+    def _page(self, where, args, counts, ranks, n, offset):
+        # (rows offset .. offset+n, total) over the rows matching `where`: each dataset's slice of the page in
+        # priority order, skipping datasets the page doesn't reach by their counts
+        conn = self._conn()
+        total = sum(counts.get(r, 0) for r in ranks)
+        left = total if n is None else n
+        skip, rows = offset, []
+        for r in ranks:
+            c = counts.get(r, 0)
+            if left <= 0:
+                break
+            if skip >= c:
+                skip -= c
+                continue
+            part = conn.execute(f"SELECT {COLUMNS} FROM songs WHERE {where} AND ds_rank = ? ORDER BY health, id LIMIT ? OFFSET ?",
+                                args + [r, left, skip]).fetchall()
+            rows += part
+            left -= len(part)
+            skip = 0
+        return self._frame(rows), total
+
+    def recommend(self, mood, sources=None, n=None, offset=0):
+        # (rows offset .. offset+n, total matches) - same rows and order as MoodIndex.recommend, paged in SQL
+        ranks = self._ranks(sources)
+        where, args = ("mood_norm = ?", [mood]) if mood else ("1", [])
+        ranks = range(len(self.priority)) if ranks is None else ranks
+        return self._page(where, args, self._mood_counts(mood), ranks, n, offset)
+
+    def _tag_map(self):
+        # {canonical mood: raw moods in this file}; the taxonomy is read at query time, so edits to it apply
+        # without touching the file
+        if self._tags is None:
+            self._tags = tags_by_mood(self.moods())
+        return self._tags
+
+    def canonical_moods(self):
+        return sorted(m for m in self._tag_map() if str(m).strip())
+
+    def resolver(self):
+        # built once per store file, like moods()
+        if self._resolver is None:
+            from mood_resolver import MoodResolver, load_synonyms
+            self._resolver = MoodResolver(self.moods(), load_synonyms())
+        return self._resolver
+
+    def query_resolver(self):
+        if self._query_resolver is None:
+            from mood_taxonomy import query_resolver
+            self._query_resolver = query_resolver(self.canonical_moods())
+        return self._query_resolver
+
+    def recommend_query(self, query, n=None, offset=0):
+        # a mood_taxonomy.MoodQuery, paged in SQL like recommend(): a row has one raw mood, so the query is a
+        # mood_norm IN / NOT IN over raw moods, and the totals come from the cached per-mood counts
+        keep, drop = query_tags(query, self._tag_map())
+        ranks = range(len(self.priority)) if query.datasets is None else [r for r, d in enumerate(self.priority) if d in query.datasets]
+        if keep == []:
+            return self._frame([]), 0
+        if keep is None and not drop:
+            return self._page("1", [], self._mood_counts(""), ranks, n, offset)
+        if keep is not None:
+            counts = {r: sum(self._mood_counts(t).get(r, 0) for t in keep) for r in ranks}
+            where, args = f"mood_norm IN ({', '.join('?' * len(keep))})", keep
+        else:
+            counts = {r: self._mood_counts("").get(r, 0) - sum(self._mood_counts(t).get(r, 0) for t in drop) for r in ranks}
+            where, args = f"(mood_norm IS NULL OR mood_norm NOT IN ({', '.join('?' * len(drop))}))", drop
+        return self._page(where, list(args), counts, ranks, n, offset)
+
+    def _by_ids(self, ids):
+        # rows for song ids, in the order given
+        conn, found = self._conn(), {}
+        for s in range(0, len(ids), 500):
+            part = ids[s:s + 500]
+            q = f"SELECT id, {COLUMNS} FROM songs WHERE id IN ({', '.join('?' * len(part))})"
+            found.update((r[0], r[1:]) for r in conn.execute(q, part))
+        return self._frame([found[i] for i in ids])
+
+    def _neighbor_ids(self, sid, wait):
+        # similarity neighbors of song id sid from the file; the table is filled in the background on the first
+        # lookup (wait=True fills it first), and until then songs have none
+        if not self.neighbors_ready:
+            with _jobs_lock:
+                job = self._neighbors_job
+                if job is None:
+                    job = self._neighbors_job = threading.Thread(target=self._fill_neighbors, daemon=True)
+                    job.start()
+            if not wait:
+                return []
+            job.join()
+        found = self._conn().execute("SELECT ids FROM neighbors WHERE id = ?", (sid,)).fetchone()
+        return [] if found is None else np.frombuffer(found[0], dtype=np.int32).tolist()
+
+    def _fill_neighbors(self):
+        try:
+            build_neighbors(self.path)
+            self.neighbors_ready = True
+        except sqlite3.Error:
+            # another process holding the write lock, or the file went stale; the next lookup tries again
+            self._neighbors_job = None
+
+    def similar(self, song, n=10, wait=False):
+        # songs like `song` (a dict with the dedupe key fields), best first, topped up with same-mood songs in
+        # priority order - as catalog.similar_songs, without loading the catalog
+        keys = self.dedupe_keys
+        fp = int(catalog.fingerprints(pd.DataFrame([{k: song.get(k) for k in keys}]), keys).view(np.int64)[0])
+        found = self._conn().execute("SELECT id, mood_norm FROM songs WHERE fp = ?", (fp,)).fetchone()
+        if found is None:
+            return self._frame([])
+        sid, mood = found
+        ids = self._neighbor_ids(sid, wait)[:n]
+        if len(ids) < n:
+            extra = self._conn().execute("SELECT id FROM songs WHERE mood_norm = ? ORDER BY ds_rank, health, id LIMIT ?",
+                                         (mood, n + len(ids) + 1)).fetchall()
+            ids += [i for (i,) in extra if i != sid and i not in ids][:n - len(ids)]
+        return self._by_ids(ids)
+
+    def search(self, text, sources=None, n=20, offset=0):
+        # full-text title/artist/movie search, best match first; every word must match (as a prefix)
+        words = [w.replace('"', '""') for w in str(text).split()]
+        if not words:
+            return self._frame([]), 0
+        match = " ".join(f'"{w}"*' for w in words)
+        ranks = self._ranks(sources)
+        where, args = "songs_fts MATCH ?", [match]
+        if ranks is not None:
+            where += f" AND s.ds_rank IN ({', '.join('?' * len(ranks))})"
+            args += ranks
+        conn = self._conn()
+        total = conn.execute(f"SELECT COUNT(*) FROM songs_fts JOIN songs s ON s.id = songs_fts.rowid WHERE {where}", args).fetchone()[0]
+        cols = ", ".join(f"s.{c}" for c in catalog.CLEAN_COLUMNS)
+        rows = conn.execute(f"SELECT {cols} FROM songs_fts JOIN songs s ON s.id = songs_fts.rowid WHERE {where} "
+                            f"ORDER BY bm25(songs_fts), s.ds_rank, s.health, s.id LIMIT ? OFFSET ?", args + [n, offset]).fetchall()
+        return self._frame(rows), total
+
+    def close(self):
+        # every thread's connection; a thread that queries afterwards would open a new one, so this is for a
+        # store that has been swapped out
+        with _conns_lock:
+            conns, self._conns = self._conns, []
+        for conn in conns:
+            conn.close()
+        self._local = threading.local()
+
+# ---------- Store files ----------
+def _current(store):
+    # bring an open store up to date with the link verdicts, in place
+    if store.health != link_health.current():
+        health = refresh_health(store.path)
+        store.health = None if health is None else tuple(health)
+    return store
+
+_stores = {}
+_lock = threading.Lock()
+_conns_lock = threading.Lock()
+_jobs_lock = threading.Lock()
+
+def store_path(key):
+    return os.path.join(catalog.SNAPSHOT_DIR, f"store-{key}.sqlite")
+
+def load_store(sources=None, rebuild=False, warn=print):
+    # -> (SqliteStore, key); the file is keyed like the catalog snapshot, so CSV edits lead to a new store
+    sources = catalog.default_sources() if sources is None else sources
+    key = catalog.catalog_key(sources)
+    with _lock:
+        store = _stores.get(key)
+        if store is not None and not rebuild:
+            return _current(store), key
+        path = store_path(key)
+        if rebuild or not os.path.exists(path):
+            os.makedirs(catalog.SNAPSHOT_DIR, exist_ok=True)
+            with metrics.stage("store_build"):
+                build_store(sources, path, warn=warn)
+        try:
+            store = SqliteStore(path)
+        except (sqlite3.Error, ValueError, KeyError) as e:
+            warn(f"Rebuilding unreadable catalog store {path}: {e}")
+            build_store(sources, path, warn=warn)
+            store = SqliteStore(path)
+        # the old files go only once nothing here has them open
+        for old in _stores.values():
+            old.close()
+        _stores.clear()
+        _stores[key] = store
+        catalog._remove_stale(path, "store-")
+        return _current(store), key
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Build or query the SQLite catalog store.")
+    ap.add_argument("--rebuild", action="store_true", help="rebuild the store from the CSVs")
+    ap.add_argument("--search", help="full-text search over title/artist/movie")
+    ap.add_argument("--n", type=int, default=10)
+    args = ap.parse_args()
+    store, key = load_store(rebuild=args.rebuild)
+    print(f"{store.song_count()} songs, {len(store.moods())} moods -> {store_path(key)}")
+    if args.search:
+        found, total = store.search(args.search, n=args.n)
+        print(f"{total} matches for '{args.search}'")
+        for i, row in enumerate(found.itertuples(index=False), start=1):
+            print(f"{i}. {row.Title} — {row.Artist} ({row.Movie}, {row.Dataset})")
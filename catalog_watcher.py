@@ -0,0 +1,242 @@
+import hashlib
+import io
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+import catalog
+import link_health
+import metrics
+
+POLL_SECONDS = float(os.environ.get("CATALOG_WATCH_SECONDS", "1.0"))
+SAMPLE_BYTES = 64 * 1024
+
+# ---------- Per-file state ----------
+class _FileState:
+    # what we know about one source file: how far it has been parsed, and enough of its bytes
+    # (running sha256 + head/tail samples) to tell an append from a rewrite without re-reading it
+
+    def __init__(self, path, name):
+        self.path = path
+        self.name = name
+        st = os.stat(path)
+        self.ino = st.st_ino
+        self.size = st.st_size
+        self.mtime_ns = st.st_mtime_ns
+        self.encoding = catalog.sniff_encoding(path)
+        self.header, self.cols = catalog.sniff_header(path, self.encoding)
+        self.hasher = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                self.hasher.update(block)
+        self.head_len = min(self.size, SAMPLE_BYTES)
+        self.head = self._sample(0, self.head_len)
+        self.tail = self._sample(max(0, self.size - SAMPLE_BYTES), self.size)
+        # parse offset: everything up to here is in the catalog; a trailing partial line waits for its newline
+        self.parsed = self.size
+        self.ends_clean = self._ends_with_newline()
+
+    def _sample(self, start, end):
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            return hashlib.sha1(f.read(end - start)).digest()
+
+    def _ends_with_newline(self):
+        if self.size == 0:
+            return True
+        with open(self.path, "rb") as f:
+            f.seek(self.size - 1)
+            return f.read(1) == b"\n"
+
+    def change(self):
+        # -> None (unchanged), "append", or "rewrite"
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return "rewrite"
+        if st.st_ino != self.ino or st.st_size < self.size:
+            return "rewrite"
+        if st.st_size == self.size:
+            if st.st_mtime_ns == self.mtime_ns:
+                return None
+            # touched or edited in place: only the content hash can tell
+            if catalog.file_signature(self.path)["sha256"] != self.hasher.hexdigest():
+                return "rewrite"
+            self.mtime_ns = st.st_mtime_ns
+            return None
+        if self._sample(0, self.head_len) != self.head:
+            return "rewrite"
+        if self._sample(max(0, self.size - SAMPLE_BYTES), self.size) != self.tail:
+            return "rewrite"
+        return "append"
+
+    def read_appended(self):
+        # new complete lines since the last parse -> prepared frame (or None if nothing complete yet)
+        st = os.stat(self.path)
+        with open(self.path, "rb") as f:
+            f.seek(self.size)
+            fresh = f.read(st.st_size - self.size)
+            f.seek(self.parsed)
+            pending = f.read(st.st_size - self.parsed)
+        if not self.ends_clean and self.parsed == self.size and not fresh.startswith((b"\n", b"\r\n")):
+            # the last record grew in place; only a rebuild gets that right
+            raise ValueError("last record was extended")
+        self.hasher.update(fresh)
+        self.size = st.st_size
+        self.mtime_ns = st.st_mtime_ns
+        self.tail = self._sample(max(0, self.size - SAMPLE_BYTES), self.size)
+        cut = pending.rfind(b"\n")
+        if cut < 0:
+            return None
+        complete = pending[:cut + 1]
+        self.parsed += len(complete)
+        self.ends_clean = True
+        positions = sorted(self.header.index(c) for c in catalog.needed_columns(self.cols))
+        chunk = pd.read_csv(io.StringIO(complete.decode(self.encoding)), header=None, names=list(range(len(self.header))),
+                            usecols=positions, dtype=str)
+        chunk.columns = [self.header[p] for p in positions]
+        return catalog.prepare_dataset_vectorized(chunk, self.name, cols=self.cols)
+
+    def signature_stamp(self):
+        return (os.path.abspath(self.path), self.size, self.mtime_ns), self.hasher.hexdigest()
+
+# ---------- Watcher ----------
+class CatalogWatcher:
+    # polls the source CSVs; appends are parsed and merged in place of a rebuild, anything else rebuilds.
+    # Updates build a new (combined, MoodIndex) pair and swap it in, so readers never see a half-applied update.
+
+    def __init__(self, sources=None, interval=POLL_SECONDS, on_update=None, persist=True, warn=print):
+        self.sources = catalog.default_sources() if sources is None else list(sources)
+        self.interval = interval
+        self.on_update = on_update
+        self.persist = persist
+        self.warn = warn
+        self._stop = threading.Event()
+        self._thread = None
+        self._reset()
+
+    def _reset(self, rebuild=False):
+        entry = catalog._load_entry(self.sources, rebuild, self.warn)
+        self.files = {path: _FileState(path, name) for path, name in self.sources if os.path.exists(path)}
+        self.missing = {path for path, _ in self.sources if path not in self.files}
+        self.dedupe = catalog.dedupe_config(self.sources)
+        self.rank = catalog.dedupe_ranks(self.sources, self.dedupe)
+        # fingerprint -> dedupe rank of the dataset that owns it; decides whether an appended duplicate is dropped
+        self.owner = dict(zip(entry["fingerprints"].tolist(), entry["combined"]["Dataset"].map(self.rank).tolist()))
+        self.entry = entry
+        catalog.set_live(self.sources, entry)
+
+    def poll(self):
+        # one check of every source; returns "append", "rebuild" or None
+        if any(os.path.exists(p) for p in self.missing):
+            return self._rebuild()
+        # pick up explicit rebuilds (rebuild_catalog) and link re-ranks made behind our back
+        self.entry = catalog._live.get(tuple(self.sources), self.entry)
+        # new link verdicts re-rank in the background even when nothing reads through catalog (the service)
+        if self.entry.get("health") != link_health.current():
+            catalog.rerank_later(self.sources, self.warn)
+        frames = []
+        appended = False
+        for state in self.files.values():
+            kind = state.change()
+            if kind == "rewrite":
+                return self._rebuild()
+            if kind == "append":
+                appended = True
+                try:
+                    fresh = state.read_appended()
+                except Exception as e:
+                    self.warn(f"Rebuilding catalog, could not apply append to {state.path}: {e}")
+                    return self._rebuild()
+                if fresh is not None and not fresh.empty:
+                    frames.append(fresh)
+        if not frames:
+            # nothing new, or only a partial line that will be picked up once its newline lands
+            if appended:
+                self._refresh_signatures()
+            return None
+        added = pd.concat(frames, ignore_index=True)
+        with metrics.stage("watcher_append", rows=len(added)):
+            return self._merge(added)
+
+    def _merge(self, added):
+        # appended rows -> dedupe against the live catalog -> install (or a rebuild if an owner changes)
+        fps = catalog.fingerprints(added, self.dedupe["keys"])
+        ranks = added["Dataset"].map(self.rank).fillna(len(self.rank)).astype(int).to_numpy()
+        first = catalog.canonical_rows(fps, ranks)
+        added, fps, ranks = added.take(first), fps[first], ranks[first]
+        keep = []
+        for fp, r in zip(fps.tolist(), ranks.tolist()):
+            owner = self.owner.get(fp)
+            if owner is None:
+                keep.append(True)
+            elif r < owner:
+                # a higher-priority catalog now has this song: the older row must go, which needs a rebuild
+                return self._rebuild()
+            else:
+                keep.append(False)
+        keep = np.asarray(keep, dtype=bool)
+        added, fps, ranks = added[keep].reset_index(drop=True), fps[keep], ranks[keep]
+        self._refresh_signatures()
+        if added.empty:
+            self._install(self.entry["combined"], self.entry["index"], self.entry["fingerprints"])
+            return "append"
+        old = self.entry["combined"]
+        combined = pd.concat([old, added], ignore_index=True) if isinstance(old, pd.DataFrame) else old.append(added)
+        ranked = self.entry["index"].link_rank is not None
+        index = self.entry["index"].with_appended(combined, len(old), link_health.link_ranks(added["Link"]) if ranked else None)
+        self.owner.update(zip(fps.tolist(), ranks.tolist()))
+        self._install(combined, index, np.concatenate((self.entry["fingerprints"], fps)))
+        return "append"
+
+    def _refresh_signatures(self):
+        # seed catalog's hash memo from the running hashes so catalog_key never re-reads a grown file
+        for state in self.files.values():
+            stamp, digest = state.signature_stamp()
+            catalog._hash_memo[stamp] = digest
+
+    def _install(self, combined, index, fps):
+        self.entry = catalog.install_catalog(self.sources, combined, index, fps, persist=self.persist, warn=self.warn,
+                                             health=self.entry.get("health"))
+        if self.on_update:
+            self.on_update(self.entry)
+
+    def _rebuild(self):
+        self._reset(rebuild=True)
+        if self.on_update:
+            self.on_update(self.entry)
+        return "rebuild"
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                self.warn(f"Catalog watcher error: {e}")
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="catalog-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        catalog.set_live(self.sources, None)
+
+_watchers = {}
+_watchers_lock = threading.Lock()
+
+def start_watching(sources=None, interval=POLL_SECONDS, on_update=None, warn=print):
+    # one watcher per source list per process (Streamlit reruns call this on every interaction)
+    sources = catalog.default_sources() if sources is None else list(sources)
+    with _watchers_lock:
+        watcher = _watchers.get(tuple(sources))
+        if watcher is None:
+            watcher = _watchers[tuple(sources)] = CatalogWatcher(sources, interval, on_update, warn=warn).start()
+        return watcher
@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+
+from catalog import CLEAN_COLUMNS, extract_video_ids, search_links_vectorized
+
+CATEGORY_COLUMNS = ["Artist", "Movie", "Mood", "mood_norm", "Dataset"]
+# link kinds: how Link is rebuilt when a row is displayed
+LINK_NONE, LINK_DIRECT, LINK_SEARCH, LINK_OTHER = 0, 1, 2, 3
+
+# ---------- Compact catalog ----------
+class CompactCatalog:
+    # The combined catalog with low-cardinality text as categoricals and Link as (kind, 11-byte video id):
+    #   direct -> https://youtu.be/<id>   search -> rebuilt from Title/Artist/Movie   other -> kept verbatim (sparse)
+    # Prepared links are already canonical (catalog.resolve_link), so direct links round-trip exactly.
+    # Supports the parts of the DataFrame API MoodIndex and the front ends use (len/empty/columns/[col]/take/
+    # iloc-free appends), expanding to plain rows only on take().
+
+    columns = CLEAN_COLUMNS
+
+    def __init__(self, frame, link_kind, video_id, link_other):
+        self.frame = frame
+        self.link_kind = link_kind
+        self.video_id = video_id
+        self.link_other = link_other
+
+    @classmethod
+    def from_frame(cls, combined):
+        combined = combined.reset_index(drop=True)
+        frame = pd.DataFrame({"Title": combined["Title"]})
+        for c in CATEGORY_COLUMNS:
+            frame[c] = combined[c].astype("category")
+        links = combined["Link"].astype(object).where(combined["Link"].notna(), "").astype(str)
+        kind = np.full(len(combined), LINK_OTHER, dtype=np.int8)
+        kind[(links == "").to_numpy()] = LINK_NONE
+        ids = extract_video_ids(links.to_numpy(dtype=object))
+        direct = ids != None  # noqa: E711
+        kind[direct] = LINK_DIRECT
+        video_id = np.zeros(len(combined), dtype="S11")
+        video_id[direct] = np.char.encode(ids[direct].astype(str), "ascii")
+        # a search link is only dropped if we can regenerate exactly the same string
+        maybe = np.flatnonzero(kind == LINK_OTHER)
+        if len(maybe):
+            sub = combined.iloc[maybe]
+            regen = search_links_vectorized(sub["Title"], sub["Artist"], sub["Movie"]).to_numpy(dtype=object)
+            same = regen == links.iloc[maybe].to_numpy(dtype=object)
+            kind[maybe[same]] = LINK_SEARCH
+        other_pos = np.flatnonzero(kind == LINK_OTHER)
+        link_other = dict(zip(other_pos.tolist(), links.iloc[other_pos].tolist()))
+        return cls(frame, kind, video_id, link_other)
+
+    def __len__(self):
+        return len(self.frame)
+
+    @property
+    def empty(self):
+        return len(self.frame) == 0
+
+    def links(self, rows):
+        rows = np.asarray(rows, dtype=np.int64)
+        kind = self.link_kind[rows]
+        out = np.full(len(rows), "", dtype=object)
+        direct = kind == LINK_DIRECT
+        if direct.any():
+            out[direct] = "https://youtu.be/" + np.char.decode(self.video_id[rows[direct]], "ascii").astype(object)
+        search = kind == LINK_SEARCH
+        if search.any():
+            sub = self.frame.iloc[rows[search]]
+            out[search] = search_links_vectorized(sub["Title"], sub["Artist"].astype(object), sub["Movie"].astype(object)).to_numpy(dtype=object)
+        for i in np.flatnonzero(kind == LINK_OTHER):
+            out[i] = self.link_other[int(rows[i])]
+        return out
+
+    def __getitem__(self, col):
+        if col == "Link":
+            return pd.Series(self.links(np.arange(len(self))), name="Link")
+        return self.frame[col]
+
+    def take(self, rows):
+        rows = np.asarray(rows, dtype=np.int64)
+        data = {c: self.frame[c].take(rows).to_numpy(dtype=object) for c in CLEAN_COLUMNS if c != "Link"}
+        data["Link"] = self.links(rows)
+        return pd.DataFrame({c: data[c] for c in CLEAN_COLUMNS})
+
+    def records(self, rows):
+        # JSON-ready dicts for the service (missing values -> "")
+        df = self.take(rows)
+        return df.astype(object).where(df.notna(), "").to_dict("records")
+
+    def to_frame(self):
+        return self.take(np.arange(len(self)))
+
+    def append(self, added):
+        # new CompactCatalog with `added` (a plain prepared frame) after the existing rows
+        more = CompactCatalog.from_frame(added)
+        frame = pd.concat([self.frame, more.frame], ignore_index=True)
+        for c in CATEGORY_COLUMNS:
+            cats = self.frame[c].cat.categories.union(more.frame[c].cat.categories)
+            frame[c] = pd.Categorical(pd.concat([self.frame[c].astype(object), more.frame[c].astype(object)], ignore_index=True), categories=cats)
+        offset = len(self)
+        other = dict(self.link_other)
+        other.update({offset + k: v for k, v in more.link_other.items()})
+        return CompactCatalog(frame, np.concatenate((self.link_kind, more.link_kind)), np.concatenate((self.video_id, more.video_id)), other)
+
+    def memory_usage(self):
+        cols = {c: int(self.frame[c].memory_usage(deep=True, index=False)) for c in self.frame.columns}
+        cols["link_kind"] = int(self.link_kind.nbytes)
+        cols["video_id"] = int(self.video_id.nbytes)
+        cols["link_other"] = int(sum(len(v) + 64 for v in self.link_other.values()))
+        return cols
+
+# ---------- Memory report ----------
+def memory_report(combined):
+    compact = CompactCatalog.from_frame(combined)
+    current = {c: int(combined[c].memory_usage(deep=True, index=False)) for c in combined.columns}
+    packed = compact.memory_usage()
+    kinds = np.bincount(compact.link_kind, minlength=4)
+    return {
+        "rows": len(combined),
+        "current_bytes": sum(current.values()),
+        "compact_bytes": sum(packed.values()),
+        "current_columns": current,
+        "compact_columns": packed,
+        "link_kinds": {"none": int(kinds[LINK_NONE]), "direct": int(kinds[LINK_DIRECT]), "search": int(kinds[LINK_SEARCH]), "other": int(kinds[LINK_OTHER])},
+    }
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    from catalog import build_combined, default_sources
+    ap = argparse.ArgumentParser(description="Compare catalog memory: current DataFrame vs compact layout.")
+    ap.add_argument("--dir", help="catalog directory (default: CATALOG_DIR)")
+    args = ap.parse_args()
+    report = memory_report(build_combined(default_sources(args.dir)))
+    print(json.dumps(report, indent=2))
+    print(f"{report['current_bytes'] / 1e6:.2f} MB -> {report['compact_bytes'] / 1e6:.2f} MB "
+          f"({report['current_bytes'] / max(1, report['compact_bytes']):.1f}x smaller)")
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+# Link health: check the catalog's Link values concurrently and remember the answers on disk.
+#   python link_health.py                      # check every due link, print a summary
+#   python link_health.py --concurrency 64 --rate 10 --limit 5000
+# Verdicts live in LINK_HEALTH_DB (SQLite: url, status, code, checked); catalog reads them back through
+# link_ranks() so songs with verified links come first within each mood and dataset.
+# YouTube video links are checked through oEmbed (the watch page answers 200 even for removed videos);
+# search-fallback links are never fetched.
+import asyncio
+import os
+import sqlite3
+import time
+import urllib.parse
+
+import numpy as np
+
+LINK_HEALTH_DB = os.environ.get("LINK_HEALTH_DB", os.path.join(os.environ.get("CATALOG_SNAPSHOT_DIR", ".catalog_cache"), "link_health.sqlite"))
+CONCURRENCY = 32
+PER_HOST_RATE = 5.0  # requests per second to any one host
+CONNECTIONS_PER_HOST = 8  # open keep-alive connections per host; requests queue for a free one
+TIMEOUT = 10.0
+OEMBED_URL = "https://www.youtube.com/oembed"
+# how long a verdict holds before the link is due again
+MAX_AGE = {"ok": 7 * 86400, "dead": 86400, "error": 3600}
+# ranking tiers: verified first, then unchecked / search fallbacks, dead or malformed last
+RANK = {"ok": 0, "dead": 2}
+UNKNOWN_RANK = 1
+USER_AGENT = "mood-song-recommender-linkcheck/1.0"
+# readers (catalog, catalog_store) look for new verdicts at most this often; a running check flushes every few seconds
+RERANK_SECONDS = float(os.environ.get("LINK_HEALTH_RERANK", "30"))
+
+# ---------- Verdict cache ----------
+class HealthCache:
+    # url -> (status, http code, checked at); one short-lived connection per call so any thread can use it
+
+    def __init__(self, path=LINK_HEALTH_DB):
+        self.path = path
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("CREATE TABLE IF NOT EXISTS links (url TEXT PRIMARY KEY, status TEXT, code INTEGER, checked REAL)")
+        return conn
+
+    def get_many(self, urls):
+        out = {}
+        conn = self._connect()
+        try:
+            urls = list(urls)
+            for s in range(0, len(urls), 500):
+                part = urls[s:s + 500]
+                q = f"SELECT url, status, code, checked FROM links WHERE url IN ({', '.join('?' * len(part))})"
+                out.update((u, (st, code, checked)) for u, st, code, checked in conn.execute(q, part))
+        finally:
+            conn.close()
+        return out
+
+    def put_many(self, rows):
+        # rows: [(url, status, code, checked)]
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO links VALUES (?, ?, ?, ?)", rows)
+        finally:
+            conn.close()
+
+    def due(self, urls, now=None):
+        # the urls with no verdict, or one older than MAX_AGE for its status
+        now = time.time() if now is None else now
+        known = self.get_many(urls)
+        return [u for u in urls if u not in known or now - known[u][2] > MAX_AGE.get(known[u][0], 0)]
+
+def stamp(path=LINK_HEALTH_DB):
+    # changes whenever the verdicts do; None while nothing has been checked
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_size, st.st_mtime_ns)
+
+_current = {}
+
+def current(path=LINK_HEALTH_DB):
+    # stamp(), re-read at most every RERANK_SECONDS
+    now = time.monotonic()
+    seen = _current.get(path)
+    if seen is None or now - seen[0] >= RERANK_SECONDS:
+        seen = _current[path] = (now, stamp(path))
+    return seen[1]
+
+def link_ranks(links, path=LINK_HEALTH_DB):
+    # per-row ranking tier for a Link column (see RANK), or None when no verdicts exist yet. Expired verdicts
+    # still count: they are the best information until the next check.
+    if stamp(path) is None:
+        return None
+    import pandas as pd
+    codes, uniques = pd.factorize(pd.Series(links).astype(object), use_na_sentinel=True)
+    try:
+        if len(uniques) <= 5000:
+            # a watcher append: look up just these
+            found = HealthCache(path).get_many(uniques.tolist())
+            known = pd.DataFrame([(u, v[0]) for u, v in found.items()], columns=["url", "status"])
+        else:
+            conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+            try:
+                known = pd.DataFrame(conn.execute("SELECT url, status FROM links").fetchall(), columns=["url", "status"])
+            finally:
+                conn.close()
+    except sqlite3.Error:
+        return None
+    tier = known["status"].map(RANK).fillna(UNKNOWN_RANK).astype(np.int8).to_numpy()
+    pos = pd.Index(known["url"]).get_indexer(uniques)
+    by_unique = np.where(pos >= 0, tier[np.maximum(pos, 0)], UNKNOWN_RANK).astype(np.int8)
+    return np.append(by_unique, np.int8(UNKNOWN_RANK))[codes]
+
+# ---------- What to fetch ----------
+def classify(link):
+    # -> ("skip", None) for search fallbacks, ("dead", None) for malformed links, ("check", probe url) otherwise
+    parts = urllib.parse.urlsplit(str(link).strip())
+    host = (parts.hostname or "").lower()
+    if parts.scheme not in ("http", "https") or not host or " " in host:
+        return "dead", None
+    if host.endswith("youtube.com") and parts.path == "/results":
+        return "skip", None
+    video = None
+    if host == "youtu.be":
+        video = parts.path.strip("/").split("/")[0]
+    elif host.endswith("youtube.com") and parts.path == "/watch":
+        video = urllib.parse.parse_qs(parts.query).get("v", [""])[0]
+    if video is not None:
+        return "check", ("oembed", video)
+    return "check", ("direct", link)
+
+def verdict(kind, code):
+    # HTTP status -> "ok" / "dead" / "error" (error = try again later)
+    if kind == "oembed":
+        # 401/403: the video exists but can't be embedded
+        return "ok" if code in (200, 401, 403) else "dead" if code in (400, 404) else "error"
+    if 200 <= code < 400:
+        return "ok"
+    return "dead" if code in (404, 410) else "error"
+
+# ---------- HTTP/1.1 client with per-host pools ----------
+class _HostPool:
+    def __init__(self, rate, connections):
+        self.idle = []
+        self.slots = asyncio.Semaphore(connections)
+        self.interval = 1.0 / rate if rate else 0.0
+        self.next_slot = 0.0
+        self.lock = asyncio.Lock()
+
+    async def wait_turn(self):
+        # spaces request starts to `rate` per second for this host
+        async with self.lock:
+            now = time.monotonic()
+            delay = self.next_slot - now
+            self.next_slot = max(now, self.next_slot) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+class LinkChecker:
+    # checks urls with at most `concurrency` requests in flight overall, `rate` request starts per second per
+    # host, and at most `connections` reused keep-alive connections per host
+
+    def __init__(self, concurrency=CONCURRENCY, rate=PER_HOST_RATE, timeout=TIMEOUT, oembed_url=OEMBED_URL,
+                 connections=CONNECTIONS_PER_HOST):
+        self.concurrency = concurrency
+        self.rate = rate
+        self.connections = connections
+        self.timeout = timeout
+        self.oembed_url = oembed_url
+        self.pools = {}
+        self.connections_opened = 0
+        self.requests = 0
+
+    def _pool(self, key):
+        if key not in self.pools:
+            self.pools[key] = _HostPool(self.rate, self.connections)
+        return self.pools[key]
+
+    async def _connection(self, key):
+        pool = self.pools[key]
+        while pool.idle:
+            reader, writer = pool.idle.pop()
+            if not reader.at_eof() and not writer.is_closing():
+                return reader, writer
+            writer.close()
+        scheme, host, port = key
+        ssl = None
+        if scheme == "https":
+            import ssl as ssl_module
+            ssl = ssl_module.create_default_context()
+        self.connections_opened += 1
+        return await asyncio.open_connection(host, port, ssl=ssl, server_hostname=host if ssl else None)
+
+    async def _read_response(self, reader, method):
+        # -> (status, keep_alive); the body is read and dropped so the connection can be reused
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError("connection closed")
+        version, code = status_line.decode("latin1").split()[:2]
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            k, _, v = line.decode("latin1").partition(":")
+            headers[k.strip().lower()] = v.strip()
+        keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+        code = int(code)
+        if method == "HEAD" or code in (204, 304) or 100 <= code < 200:
+            return code, keep_alive
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                await reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        elif "content-length" in headers:
+            await reader.readexactly(int(headers["content-length"]))
+        else:
+            await reader.read()
+            keep_alive = False
+        return code, keep_alive
+
+    async def _request(self, url, method):
+        parts = urllib.parse.urlsplit(url)
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        key = (parts.scheme, parts.hostname, port)
+        pool = self._pool(key)
+        target = (parts.path or "/") + ("?" + parts.query if parts.query else "")
+        async with pool.slots:
+            await pool.wait_turn()
+            # the timeout covers the exchange, not the wait for a connection or a rate-limit slot
+            return await asyncio.wait_for(self._exchange(key, pool, method, target, parts.netloc), self.timeout)
+
+    async def _exchange(self, key, pool, method, target, netloc):
+        for attempt in (0, 1):
+            reader, writer = await self._connection(key)
+            try:
+                writer.write(f"{method} {target} HTTP/1.1\r\nHost: {netloc}\r\nUser-Agent: {USER_AGENT}\r\n"
+                             f"Accept: */*\r\nConnection: keep-alive\r\n\r\n".encode("latin1"))
+                await writer.drain()
+                self.requests += 1
+                code, keep_alive = await self._read_response(reader, method)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                writer.close()
+                if attempt:
+                    raise
+                continue  # a pooled connection the server had already closed: retry once on a fresh one
+            except BaseException:
+                # timed out or cancelled mid-response: the connection is in an unknown state
+                writer.close()
+                raise
+            if keep_alive:
+                pool.idle.append((reader, writer))
+            else:
+                writer.close()
+            return code
+
+    async def check(self, url):
+        # -> (status, code); status is "ok", "dead", "error" or "skip"
+        action, probe = classify(url)
+        if action != "check":
+            return action, None
+        kind, target = probe
+        if kind == "oembed":
+            target = self.oembed_url + "?" + urllib.parse.urlencode(
+                {"format": "json", "url": f"https://www.youtube.com/watch?v={target}"})
+        try:
+            code = await self._request(target, "GET" if kind == "oembed" else "HEAD")
+            if kind == "direct" and code in (405, 501):
+                # servers that don't do HEAD
+                code = await self._request(target, "GET")
+        except (OSError, asyncio.TimeoutError, ValueError, asyncio.IncompleteReadError):
+            return "error", None
+        return verdict(kind, code), code
+
+    async def check_all(self, urls, on_result=None):
+        # -> {url: (status, code)}; on_result(url, status, code) as each one finishes
+        sem = asyncio.Semaphore(self.concurrency)
+        results = {}
+
+        async def one(url):
+            async with sem:
+                status, code = await self.check(url)
+            results[url] = (status, code)
+            if on_result:
+                on_result(url, status, code)
+
+        try:
+            await asyncio.gather(*(one(u) for u in urls))
+        finally:
+            for pool in self.pools.values():
+                for _, writer in pool.idle:
+                    writer.close()
+            # pools hold this event loop's locks; a later asyncio.run gets fresh ones
+            self.pools = {}
+        return results
+
+def check_links(links, cache=None, checker=None, force=False, flush_every=500):
+    # check the distinct, due links and store the verdicts; -> {url: (status, code)} for what was checked
+    cache = HealthCache() if cache is None else cache
+    checker = LinkChecker() if checker is None else checker
+    urls = list(dict.fromkeys(str(u) for u in links if isinstance(u, str) and u.strip()))
+    urls = urls if force else cache.due(urls)
+    pending = []
+
+    def on_result(url, status, code):
+        if status != "skip":
+            pending.append((url, status, code, time.time()))
+        if len(pending) >= flush_every:
+            cache.put_many(pending)
+            pending.clear()
+
+    results = asyncio.run(checker.check_all(urls, on_result))
+    if pending:
+        cache.put_many(pending)
+    return results
+
+if __name__ == "__main__":
+    import argparse
+    from collections import Counter
+    ap = argparse.ArgumentParser(description="Check the catalog's links and cache the results.")
+    ap.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    ap.add_argument("--rate", type=float, default=PER_HOST_RATE, help="request starts per second per host")
+    ap.add_argument("--timeout", type=float, default=TIMEOUT)
+    ap.add_argument("--limit", type=int, help="check at most this many due links")
+    ap.add_argument("--force", action="store_true", help="recheck links whose verdict hasn't expired")
+    args = ap.parse_args()
+    import catalog
+    links = catalog.load_catalog()["Link"]
+    cache = HealthCache()
+    urls = list(dict.fromkeys(u for u in links if isinstance(u, str) and u.strip()))
+    due = urls if args.force else cache.due(urls)
+    due = due[:args.limit] if args.limit else due
+    checker = LinkChecker(args.concurrency, args.rate, args.timeout)
+    t0 = time.perf_counter()
+    results = check_links(due, cache, checker, force=True)
+    seconds = time.perf_counter() - t0
+    counts = Counter(status for status, _ in results.values())
+    print(f"{len(urls)} distinct links, {len(due)} due, checked in {seconds:.1f}s "
+          f"({checker.requests} requests over {checker.connections_opened} connections): "
+          + ", ".join(f"{k} {v}" for k, v in sorted(counts.items())))
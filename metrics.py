@@ -0,0 +1,214 @@
+# Per-stage latency / row / memory instrumentation, off unless MOOD_METRICS=1 (or metrics.enable()).
+#   with metrics.stage("prepare") as m:
+#       df = prepare(...)
+#       m.rows = len(df)
+# Read it back as summary() rows (app.py debug sidebar) or Prometheus text: render_prometheus(), GET /metrics
+# on service.py, or the exporter start_exporter() runs on MOOD_METRICS_PORT.
+# Disabled, stage() returns a shared no-op object, so instrumented code pays one flag check per stage.
+import bisect
+import os
+import threading
+import time
+
+ENABLED = os.environ.get("MOOD_METRICS", "0") == "1"
+EXPORTER_PORT = int(os.environ.get("MOOD_METRICS_PORT", "0"))
+# histogram upper bounds in seconds (cumulative, Prometheus style); queries are sub-millisecond, builds take seconds
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+PREFIX = "mood_stage"
+
+_stats = {}
+_lock = threading.Lock()
+
+def enable(on=True):
+    global ENABLED
+    ENABLED = on
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+# ---------- Recording ----------
+_PAGE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+_statm = (None, None)  # (pid, fd)
+
+def _rss():
+    # resident set size in bytes (Linux); None elsewhere, which just leaves memory columns empty.
+    # The statm fd stays open (pread is a fraction of open/read/close per stage), reopened after a fork:
+    # /proc/self was resolved to the parent when it was opened.
+    global _statm
+    try:
+        pid, fd = _statm
+        if pid != os.getpid():
+            fd = os.open("/proc/self/statm", os.O_RDONLY)
+            _statm = (os.getpid(), fd)
+        return int(os.pread(fd, 128, 0).split()[1]) * _PAGE
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+class _Off:
+    # what stage() hands out while disabled; attribute writes (m.rows = ...) land here and are ignored
+    rows = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_OFF = _Off()
+
+class _Stage:
+    __slots__ = ("name", "rows", "t0", "rss0")
+
+    def __init__(self, name, rows):
+        self.name = name
+        self.rows = rows
+
+    def __enter__(self):
+        self.rss0 = _rss()
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.t0
+        rss = _rss()
+        observe(self.name, seconds, self.rows, None if rss is None or self.rss0 is None else rss - self.rss0)
+        return False
+
+def stage(name, rows=None):
+    if not ENABLED:
+        return _OFF
+    return _Stage(name, rows)
+
+def timed_iter(name, iterable):
+    # time each next() of iterable (e.g. a read_csv chunk reader) as one `name` stage, rows = len(item)
+    if not ENABLED:
+        return iterable
+    return _timed_iter(name, iter(iterable))
+
+def _timed_iter(name, it):
+    while True:
+        rss0, t0 = _rss(), time.perf_counter()
+        item = next(it, _OFF)
+        if item is _OFF:
+            return
+        seconds, rss = time.perf_counter() - t0, _rss()
+        observe(name, seconds, len(item), None if rss is None or rss0 is None else rss - rss0)
+        yield item
+
+def observe(name, seconds, rows=None, memory_delta=None):
+    with _lock:
+        s = _stats.get(name)
+        if s is None:
+            s = _stats[name] = {"count": 0, "sum": 0.0, "max": 0.0, "buckets": [0] * (len(BUCKETS) + 1),
+                                "rows": 0, "memory_delta": 0, "last_memory_delta": None}
+        s["count"] += 1
+        s["sum"] += seconds
+        s["max"] = max(s["max"], seconds)
+        s["buckets"][bisect.bisect_left(BUCKETS, seconds)] += 1
+        if rows is not None:
+            s["rows"] += int(rows)
+        if memory_delta is not None:
+            s["memory_delta"] += memory_delta
+            s["last_memory_delta"] = memory_delta
+
+# ---------- Reporting ----------
+def _quantile(s, q):
+    # upper bound of the bucket holding the q-th observation (what a Prometheus histogram_quantile can resolve)
+    target, seen = q * s["count"], 0
+    for bound, n in zip(BUCKETS + (float("inf"),), s["buckets"]):
+        seen += n
+        if seen >= target:
+            return min(bound, s["max"])
+    return s["max"]
+
+def summary():
+    # one dict per stage, slowest total first (for st.dataframe / printing)
+    with _lock:
+        stats = {k: dict(v, buckets=list(v["buckets"])) for k, v in _stats.items()}
+    out = []
+    for name, s in sorted(stats.items(), key=lambda kv: -kv[1]["sum"]):
+        out.append({
+            "stage": name, "calls": s["count"], "total_ms": round(s["sum"] * 1000, 2),
+            "mean_ms": round(s["sum"] / s["count"] * 1000, 3), "p95_ms": round(_quantile(s, 0.95) * 1000, 3),
+            "max_ms": round(s["max"] * 1000, 3), "rows": s["rows"],
+            "rows_per_s": round(s["rows"] / s["sum"]) if s["rows"] and s["sum"] > 0 else None,
+            "mem_delta_mb": round(s["memory_delta"] / 1e6, 2) if s["last_memory_delta"] is not None else None,
+        })
+    return out
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def render_prometheus(extra=None):
+    # text exposition format 0.0.4; extra: {metric_name: value} gauges appended as-is
+    with _lock:
+        stats = {k: dict(v, buckets=list(v["buckets"])) for k, v in _stats.items()}
+    lines = [f"# HELP {PREFIX}_seconds Wall time per pipeline stage.", f"# TYPE {PREFIX}_seconds histogram"]
+    for name, s in sorted(stats.items()):
+        label, cumulative = _label(name), 0
+        for bound, n in zip(BUCKETS + (float("inf"),), s["buckets"]):
+            cumulative += n
+            le = "+Inf" if bound == float("inf") else repr(float(bound))
+            lines.append(f'{PREFIX}_seconds_bucket{{stage="{label}",le="{le}"}} {cumulative}')
+        lines.append(f'{PREFIX}_seconds_sum{{stage="{label}"}} {s["sum"]:.9f}')
+        lines.append(f'{PREFIX}_seconds_count{{stage="{label}"}} {s["count"]}')
+    lines += [f"# HELP {PREFIX}_rows_total Rows processed per stage.", f"# TYPE {PREFIX}_rows_total counter"]
+    lines += [f'{PREFIX}_rows_total{{stage="{_label(k)}"}} {s["rows"]}' for k, s in sorted(stats.items())]
+    lines += [f"# HELP {PREFIX}_rss_delta_bytes Resident memory change summed over a stage's runs.",
+              f"# TYPE {PREFIX}_rss_delta_bytes gauge"]
+    lines += [f'{PREFIX}_rss_delta_bytes{{stage="{_label(k)}"}} {s["memory_delta"]}'
+              for k, s in sorted(stats.items()) if s["last_memory_delta"] is not None]
+    for metric, value in (extra or {}).items():
+        lines += [f"# TYPE {metric} gauge", f"{metric} {value}"]
+    return "\n".join(lines) + "\n"
+
+def process_metrics():
+    # gauges every dump carries: shared result cache (if the engine is loaded) and current RSS
+    import sys
+    extra = {}
+    recommender = sys.modules.get("recommender")
+    if recommender is not None:
+        for k, v in recommender.RESULTS.stats().items():
+            extra[f"mood_result_cache_{k}"] = v
+    rss = _rss()
+    if rss is not None:
+        extra["mood_process_resident_bytes"] = rss
+    return extra
+
+# ---------- Exporter ----------
+_exporter = None
+
+def start_exporter(port=None, host="127.0.0.1"):
+    # serve GET /metrics from a daemon thread (once per process); no-op without a port or while disabled
+    global _exporter
+    port = EXPORTER_PORT if port is None else port
+    if not ENABLED or not port:
+        return _exporter
+    with _lock:
+        if _exporter is None:
+            _exporter = _make_exporter(host, port)
+    return _exporter
+
+def _make_exporter(host, port):
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render_prometheus(process_metrics()).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-exporter", daemon=True).start()
+    return server
@@ -0,0 +1,234 @@
+import numpy as np
+import pandas as pd
+
+DEFAULT_PRIORITY = ("Telugu", "Hindi")
+# an excluded mood on at least 1/DENSE_SHARE of the rows gets a bitset (n/8 bytes); rarer ones are cleared
+# through their position arrays, which are smaller than that
+DENSE_SHARE = 64
+
+# ---------- Inverted mood index ----------
+class MoodIndex:
+    # mood_norm -> row positions (and (mood, dataset) -> row positions), already in dataset priority order.
+    # The catalog is deduplicated by fingerprint at build time, so a query is a dict lookup plus a take.
+    # link_rank (optional, one small int per row, lower first - link_health.link_ranks) orders rows within
+    # each dataset ahead of position, so songs with verified links come first.
+
+    def __init__(self, combined, priority=DEFAULT_PRIORITY, link_rank=None):
+        self.combined = combined
+        self.link_rank = None if link_rank is None else np.asarray(link_rank, dtype=np.int8)
+        datasets = list(pd.unique(combined["Dataset"])) if not combined.empty else []
+        self.priority = [d for d in priority if d in datasets] + [d for d in datasets if d not in priority]
+        self.by_mood = {}
+        self.by_mood_dataset = {}
+        self.by_dataset = {}
+        self._moods = None
+        self.all_rows = np.arange(len(combined), dtype=np.int64)
+        self._bits = None
+        self._tags = None
+        self._resolver = None
+        self._query_resolver = None
+        if combined.empty:
+            return
+        rank = {d: i for i, d in enumerate(self.priority)}
+        ds_rank = np.asarray(combined["Dataset"].map(rank), dtype=np.int64)
+        mood_codes, moods = pd.factorize(combined["mood_norm"], sort=False)
+        # one stable sort groups rows by mood, then dataset priority, then link rank, then original position
+        keys = (self.all_rows, ds_rank, mood_codes) if self.link_rank is None else (self.all_rows, self.link_rank, ds_rank, mood_codes)
+        order = np.lexsort(keys)
+        sorted_moods = mood_codes[order]
+        sorted_ds = ds_rank[order]
+        bounds = np.flatnonzero(np.diff(sorted_moods)) + 1
+        starts = np.concatenate(([0], bounds))
+        ends = np.concatenate((bounds, [len(order)]))
+        for s, e in zip(starts, ends):
+            code = sorted_moods[s]
+            if code < 0:
+                continue
+            mood = moods[code]
+            rows = order[s:e]
+            self.by_mood[mood] = rows
+            ds_slice = sorted_ds[s:e]
+            ds_bounds = np.flatnonzero(np.diff(ds_slice)) + 1
+            for ds_rows in np.split(np.arange(e - s), ds_bounds):
+                self.by_mood_dataset[(mood, self.priority[ds_slice[ds_rows[0]]])] = rows[ds_rows]
+        for d in self.priority:
+            self.by_dataset[d] = self._ranked(np.flatnonzero(ds_rank == rank[d]))
+        self.all_rows = np.concatenate([self.by_dataset[d] for d in self.priority])
+
+    def _ranked(self, rows):
+        # rows (ascending positions) reordered by link rank, position order kept within a rank
+        if self.link_rank is None:
+            return rows
+        return rows[np.argsort(self.link_rank[rows], kind="stable")]
+
+    def with_appended(self, combined, start, added_rank=None):
+        # new index for `combined` whose rows [start:] were appended to self.combined; self is left untouched
+        # so readers holding it keep a consistent view. added_rank: link ranks of the new rows (unknown if None)
+        new = MoodIndex.__new__(MoodIndex)
+        new.combined = combined
+        new.link_rank = self.link_rank
+        if self.link_rank is not None:
+            if added_rank is None:
+                import link_health
+                added_rank = np.full(len(combined) - start, link_health.UNKNOWN_RANK)
+            new.link_rank = np.concatenate((self.link_rank, np.asarray(added_rank, dtype=np.int8)))
+        new.by_mood = dict(self.by_mood)
+        new.by_mood_dataset = dict(self.by_mood_dataset)
+        new.by_dataset = dict(self.by_dataset)
+        new._moods = None
+        added = pd.DataFrame({"mood_norm": combined["mood_norm"].iloc[start:], "Dataset": combined["Dataset"].iloc[start:]})
+        new.priority = list(self.priority) + [d for d in pd.unique(added["Dataset"]) if d not in self.priority]
+        empty = np.empty(0, dtype=np.int64)
+        touched = {}
+        for (mood, ds), rel in added.groupby(["mood_norm", "Dataset"], sort=False, observed=True).indices.items():
+            rows = start + np.asarray(rel, dtype=np.int64)
+            new.by_mood_dataset[(mood, ds)] = new._merged(new.by_mood_dataset.get((mood, ds), empty), rows)
+            touched.setdefault(mood, []).append(rows)
+        for ds, rel in added.groupby("Dataset", sort=False, observed=True).indices.items():
+            new.by_dataset[ds] = new._merged(new.by_dataset.get(ds, empty), start + np.asarray(rel, dtype=np.int64))
+        for mood in touched:
+            new.by_mood[mood] = np.concatenate([new.by_mood_dataset[(mood, d)] for d in new.priority if (mood, d) in new.by_mood_dataset])
+        new.all_rows = np.concatenate([new.by_dataset[d] for d in new.priority]) if new.priority else empty
+        # bitsets built so far take the new rows' bits rather than being rebuilt
+        new._bits = None
+        if self._bits is not None:
+            from mood_taxonomy import canonical_tags
+            grown = {}
+            for mood, parts in touched.items():
+                for tag in canonical_tags(mood):
+                    if tag in self._bits.bits:
+                        grown.setdefault(tag, []).extend(parts)
+            new._bits = self._bits.extended(len(combined), {t: np.concatenate(p) for t, p in grown.items()})
+        # the resolvers only index mood names, so they carry over unless the append brought a new one
+        same = all(m in self.by_mood for m in touched)
+        new._tags = self._tags if same else None
+        new._resolver = self._resolver if same else None
+        new._query_resolver = self._query_resolver if same else None
+        return new
+
+    def _merged(self, old, rows):
+        # a group's existing rows plus appended ones, still in (link rank, position) order
+        both = np.concatenate((old, rows))
+        if self.link_rank is None:
+            return both
+        return both[np.lexsort((both, self.link_rank[both]))]
+
+    def moods(self):
+        if self._moods is None:
+            self._moods = sorted(m for m in self.by_mood if str(m).strip())
+        return list(self._moods)
+
+    def mood_bits(self):
+        # bitsets of the dense excluded moods, filled in as queries need them
+        if self._bits is None:
+            from mood_taxonomy import MoodBits
+            self._bits = MoodBits(len(self.combined))
+        return self._bits
+
+    def _tag_map(self):
+        # {canonical mood: raw moods in this catalog}
+        if self._tags is None:
+            from mood_taxonomy import tags_by_mood
+            self._tags = tags_by_mood(list(self.by_mood))
+        return self._tags
+
+    def canonical_moods(self):
+        return sorted(m for m in self._tag_map() if str(m).strip())
+
+    def resolver(self):
+        # typed mood -> mood, built once per index (a catalog swap brings a new index) rather than looked up
+        # by the whole mood list on every call
+        if self._resolver is None:
+            from mood_resolver import MoodResolver, load_synonyms
+            self._resolver = MoodResolver(self.moods(), load_synonyms())
+        return self._resolver
+
+    def query_resolver(self):
+        # the same over canonical moods, for mood_taxonomy.parse_query
+        if self._query_resolver is None:
+            from mood_taxonomy import query_resolver
+            self._query_resolver = query_resolver(self.canonical_moods())
+        return self._query_resolver
+
+    def query_positions(self, query):
+        # rows matching a mood_taxonomy.MoodQuery, in the same priority order as positions(). A row has one raw
+        # mood, so with moods named the query is a set of raw moods and reads their per-dataset rows, like
+        # positions(); only "everything but" queries need a pass over the catalog.
+        from mood_taxonomy import query_tags
+        keep, drop = query_tags(query, self._tag_map())
+        wanted = self.priority if query.datasets is None else [d for d in self.priority if d in query.datasets]
+        if keep is None and drop:
+            return self._excluding(query.exclude, wanted)
+        parts = []
+        for d in wanted:
+            if keep is None:
+                parts.append(self.by_dataset[d])
+                continue
+            groups = [self.by_mood_dataset[(t, d)] for t in keep if (t, d) in self.by_mood_dataset]
+            if len(groups) > 1:
+                # several moods in one dataset interleave back into (link rank, position) order
+                groups = [self._ranked(np.sort(np.concatenate(groups)))]
+            parts += groups
+        if not parts:
+            return self.all_rows[:0]
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def _excluding(self, exclude, wanted):
+        # rows of the wanted datasets outside every excluded mood: taxonomy moods and dense ones by bitset,
+        # the long tail by clearing its position arrays
+        from mood_taxonomy import load_taxonomy
+        n = len(self.combined)
+        keep = np.ones(n, dtype=bool)
+        known = set(load_taxonomy().values())
+        bits = []
+        for mood in exclude:
+            raws = self._tag_map().get(mood, [])
+            if not raws:
+                continue
+            if mood in known or sum(len(self.by_mood[t]) for t in raws) * DENSE_SHARE >= n:
+                bits.append(self.mood_bits().get(mood, lambda: np.concatenate([self.by_mood[t] for t in raws])))
+            else:
+                for t in raws:
+                    keep[self.by_mood[t]] = False
+        if bits:
+            keep &= ~np.unpackbits(np.bitwise_or.reduce(bits), count=n).view(bool)
+        rows = self.all_rows if len(wanted) == len(self.priority) else np.concatenate([self.by_dataset[d] for d in wanted] or [self.all_rows[:0]])
+        return rows[keep[rows]]
+
+    def recommend_query(self, query, n=None, offset=0):
+        rows = self.query_positions(query)
+        page = rows[offset:] if n is None else rows[offset:offset + n]
+        return self.combined.take(page).reset_index(drop=True), len(rows)
+
+    def positions(self, mood, sources=None):
+        # sources: None / [] / containing "All" means every dataset
+        if sources and "All" not in sources:
+            wanted = [d for d in self.priority if d in sources]
+        else:
+            wanted = None
+        if not mood:
+            if wanted is None:
+                return self.all_rows
+            parts = [self.by_dataset[d] for d in wanted]
+            return np.concatenate(parts) if parts else self.all_rows[:0]
+        if wanted is None:
+            return self.by_mood.get(mood, self.all_rows[:0])
+        parts = [self.by_mood_dataset[(mood, d)] for d in wanted if (mood, d) in self.by_mood_dataset]
+        if not parts:
+            return self.all_rows[:0]
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def query(self, mood, sources=None, n=None):
+        rows = self.positions(mood, sources)
+        if n is not None:
+            rows = rows[:n]
+        return self.combined.take(rows).reset_index(drop=True)
+
+    def recommend(self, mood, sources=None, n=None, offset=0):
+        # (n rows from offset, total matches) - the shape both front ends and the HTTP service use
+        rows = self.positions(mood, sources)
+        page = rows[offset:] if n is None else rows[offset:offset + n]
+        return self.combined.take(page).reset_index(drop=True), len(rows)
+
+    def song_count(self):
+        return len(self.all_rows)
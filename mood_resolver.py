@@ -0,0 +1,92 @@
+import functools
+import json
+import os
+from collections import defaultdict
+
+SYNONYMS_PATH = os.environ.get("MOOD_SYNONYMS", "mood_synonyms.json")
+MIN_SCORE = 0.34
+# postings longer than this are too common to narrow anything down ("  s", "ng "...); they're skipped
+# for candidate generation and only used to score the candidates the rarer trigrams found
+MAX_POSTING_SCAN = 2000
+
+def normalize_mood(text):
+    return " ".join(str(text or "").strip().lower().split())
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+@functools.lru_cache(maxsize=8)
+def load_synonyms(path=SYNONYMS_PATH):
+    # {"joyful": "happy", ...}; missing file means no synonyms
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return {normalize_mood(k): normalize_mood(v) for k, v in data.items()}
+
+# ---------- Trigram index ----------
+class MoodResolver:
+    # typo-tolerant lookup: "hapy" -> "happy", "romantc" -> "romantic", "joyful" -> "happy" (via synonyms)
+
+    def __init__(self, moods, synonyms=None):
+        self.moods = set(normalize_mood(m) for m in moods if normalize_mood(m))
+        synonyms = {} if synonyms is None else synonyms
+        # every indexed term points at the mood it resolves to; synonym keys are matched fuzzily too
+        self.terms = sorted(self.moods)
+        self.target = list(self.terms)
+        for alias, mood in sorted(synonyms.items()):
+            if mood in self.moods and alias not in self.moods:
+                self.terms.append(alias)
+                self.target.append(mood)
+        self.gram_counts = [len(trigrams(t)) for t in self.terms]
+        self.postings = defaultdict(list)
+        for term_id, term in enumerate(self.terms):
+            for g in trigrams(term):
+                self.postings[g].append(term_id)
+        self.common_sets = {g: frozenset(p) for g, p in self.postings.items() if len(p) > MAX_POSTING_SCAN}
+        self.exact = {t: i for i, t in enumerate(self.terms)}
+
+    def candidates(self, text, limit=5, min_score=MIN_SCORE):
+        # [(mood, score)] best first; score is the trigram Dice coefficient of the closest term
+        q = normalize_mood(text)
+        if not q:
+            return []
+        if q in self.exact:
+            return [(self.target[self.exact[q]], 1.0)]
+        grams = trigrams(q)
+        pairs = sorted(((g, self.postings[g]) for g in grams if g in self.postings), key=lambda gp: len(gp[1]))
+        scan = [gp for gp in pairs if len(gp[1]) <= MAX_POSTING_SCAN] or pairs[:1]
+        if not scan:
+            return []
+        shared = defaultdict(int)
+        for _, posting in scan:
+            for term_id in posting:
+                shared[term_id] += 1
+        # common grams only add to terms the rare ones already surfaced (set lookups, no posting scans)
+        scanned = {g for g, _ in scan}
+        common = [self.common_sets[g] for g in grams if g in self.common_sets and g not in scanned]
+        if common:
+            for term_id in shared:
+                shared[term_id] += sum(1 for s in common if term_id in s)
+        best = {}
+        for term_id, hits in shared.items():
+            score = 2.0 * hits / (len(grams) + self.gram_counts[term_id])
+            mood = self.target[term_id]
+            if score >= min_score and score > best.get(mood, 0.0):
+                best[mood] = score
+        return sorted(best.items(), key=lambda kv: (-kv[1], kv[0]))[:limit]
+
+    def resolve(self, text, min_score=MIN_SCORE):
+        # best mood for the text, or "" when nothing is close enough
+        found = self.candidates(text, limit=1, min_score=min_score)
+        return found[0][0] if found else ""
+
+@functools.lru_cache(maxsize=4)
+def _resolver_for(moods, synonyms_items):
+    return MoodResolver(moods, dict(synonyms_items))
+
+def resolver_for(moods, synonyms=None):
+    # one resolver per distinct mood list, shared by every caller in the process
+    synonyms = load_synonyms() if synonyms is None else synonyms
+    return _resolver_for(tuple(moods), tuple(sorted(synonyms.items())))
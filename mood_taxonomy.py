@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# Canonical moods: raw catalog tags ("love", "Romantic", "happy/energetic") -> canonical mood ids, compound
+# queries over them, and packed row bitsets for the queries that exclude moods.
+#   python mood_taxonomy.py "happy or energetic, telugu only, not sad"
+# mood_taxonomy.json maps each canonical mood to the raw tags that mean it; unlisted tags are their own
+# canonical mood. A raw value with several tags (split on , / | ; & +) counts under each.
+import functools
+import json
+import os
+import re
+from collections import namedtuple
+
+import numpy as np
+
+from mood_resolver import MoodResolver, load_synonyms, normalize_mood
+
+TAXONOMY_PATH = os.environ.get("MOOD_TAXONOMY", "mood_taxonomy.json")
+TAG_SPLIT_RE = re.compile(r"[,/|;&+]")
+# query text: clauses (split on , ; | & + "or" "and") are OR'ed; a clause can be negated or name a dataset
+# ("telugu only", "not hindi"). Moods never contain & or + (TAG_SPLIT_RE), so those are safe to split on.
+CLAUSE_SPLIT_RE = re.compile(r"\s*(?:[,;|&+]|\b(?:or|and)\b)\s*")
+NEGATIONS = ("not ", "no ", "except ", "without ", "-", "!")
+FILLERS = {"only", "songs", "in", "from", "just"}
+
+# moods: any of (empty = every mood); exclude: none of; datasets: any of (None = every dataset)
+MoodQuery = namedtuple("MoodQuery", ["moods", "exclude", "datasets"])
+
+@functools.lru_cache(maxsize=8)
+def load_taxonomy(path=TAXONOMY_PATH):
+    # {raw tag: canonical mood}; missing file means every tag is its own mood
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    out = {}
+    for mood, tags in data.items():
+        mood = normalize_mood(mood)
+        out[mood] = mood
+        out.update((normalize_mood(t), mood) for t in tags)
+    return out
+
+def canonical_tags(raw, taxonomy=None):
+    taxonomy = load_taxonomy() if taxonomy is None else taxonomy
+    tags = (normalize_mood(t) for t in TAG_SPLIT_RE.split(str(raw or "")))
+    return {taxonomy.get(t, t) for t in tags if t}
+
+def canonical(mood, taxonomy=None):
+    taxonomy = load_taxonomy() if taxonomy is None else taxonomy
+    mood = normalize_mood(mood)
+    return taxonomy.get(mood, mood)
+
+def mood_query(moods=(), exclude=(), datasets=None, taxonomy=None):
+    # a normalized, hashable MoodQuery (usable in cache keys); mood names may be raw tags or canonical
+    names = lambda ms: tuple(sorted({canonical(m, taxonomy) for m in ms if normalize_mood(m)}))
+    if datasets is not None:
+        datasets = None if "All" in datasets else tuple(sorted(set(datasets)))
+    return MoodQuery(names(moods), names(exclude), datasets)
+
+def describe(query):
+    # "happy OR energetic · Telugu only · NOT sad"
+    parts = [" OR ".join(query.moods) if query.moods else "any mood"]
+    if query.datasets is not None:
+        parts.append((" / ".join(query.datasets) or "no dataset") + " only")
+    if query.exclude:
+        parts.append("NOT " + " / ".join(query.exclude))
+    return " · ".join(parts)
+
+def tags_by_mood(raw_tags, taxonomy=None):
+    # {canonical mood: [raw tags that mean it]} over a catalog's distinct raw mood values
+    out = {}
+    for raw in raw_tags:
+        for mood in canonical_tags(raw, taxonomy):
+            out.setdefault(mood, []).append(raw)
+    return out
+
+def query_tags(query, by_mood):
+    # a catalog row has one raw tag, so a MoodQuery picks raw tags: -> (any of these, None = any tag; none of these)
+    pick = lambda moods: {t for m in moods for t in by_mood.get(m, ())}
+    drop = pick(query.exclude)
+    return (sorted(pick(query.moods) - drop) if query.moods else None), sorted(drop)
+
+# ---------- Query text ----------
+def query_aliases(taxonomy=None):
+    # typed words -> canonical moods: the taxonomy's raw tags plus mood_synonyms.json (mapped through it)
+    if taxonomy is None:
+        return _default_aliases()
+    aliases = {a: canonical(m, taxonomy) for a, m in load_synonyms().items()}
+    aliases.update(taxonomy)
+    return aliases
+
+@functools.lru_cache(maxsize=1)
+def _default_aliases():
+    return query_aliases(load_taxonomy())
+
+def query_resolver(moods, taxonomy=None):
+    # resolver for parse_query over canonical moods; backends build one per catalog (MoodIndex.query_resolver)
+    return MoodResolver(moods, query_aliases(taxonomy))
+
+def parse_query(text, datasets, resolver, taxonomy=None):
+    # "happy or energetic, telugu only, not sad" -> MoodQuery; moods are resolved typo/synonym tolerant through
+    # resolver (query_resolver). Dataset names are picked out of a clause word by word ("romantic hindi songs").
+    # Raises ValueError naming any term that is neither a dataset nor close to a mood, and any multi-word term
+    # that is close to more than one mood ("happy energetic").
+    by_name = {d.lower(): d for d in datasets}
+    names = sorted(by_name, key=len, reverse=True)
+    dataset_re = re.compile(r"\b(?:%s)\b" % "|".join(map(re.escape, names))) if names else None
+    want, drop, keep_ds, drop_ds, unknown, ambiguous = [], [], [], [], [], []
+    for clause in CLAUSE_SPLIT_RE.split(normalize_mood(text)):
+        negated = False
+        for prefix in NEGATIONS:
+            if clause.startswith(prefix):
+                negated, clause = True, clause[len(prefix):]
+                break
+        found = dataset_re.findall(clause) if dataset_re else []
+        if found:
+            (drop_ds if negated else keep_ds).extend(by_name[d] for d in found)
+            clause = dataset_re.sub(" ", clause)
+        term = " ".join(w for w in clause.split() if w not in FILLERS)
+        if not term:
+            continue
+        # one word takes the closest mood; several must be a known phrase or close to only one mood
+        moods = [m for m, _ in resolver.candidates(term, limit=1 if " " not in term else 2)]
+        if not moods:
+            unknown.append(term)
+        elif len(moods) > 1:
+            ambiguous.append(f"{term} ({' or '.join(moods)}?)")
+        else:
+            (drop if negated else want).append(moods[0])
+    if unknown or ambiguous:
+        raise ValueError("; ".join(([f"Unknown mood or dataset: {', '.join(unknown)}"] if unknown else [])
+                                   + ([f"Ambiguous mood: {', '.join(ambiguous)}"] if ambiguous else [])))
+    if drop_ds:
+        keep_ds = [d for d in (keep_ds or datasets) if d not in drop_ds]
+    return mood_query(want, drop, keep_ds if keep_ds or drop_ds else None, taxonomy)
+
+# ---------- Bitsets ----------
+class MoodBits:
+    # np.packbits row bitsets (bit i = catalog row i), one per canonical mood, each built the first time a query
+    # excludes that mood. The caller decides which moods get one (MoodIndex: only the dense ones).
+
+    def __init__(self, n, bits=None):
+        self.n = n
+        self.bits = {} if bits is None else bits
+
+    def get(self, mood, rows):
+        # packed bits of mood; rows() gives its catalog positions when they are first needed
+        found = self.bits.get(mood)
+        if found is None:
+            mask = np.zeros(self.n, dtype=bool)
+            mask[rows()] = True
+            found = self.bits[mood] = np.packbits(mask)
+        return found
+
+    def extended(self, n, added):
+        # the same bitsets over a catalog appended to n rows; added: {mood: positions of its new rows}
+        out = {}
+        for mood, bits in self.bits.items():
+            grown = np.zeros((n + 7) // 8, dtype=np.uint8)
+            grown[:len(bits)] = bits
+            rows = added.get(mood)
+            if rows is not None:
+                np.bitwise_or.at(grown, rows >> 3, (128 >> (rows & 7)).astype(np.uint8))
+            out[mood] = grown
+        return MoodBits(n, out)
+
+    def nbytes(self):
+        return sum(b.nbytes for b in self.bits.values())
+
+if __name__ == "__main__":
+    import argparse
+    from recommender import default_engine
+    ap = argparse.ArgumentParser(description="Run a compound mood query.")
+    ap.add_argument("query", help='e.g. "happy or energetic, telugu only, not sad"')
+    ap.add_argument("--n", type=int, default=10)
+    args = ap.parse_args()
+    engine = default_engine()
+    query = engine.parse_query(args.query)
+    songs, total = engine.recommend_query(query, n=args.n)
+    print(f"{describe(query)}: {total} songs")
+    for i, row in enumerate(songs.itertuples(index=False), start=1):
+        print(f"{i}. {row.Title} — {row.Mood} ({row.Dataset}) {row.Link}")
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# Offline playlist generation: JSONL requests in, JSONL playlists out in the same order.
+#   python playlists.py requests.jsonl -o playlists.jsonl --workers 4
+#   cat requests.jsonl | python playlists.py > playlists.jsonl
+# request: {"id": "u1", "mood": "love", "sources": ["Telugu"], "n": 20, "seed": 7}
+#   with a seed, n songs are sampled (reproducibly) from all matches; without one, the first n in priority order
+# output:  {"id": "u1", "mood": "love", "sources": ["Telugu"], "total": 42, "songs": [...]}
+#          or {"id": "u1", "line": 3, "error": "..."} for a request that can't be served
+import json
+import os
+import sys
+import time
+from collections import deque
+
+BATCH_SIZE = 64
+# batches in flight per worker: enough to keep workers busy, few enough that memory stays bounded
+QUEUE_DEPTH = 4
+
+# ---------- Worker side ----------
+_view = None
+
+def _load_view(sources):
+    import catalog
+    from service import CatalogView
+    return CatalogView(catalog.load_mood_index(sources, warn=lambda msg: print(f"Warning: {msg}", file=sys.stderr)))
+
+def _init_worker(sources):
+    # forked workers inherit the parent's catalog (shared copy-on-write); spawned ones read the snapshot
+    global _view
+    if _view is None:
+        _view = _load_view(sources)
+
+def playlist(view, req):
+    import numpy as np
+    from service import _n_param, _sources_param
+    if not isinstance(req, dict):
+        raise ValueError("request must be a JSON object")
+    mood = (req.get("mood") or "").strip().lower()
+    if mood and mood not in view.index.by_mood:
+        mood = view.index.resolver().resolve(mood) or mood
+    sources = _sources_param(req.get("sources"))
+    n = _n_param(req.get("n"))
+    rows = view.index.positions(mood, sources)
+    seed = _n_param(req.get("seed"), default=None, name="seed")
+    if seed is not None and len(rows):
+        pick = np.random.default_rng(seed).choice(len(rows), size=min(n, len(rows)), replace=False)
+        chosen = rows[pick]
+    else:
+        chosen = rows[:n]
+    out = {"mood": mood, "sources": sources or ["All"], "total": len(rows), "songs": view.records(chosen)}
+    if "id" in req:
+        out = {"id": req["id"], **out}
+    return out
+
+def _render(view, lineno, line):
+    # -> (JSON line, failed)
+    req = None
+    try:
+        req = json.loads(line)
+        return json.dumps(playlist(view, req), ensure_ascii=False), False
+    except (ValueError, TypeError, AttributeError, OverflowError) as e:
+        out = {"line": lineno, "error": str(e)}
+        if isinstance(req, dict) and "id" in req:
+            out = {"id": req["id"], **out}
+        return json.dumps(out, ensure_ascii=False), True
+
+def _run_batch(batch):
+    return [_render(_view, lineno, line) for lineno, line in batch]
+
+# ---------- Driver ----------
+def _batches(lines, size):
+    batch = []
+    for lineno, line in enumerate(lines, start=1):
+        if line.strip():
+            batch.append((lineno, line))
+            if len(batch) == size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+def generate(lines, sources=None, workers=None, batch_size=BATCH_SIZE):
+    # yields (JSON line, failed) per request, in input order; at most workers * QUEUE_DEPTH batches are held at once
+    global _view
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    _view = _load_view(sources)
+    if workers <= 1:
+        for batch in _batches(lines, batch_size):
+            yield from _run_batch(batch)
+        return
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    methods = multiprocessing.get_all_start_methods()
+    ctx = multiprocessing.get_context("fork" if "fork" in methods else None)
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker, initargs=(sources,)) as pool:
+        for batch in _batches(lines, batch_size):
+            pending.append(pool.submit(_run_batch, batch))
+            if len(pending) >= workers * QUEUE_DEPTH:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Generate playlists for a JSONL stream of mood requests.")
+    ap.add_argument("input", nargs="?", default="-", help="requests JSONL (default: stdin)")
+    ap.add_argument("-o", "--output", default="-", help="playlists JSONL (default: stdout)")
+    ap.add_argument("--workers", type=int, help="worker processes (default: CPU count; 1 runs in-process)")
+    ap.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = ap.parse_args()
+    src = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    dst = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    t0 = time.perf_counter()
+    count = errors = 0
+    try:
+        for out, failed in generate(src, workers=args.workers, batch_size=args.batch_size):
+            dst.write(out + "\n")
+            count += 1
+            errors += failed
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if dst is not sys.stdout:
+            dst.close()
+    seconds = time.perf_counter() - t0
+    print(f"{count} playlists ({errors} errors) in {seconds:.2f}s: {count / seconds if seconds else 0:.0f} playlists/s",
+          file=sys.stderr)
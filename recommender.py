@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# Shared recommendation engine behind app.py, the Tk app and scripts.
+#   from recommender import recommend
+#   songs, total = recommend("love", sources=["Telugu"], n=10)
+# Importing this module is cheap: pandas, the catalog and the watcher load on the first call that needs them.
+# CATALOG_STORE=sqlite keeps the catalog in catalog_store.SqliteStore instead of memory (pages come from SQL).
+# Compound mood queries (mood_taxonomy): recommend_query(parse_query("happy or energetic, telugu only, not sad")).
+#   python recommender.py love --n 5
+#   python recommender.py love --like 1      # songs like the top "love" song
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+# result cache bounds: entries, total cached rows (a mood's full result can be large) and seconds to live
+RESULT_CACHE_SIZE = int(os.environ.get("RESULT_CACHE_SIZE", "1024"))
+RESULT_CACHE_ROWS = int(os.environ.get("RESULT_CACHE_ROWS", "1000000"))
+RESULT_CACHE_TTL = float(os.environ.get("RESULT_CACHE_TTL", "300"))
+# "memory" (DataFrame + MoodIndex) or "sqlite" (catalog_store)
+CATALOG_STORE = os.environ.get("CATALOG_STORE", "memory")
+
+# ---------- Result cache ----------
+class ResultCache:
+    # thread-safe LRU with a TTL. Keys carry the catalog version, so a rebuilt or updated catalog never
+    # serves old results; they just age out. Cached values are shared: callers must not modify them.
+
+    def __init__(self, max_entries=RESULT_CACHE_SIZE, max_rows=RESULT_CACHE_ROWS, ttl=RESULT_CACHE_TTL):
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires, value, rows)
+        self._rows = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def _drop(self, key):
+        self._rows -= self._data.pop(key)[2]
+
+    def get(self, key):
+        # the cached value or None
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and item[0] > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return item[1]
+            if item is not None:
+                self._drop(key)
+            self.misses += 1
+            return None
+
+    def put(self, key, value, rows=1):
+        if self.ttl <= 0 or self.max_entries <= 0 or rows > self.max_rows:
+            return
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (time.monotonic() + self.ttl, value, rows)
+            self._rows += rows
+            while len(self._data) > self.max_entries or self._rows > self.max_rows:
+                self._drop(next(iter(self._data)))
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._rows = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "entries": len(self._data),
+                    "rows": self._rows, "hit_rate": self.hits / lookups if lookups else 0.0}
+
+# shared by every Recommender in the process (all Streamlit sessions, the Tk app, scripts)
+RESULTS = ResultCache()
+
+# ---------- Engine ----------
+class Recommender:
+    # moods(), priority, song_count(), recommend(mood, sources, n, offset), similar(song, n), resolve(text), rebuild()
+    # over the in-process catalog (kept fresh by catalog_watcher unless watch=False / CATALOG_WATCH=0), the SQLite
+    # store (store="sqlite"; checked against the CSVs on each query instead of watched) or the JSON service when
+    # MOOD_SERVICE_URL is set. recommend() results go through the shared ResultCache.
+
+    def __init__(self, sources=None, watch=None, on_update=None, warn=print, service_url=None, cache=None, store=None):
+        self.sources = sources
+        self.store = CATALOG_STORE if store is None else store
+        self.watch = os.environ.get("CATALOG_WATCH", "1") != "0" if watch is None else watch
+        self.on_update = on_update
+        self.warn = warn
+        self.service_url = os.environ.get("MOOD_SERVICE_URL") if service_url is None else service_url
+        self._client = None
+        self._watcher = None
+        self.cache = RESULTS if cache is None else cache
+
+    @property
+    def uses_service(self):
+        return bool(self.service_url)
+
+    def backend(self):
+        # the current MoodIndex (re-fetched each call, so catalog updates show up) or the ServiceClient
+        if self.uses_service:
+            if self._client is None:
+                from service import ServiceClient
+                self._client = ServiceClient(self.service_url)
+            return self._client
+        return self._entry()["index"]
+
+    def _entry(self):
+        # {"index": MoodIndex or SqliteStore, "version": ...}
+        if self.store == "sqlite":
+            import catalog_store
+            store, key = catalog_store.load_store(self.sources, warn=self.warn)
+            # link re-ranks change the order in place, so they are part of the version
+            return {"index": store, "version": (key, store.health)}
+        import catalog
+        if self.watch:
+            # the watcher fixes the source list when it starts; reusing it skips the directory scan per query
+            if self._watcher is None:
+                from catalog_watcher import start_watching
+                self._watcher = start_watching(self.sources, on_update=self.on_update, warn=self.warn)
+            return catalog.load_entry(self._watcher.sources, warn=self.warn)
+        return catalog.load_entry(self.sources, warn=self.warn)
+
+    def moods(self):
+        return self.backend().moods()
+
+    @property
+    def priority(self):
+        return self.backend().priority
+
+    def song_count(self):
+        return self.backend().song_count()
+
+    def canonical_moods(self):
+        # mood_taxonomy's canonical moods ("love" and "romantic" are both "romantic")
+        return self.backend().canonical_moods()
+
+    def parse_query(self, text):
+        # compound query text -> mood_taxonomy.MoodQuery (ValueError names unknown terms)
+        from mood_taxonomy import parse_query
+        backend = self.backend()
+        return parse_query(text, backend.priority, backend.query_resolver())
+
+    def resolve(self, text):
+        # typed mood -> known mood (typos, synonyms); "" when nothing is close
+        return self.backend().resolver().resolve(text)
+
+    def recommend(self, mood, sources=None, n=None, offset=0):
+        # (n rows from offset, total matches), deduplicated and in dataset priority order; n=0 just counts
+        mood = (mood or "").strip().lower()
+        # dataset order and repeats don't change the result, and "All" means no filter
+        sources = None if not sources or "All" in sources else tuple(sorted(set(sources)))
+        if self.uses_service:
+            # the service's catalog version isn't visible from here; its results expire by TTL only
+            backend, version = self.backend(), None
+        else:
+            entry = self._entry()
+            backend, version = entry["index"], entry["version"]
+        key = (self.service_url or self.sources and tuple(self.sources), version, mood, sources, n, offset)
+        result = self.cache.get(key)
+        if result is None:
+            with metrics.stage("query") as m:
+                result = backend.recommend(mood, list(sources) if sources else None, n, offset)
+                m.rows = len(result[0])
+            self.cache.put(key, result, len(result[0]))
+        return result
+
+    def recommend_query(self, query, n=None, offset=0):
+        # (n rows from offset, total matches) for a mood_taxonomy.MoodQuery, in the same order as recommend()
+        from mood_taxonomy import mood_query
+        query = mood_query(query.moods, query.exclude, query.datasets)
+        if self.uses_service:
+            backend, version = self.backend(), None
+        else:
+            entry = self._entry()
+            backend, version = entry["index"], entry["version"]
+        key = (self.service_url or self.sources and tuple(self.sources), version, query, n, offset)
+        result = self.cache.get(key)
+        if result is None:
+            with metrics.stage("query_compound") as m:
+                result = backend.recommend_query(query, n, offset)
+                m.rows = len(result[0])
+            self.cache.put(key, result, len(result[0]))
+        return result
+
+    def similar(self, song, n=10, wait=False):
+        # songs like `song` (a row of a recommend() result, as a dict or Series), best first, as a DataFrame.
+        # The neighbor index builds in the background; until it is ready this tops up with same-mood songs,
+        # unless wait=True (one-shot scripts)
+        if self.uses_service:
+            return self.backend().similar(song, n)
+        import catalog
+        backend = self.backend()  # starts the watcher like any other query
+        with metrics.stage("similar") as m:
+            if self.store == "sqlite":
+                # neighbors live in the store file, so the in-memory catalog is never loaded
+                found = backend.similar(dict(song), n, wait=wait)
+                m.rows = len(found)
+                return found
+            index, rows = catalog.similar_songs(dict(song), self.sources, n, warn=self.warn, wait=wait)
+            m.rows = len(rows)
+            return index.combined.take(rows).reset_index(drop=True)
+
+    def rebuild(self, warn=None):
+        if self.uses_service:
+            raise RuntimeError("The catalog is managed by the recommendation service")
+        if self.store == "sqlite":
+            import catalog_store
+            catalog_store.load_store(self.sources, rebuild=True, warn=warn or self.warn)
+        else:
+            import catalog
+            catalog.rebuild_catalog(self.sources, warn=warn or self.warn)
+        # the new catalog version already misses every old key; this just frees them now
+        self.cache.clear()
+
+_default = None
+
+def default_engine():
+    # one engine per process for callers that don't need their own sources/callbacks
+    global _default
+    if _default is None:
+        _default = Recommender()
+    return _default
+
+def recommend(mood, sources=None, n=None):
+    return default_engine().recommend(mood, sources, n)
+
+def moods():
+    return default_engine().moods()
+
+def similar(song, n=10):
+    return default_engine().similar(song, n)
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Print song recommendations for a mood.")
+    ap.add_argument("mood")
+    ap.add_argument("--sources", help="comma separated datasets (default: all)")
+    ap.add_argument("--n", type=int, default=10)
+    ap.add_argument("--like", type=int, metavar="I", help="instead list songs like the I-th recommendation")
+    args = ap.parse_args()
+    engine = Recommender(watch=False)
+    mood = engine.resolve(args.mood) or args.mood
+    songs, total = engine.recommend(mood, args.sources.split(",") if args.sources else None,
+                                    args.n if args.like is None else max(args.n, args.like))
+    if args.like is not None:
+        seed = songs.iloc[args.like - 1]
+        songs = engine.similar(seed, args.n, wait=True)
+        print(f"{len(songs)} songs like '{seed['Title']}'")
+    else:
+        print(f"{total} songs for mood '{mood}'")
+    for i, row in enumerate(songs.itertuples(index=False), start=1):
+        print(f"{i}. {row.Title} ({row.Dataset}) {row.Link}")
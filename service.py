@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# Local JSON recommendation service over one shared, preloaded catalog.
+#   python service.py --port 8765
+#   GET  /moods                              -> {"moods": [...], "canonical": [...]}
+#   GET  /datasets                           -> {"datasets": [...], "songs": N}
+#   GET  /recommend?mood=love&sources=Telugu,Hindi&n=10&offset=20
+#   GET  /query?moods=happy,energetic&not=sad&sources=Telugu&n=10&offset=0   (compound, see mood_taxonomy)
+#   GET  /query?q=happy or energetic, telugu only, not sad&n=10
+#   GET  /metrics                            -> Prometheus text (stage timings need MOOD_METRICS=1)
+#   GET  /similar?title=...&artist=...&movie=...&n=10   (songs like this one; the fields are the dedupe keys)
+#   POST /recommend/batch  {"queries": [{"mood": "love", "sources": ["Telugu"], "n": 5}, ...]}
+#                          or {"moods": ["love", "sad"], "sources": [...], "n": 5}
+# Point the front ends at it with MOOD_SERVICE_URL=http://127.0.0.1:8765
+import asyncio
+import json
+import urllib.parse
+import urllib.request
+
+import pandas as pd
+
+import metrics
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_N = 10
+MAX_BODY = 4 * 1024 * 1024
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large"}
+
+# ---------- Request handling ----------
+class CatalogView:
+    # JSON-ready column arrays built once, so a request is positions lookup + a few numpy takes (no DataFrame work)
+
+    def __init__(self, index):
+        self.index = index
+        df = index.combined
+        self.columns = list(df.columns)
+        # a CompactCatalog expands rows itself; copying it into object arrays would undo the point of it
+        self.compact = not isinstance(df, pd.DataFrame)
+        # NaN is not valid JSON; the UIs treat missing fields as empty strings anyway
+        self.arrays = [] if self.compact else [df[c].astype(object).where(df[c].notna(), "").to_numpy() for c in self.columns]
+
+    def records(self, rows):
+        if self.compact:
+            return self.index.combined.records(rows)
+        return [dict(zip(self.columns, vals)) for vals in zip(*(a[rows] for a in self.arrays))]
+
+def _sources_param(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = [v for v in value.split(",") if v.strip()]
+    return [str(v).strip() for v in value]
+
+def _n_param(value, default=DEFAULT_N, name="n"):
+    if value is None or value == "":
+        return default
+    # JSON numbers may be floats: 2.5, or 1e400 (inf), which int() would truncate or overflow on
+    if isinstance(value, float) and not value.is_integer():
+        raise ValueError(f"{name} must be a whole number")
+    n = int(value)
+    if n < 0:
+        raise ValueError(f"{name} must be >= 0")
+    return n
+
+def _recommend(view, mood, sources, n, offset=0):
+    mood = (mood or "").strip().lower()
+    with metrics.stage("query") as m:
+        rows = view.index.positions(mood, sources)
+        songs = view.records(rows[offset:offset + n])
+        m.rows = len(songs)
+    return {"mood": mood, "sources": sources or ["All"], "total": len(rows), "songs": songs}
+
+def _query(view, q):
+    from mood_taxonomy import describe, mood_query, parse_query
+    index = view.index
+    if q.get("q"):
+        query = parse_query(q["q"], index.priority, index.query_resolver())
+    else:
+        query = mood_query(_sources_param(q.get("moods")) or (), _sources_param(q.get("not")) or (), _sources_param(q.get("sources")))
+    n, offset = _n_param(q.get("n")), _n_param(q.get("offset"), default=0, name="offset")
+    with metrics.stage("query_compound") as m:
+        rows = index.query_positions(query)
+        songs = view.records(rows[offset:offset + n])
+        m.rows = len(songs)
+    return {"query": query._asdict(), "description": describe(query), "total": len(rows), "songs": songs}
+
+def _similar(view, song, n):
+    import catalog
+    index, rows = catalog.similar_songs(song, n=n)
+    # a catalog update may have landed since this view was made; answer from the catalog the rows belong to
+    records = view.records(rows) if index is view.index else CatalogView(index).records(rows)
+    return {"total": len(rows), "songs": records}
+
+def handle(view, method, path, query, body):
+    # -> (status, payload); pure function so it can be exercised without sockets. A str payload is sent as text.
+    index = view.index
+    try:
+        if path == "/metrics" and method == "GET":
+            return 200, metrics.render_prometheus(metrics.process_metrics())
+        if path == "/moods" and method == "GET":
+            return 200, {"moods": index.moods(), "canonical": index.canonical_moods()}
+        if path == "/datasets" and method == "GET":
+            return 200, {"datasets": index.priority, "songs": index.song_count()}
+        if path == "/recommend" and method == "GET":
+            q = {k: v[-1] for k, v in query.items()}
+            return 200, _recommend(view, q.get("mood"), _sources_param(q.get("sources")), _n_param(q.get("n")),
+                                   _n_param(q.get("offset"), default=0, name="offset"))
+        if path == "/query" and method == "GET":
+            return 200, _query(view, {k: v[-1] for k, v in query.items()})
+        if path == "/similar" and method == "GET":
+            q = {k: v[-1] for k, v in query.items()}
+            from catalog import CLEAN_COLUMNS
+            song = {c: q[c.lower()] for c in CLEAN_COLUMNS if c.lower() in q}
+            return 200, _similar(view, song, _n_param(q.get("n")))
+        if path == "/recommend/batch" and method == "POST":
+            req = json.loads(body or b"{}")
+            if "queries" in req:
+                queries = req["queries"]
+            else:
+                queries = [{"mood": m, "sources": req.get("sources"), "n": req.get("n")} for m in req.get("moods", [])]
+            results = [_recommend(view, q.get("mood"), _sources_param(q.get("sources")), _n_param(q.get("n"))) for q in queries]
+            return 200, {"results": results}
+        if path in ("/moods", "/datasets", "/recommend", "/query", "/similar", "/recommend/batch", "/metrics"):
+            return 405, {"error": f"{method} not allowed on {path}"}
+        return 404, {"error": f"unknown path {path}"}
+    except (ValueError, TypeError, AttributeError) as e:
+        return 400, {"error": str(e)}
+
+# ---------- HTTP server ----------
+async def _serve_connection(views, reader, writer):
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            try:
+                method, target, version = request_line.decode("latin1").split()
+            except ValueError:
+                break
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                k, _, v = line.decode("latin1").partition(":")
+                headers[k.strip().lower()] = v.strip()
+            try:
+                length = int(headers.get("content-length") or 0)
+            except ValueError:
+                length = -1
+            if length < 0:
+                status, payload, body = 400, {"error": "invalid Content-Length"}, b""
+            elif length > MAX_BODY:
+                status, payload, body = 413, {"error": "body too large"}, b""
+            else:
+                body = await reader.readexactly(length) if length else b""
+                parsed = urllib.parse.urlsplit(target)
+                args = (views[-1], method.upper(), parsed.path, urllib.parse.parse_qs(parsed.query), body)
+                if parsed.path == "/similar":
+                    # may read the neighbor snapshot (hundreds of MB at 1M rows); other clients keep being served
+                    status, payload = await asyncio.get_running_loop().run_in_executor(None, handle, *args)
+                else:
+                    status, payload = handle(*args)
+            if isinstance(payload, str):
+                data, content_type = payload.encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8"
+            else:
+                data, content_type = json.dumps(payload, ensure_ascii=False).encode("utf-8"), "application/json; charset=utf-8"
+            keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close" and 0 <= length <= MAX_BODY
+            writer.write(
+                f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(data)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin1") + data
+            )
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+async def serve(index, host=DEFAULT_HOST, port=DEFAULT_PORT, ready=None, watch=False):
+    # views[-1] is the live catalog; a new view is swapped in after each catalog update and link re-rank
+    views = [CatalogView(index)]
+    swap = lambda entry: views.append(CatalogView(entry["index"])) or views.pop(0)
+    if watch:
+        import catalog
+        from catalog_watcher import start_watching
+        catalog.on_rerank(swap)
+        start_watching(on_update=swap)
+    server = await asyncio.start_server(lambda r, w: _serve_connection(views, r, w), host, port)
+    if ready is not None:
+        ready(server)
+    async with server:
+        await server.serve_forever()
+
+# ---------- Client (used by recommender.Recommender when MOOD_SERVICE_URL is set) ----------
+class ServiceClient:
+    # same surface as MoodIndex: moods(), canonical_moods(), priority, recommend(mood, sources, n, offset),
+    # recommend_query(query, n, offset), song_count(), resolver(), query_resolver()
+
+    def __init__(self, base_url, timeout=10):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self._datasets = None
+
+    def _get(self, path, params=None):
+        url = self.base_url + path + ("?" + urllib.parse.urlencode(params) if params else "")
+        with urllib.request.urlopen(url, timeout=self.timeout) as resp:
+            return json.loads(resp.read().decode("utf-8"))
+
+    def _post(self, path, payload):
+        req = urllib.request.Request(self.base_url + path, data=json.dumps(payload).encode("utf-8"),
+                                     headers={"Content-Type": "application/json"}, method="POST")
+        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+            return json.loads(resp.read().decode("utf-8"))
+
+    def _frame(self, result):
+        from catalog import CLEAN_COLUMNS
+        return pd.DataFrame(result["songs"], columns=CLEAN_COLUMNS), result["total"]
+
+    def moods(self):
+        return self._get("/moods")["moods"]
+
+    def canonical_moods(self):
+        return self._get("/moods")["canonical"]
+
+    def resolver(self):
+        # the service's moods can change under us, so these stay keyed by the mood list it returns
+        from mood_resolver import resolver_for
+        return resolver_for(self.moods())
+
+    def query_resolver(self):
+        from mood_resolver import resolver_for
+        from mood_taxonomy import query_aliases
+        return resolver_for(self.canonical_moods(), query_aliases())
+
+    @property
+    def priority(self):
+        if self._datasets is None:
+            self._datasets = self._get("/datasets")
+        return self._datasets["datasets"]
+
+    def song_count(self):
+        return self._get("/datasets")["songs"]
+
+    def recommend(self, mood, sources=None, n=None, offset=0):
+        params = {"mood": mood or "", "n": 2 ** 31 if n is None else n, "offset": offset}
+        if sources and "All" not in sources:
+            params["sources"] = ",".join(sources)
+        return self._frame(self._get("/recommend", params))
+
+    def recommend_query(self, query, n=None, offset=0):
+        if query.datasets == ():
+            # no dataset at all ("not telugu, not hindi"); an empty sources param would mean every dataset
+            return self._frame({"songs": [], "total": 0})
+        params = {"moods": ",".join(query.moods), "not": ",".join(query.exclude), "n": 2 ** 31 if n is None else n,
+                  "offset": offset}
+        if query.datasets is not None:
+            params["sources"] = ",".join(query.datasets)
+        return self._frame(self._get("/query", params))
+
+    def similar(self, song, n=10):
+        from catalog import CLEAN_COLUMNS
+        params = {c.lower(): song[c] for c in CLEAN_COLUMNS if c in song and isinstance(song[c], str)}
+        return self._frame(self._get("/similar", {**params, "n": n}))[0]
+
+    def recommend_batch(self, moods, sources=None, n=DEFAULT_N):
+        result = self._post("/recommend/batch", {"moods": list(moods), "sources": sources, "n": n})
+        return [self._frame(r) for r in result["results"]]
+
+if __name__ == "__main__":
+    import argparse
+    from catalog import load_mood_index
+    ap = argparse.ArgumentParser(description="Serve mood recommendations as JSON over HTTP.")
+    ap.add_argument("--host", default=DEFAULT_HOST)
+    ap.add_argument("--port", type=int, default=DEFAULT_PORT)
+    ap.add_argument("--no-watch", action="store_true", help="don't pick up catalog edits while running")
+    args = ap.parse_args()
+    index = load_mood_index()
+    print(f"Serving {index.song_count()} songs / {len(index.moods())} moods on http://{args.host}:{args.port}")
+    try:
+        asyncio.run(serve(index, args.host, args.port, watch=not args.no_watch))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,257 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from catalog import normalize_text_series
+
+K = 20
+FIELD_WEIGHTS = {"title": 1.0, "artist": 1.5, "movie": 1.5, "mood": 1.0}
+# features shared by more songs than this (moods, "love", ...) don't generate candidates; they still add to
+# the score of candidates found through rarer features. Keeps the neighbor join near-linear in catalog size.
+MAX_DF = 2000
+# candidate pairs materialized per block; bounds memory whatever the catalog size
+PAIR_BUDGET = 2_000_000
+MAX_COMMON = 8
+# songs with fewer than k rare-feature candidates also draw this many candidates (in priority order) from
+# their rarest common feature, e.g. the first songs of the same movie
+FALLBACK_CANDIDATES = 100
+COMMON_CHUNK = 262_144
+
+# ---------- Sparse features ----------
+def _field_tokens(combined):
+    # [(field, token Series indexed by row)] - empty/missing values produce no tokens
+    title = pd.Series(normalize_text_series(combined["Title"])).str.findall(r"\w\w+")
+    artist = pd.Series(normalize_text_series(combined["Artist"])).str.split(r"\s*(?:,|&|/|\band\b)\s*")
+    movie = pd.Series(normalize_text_series(combined["Movie"]))
+    mood = pd.Series(normalize_text_series(combined["mood_norm"]))
+    return [("title", title.explode()), ("artist", artist.explode()), ("movie", movie), ("mood", mood)]
+
+def feature_matrix(combined):
+    # CSR (indptr, indices, data) of L2-normalized tf-idf weights; one column per distinct field:token
+    n = len(combined)
+    rows, names, weights = [], [], []
+    for field, tokens in _field_tokens(combined):
+        tokens = tokens[tokens.notna() & tokens.astype(str).ne("") & tokens.astype(str).ne("nan")]
+        rows.append(tokens.index.to_numpy(dtype=np.int64))
+        names.append((field + ":" + tokens.astype(str)).to_numpy(dtype=object))
+        weights.append(np.full(len(tokens), FIELD_WEIGHTS[field], dtype=np.float32))
+    rows = np.concatenate(rows)
+    feats, _ = pd.factorize(np.concatenate(names))
+    weights = np.concatenate(weights)
+    # a token repeated within one field of one song counts once
+    keep = ~pd.Index(rows * (feats.max() + 1 if len(feats) else 1) + feats).duplicated()
+    rows, feats, weights = rows[keep], feats[keep], weights[keep]
+    n_features = int(feats.max()) + 1 if len(feats) else 0
+    df = np.bincount(feats, minlength=n_features)
+    data = weights * (np.log((n + 1) / (df[feats] + 1)) + 1).astype(np.float32)
+    norms = np.sqrt(np.bincount(rows, weights=data.astype(np.float64) ** 2, minlength=n))
+    data = (data / norms[rows]).astype(np.float32)
+    order = np.lexsort((feats, rows))
+    indptr = np.concatenate(([0], np.cumsum(np.bincount(rows, minlength=n)))).astype(np.int64)
+    return indptr, feats[order].astype(np.int64), data[order], n_features
+
+# ---------- Blocked top-k neighbor join ----------
+def _rank_within(rows, n):
+    # for row-sorted entries: 0, 1, 2, ... within each row
+    counts = np.bincount(rows, minlength=n)
+    return np.arange(len(rows)) - np.repeat(np.cumsum(counts) - counts, counts)
+
+def _ragged_gather(starts, lengths):
+    # positions starts[i] .. starts[i] + lengths[i] - 1 for every i, concatenated, plus the owning i
+    owner = np.repeat(np.arange(len(starts)), lengths)
+    offsets = np.arange(int(lengths.sum())) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return np.repeat(starts, lengths) + offsets, owner
+
+def _top_k(pq, pc, score, n_rows, k, budget):
+    # per query row the k best (score desc, then candidate position) via argpartition on a dense tile;
+    # rows are grouped so no tile holds more than `budget` cells
+    neighbors = np.full((n_rows, k), -1, dtype=np.int32)
+    scores = np.zeros((n_rows, k), dtype=np.float32)
+    counts = np.bincount(pq, minlength=n_rows)
+    starts = np.concatenate(([0], np.cumsum(counts)))
+    r = 0
+    while r < n_rows:
+        end, width = r + 1, max(int(counts[r]), 1)
+        while end < n_rows and (end - r + 1) * max(width, int(counts[end])) <= budget:
+            width = max(width, int(counts[end]))
+            end += 1
+        lo, hi = starts[r], starts[end]
+        rows = pq[lo:hi] - r
+        pos = np.arange(lo, hi) - starts[pq[lo:hi]]
+        tile = np.full((end - r, width), -np.inf, dtype=np.float32)
+        cand = np.full((end - r, width), -1, dtype=np.int64)
+        tile[rows, pos] = score[lo:hi]
+        cand[rows, pos] = pc[lo:hi]
+        if width > k:
+            part = np.argpartition(-tile, k - 1, axis=1)[:, :k]
+            tile = np.take_along_axis(tile, part, axis=1)
+            cand = np.take_along_axis(cand, part, axis=1)
+        # only the k survivors get ordered; ties go to the earlier (higher priority) song
+        order = np.lexsort((np.where(cand < 0, np.iinfo(np.int64).max, cand), -tile), axis=1)
+        tile = np.take_along_axis(tile, order, axis=1)
+        cand = np.take_along_axis(cand, order, axis=1)
+        w = min(k, width)
+        hit = np.isfinite(tile[:, :w])
+        neighbors[r:end, :w] = np.where(hit, cand[:, :w], -1)
+        scores[r:end, :w] = np.where(hit, tile[:, :w], 0)
+        r = end
+    return neighbors, scores
+
+def _add_common(score, rows_a, rows_b, common_f, common_w):
+    # score += sum of w_a * w_b over the common features rows_a[i] and rows_b[i] share (slot-by-slot compare)
+    fb = [common_f[j][rows_b] for j in range(len(common_f))]
+    wb = [common_w[j][rows_b] for j in range(len(common_f))]
+    for i in range(len(common_f)):
+        fa = common_f[i][rows_a]
+        valid = fa >= 0
+        if not valid.any():
+            break
+        wa = common_w[i][rows_a]
+        for j in range(len(common_f)):
+            hit = (fa == fb[j]) & valid
+            score[hit] += wa[hit] * wb[j][hit]
+
+def top_k_neighbors(indptr, indices, data, n_features, k=K, max_df=MAX_DF, pair_budget=PAIR_BUDGET, start=0):
+    # cosine top-k for rows start.. of the CSR matrix X (against all of X), computed block by block as
+    # X[block] @ X.T restricted to candidate columns. Memory stays O(pair_budget + nnz) however many rows there are.
+    n = len(indptr) - 1
+    neighbors = np.full((n - start, k), -1, dtype=np.int32)
+    scores = np.zeros((n - start, k), dtype=np.float32)
+    if n == start:
+        return neighbors, scores
+    entry_row = np.repeat(np.arange(n), np.diff(indptr))
+    df = np.bincount(indices, minlength=n_features)
+    rare = (df >= 2) & (df <= max_df)
+    # inverted index (CSC): feature -> rows, weights
+    by_feat = np.argsort(indices, kind="stable")
+    col_rows = entry_row[by_feat]
+    col_data = data[by_feat]
+    col_ptr = np.concatenate(([0], np.cumsum(df)))
+    # the common features of each row, padded to MAX_COMMON, scored by direct comparison
+    common_entry = ~rare[indices] & (df[indices] >= 2)
+    c_rows, c_feats, c_data = entry_row[common_entry], indices[common_entry], data[common_entry]
+    c_rank = _rank_within(c_rows, n)
+    keep = c_rank < MAX_COMMON
+    # stored slot-major (one contiguous array per slot), -1 padded
+    m = int(c_rank[keep].max()) + 1 if keep.any() else 0
+    common_f = np.full((m, n), -1, dtype=np.int32)
+    common_w = np.zeros((m, n), dtype=np.float32)
+    common_f[c_rank[keep], c_rows[keep]] = c_feats[keep]
+    common_w[c_rank[keep], c_rows[keep]] = c_data[keep]
+    # candidate generation: every rare feature, plus a capped slice of the rarest common feature for rows
+    # the rare ones can't fill
+    cost = np.bincount(entry_row, weights=np.where(rare[indices], df[indices] - 1, 0), minlength=n)
+    fallback_feat = np.full(n, -1, dtype=np.int64)
+    if len(c_rows):
+        first = np.lexsort((df[c_feats], c_rows))
+        first = first[_rank_within(c_rows[first], n) == 0]
+        fallback_feat[c_rows[first]] = c_feats[first]
+    fallback_feat[cost >= k] = -1
+    fallback_len = np.where(fallback_feat >= 0, np.minimum(df[np.maximum(fallback_feat, 0)], FALLBACK_CANDIDATES), 0)
+    cost += fallback_len
+    # blocks of rows whose candidate expansion fits the pair budget
+    cum = np.cumsum(cost)
+    s = start
+    while s < n:
+        e = max(s + 1, int(np.searchsorted(cum, (cum[s - 1] if s else 0) + pair_budget, side="right")))
+        lo, hi = indptr[s], indptr[e]
+        f = indices[lo:hi]
+        sel = rare[f]
+        f, w, q = f[sel], data[lo:hi][sel], entry_row[lo:hi][sel] - s
+        lengths = df[f]
+        fb = np.flatnonzero(fallback_len[s:e])
+        if len(fb):
+            # fallback pairs only need to exist; their score comes from the common-feature comparison below
+            f = np.concatenate((f, fallback_feat[s + fb]))
+            w = np.concatenate((w, np.zeros(len(fb), dtype=w.dtype)))
+            q = np.concatenate((q, fb))
+            lengths = np.concatenate((lengths, fallback_len[s + fb]))
+        pos, owner = _ragged_gather(col_ptr[f], lengths)
+        cand = col_rows[pos]
+        prod = w[owner] * col_data[pos]
+        q = q[owner]
+        not_self = cand != q + s
+        key = q[not_self] * n + cand[not_self]
+        del pos, owner, cand, q
+        uniq, inv = np.unique(key, return_inverse=True)
+        score = np.bincount(inv, weights=prod[not_self]).astype(np.float32)
+        del key, inv, prod, not_self
+        pq, pc = uniq // n, uniq % n
+        for a in range(0, len(pq), COMMON_CHUNK):
+            _add_common(score[a:a + COMMON_CHUNK], pq[a:a + COMMON_CHUNK] + s, pc[a:a + COMMON_CHUNK], common_f, common_w)
+        neighbors[s - start:e - start], scores[s - start:e - start] = _top_k(pq, pc, score, e - s, k, pair_budget)
+        s = e
+    return neighbors, scores
+
+# ---------- Neighbor index ----------
+class SimilarityIndex:
+    # top-k similar songs per catalog row (best first, -1 padded), looked up by row or by dedupe fingerprint.
+    # Only rows [:complete] have had their neighbors computed; later rows (appended since) have none yet.
+
+    def __init__(self, neighbors, scores, fingerprints, complete=None):
+        self.neighbors = neighbors
+        self.scores = scores
+        self.fingerprints = fingerprints
+        self.complete = len(neighbors) if complete is None else complete
+        self.fp_order = np.argsort(fingerprints, kind="stable")
+        self.fp_sorted = fingerprints[self.fp_order]
+
+    @classmethod
+    def build(cls, combined, fingerprints, k=K):
+        indptr, indices, data, n_features = feature_matrix(combined)
+        neighbors, scores = top_k_neighbors(indptr, indices, data, n_features, k)
+        return cls(neighbors, scores, fingerprints)
+
+    @classmethod
+    def pending(cls, fingerprints, k=K):
+        # no neighbors yet; completed() computes them
+        return cls(np.full((len(fingerprints), k), -1, dtype=np.int32), np.zeros((len(fingerprints), k), dtype=np.float32),
+                   fingerprints, 0)
+
+    def extended(self, fingerprints):
+        # for a catalog that appended rows to this one's: the same neighbors, and none yet for the new rows
+        added = len(fingerprints) - len(self.neighbors)
+        k = self.neighbors.shape[1]
+        return SimilarityIndex(np.concatenate((self.neighbors, np.full((added, k), -1, dtype=np.int32))),
+                               np.concatenate((self.scores, np.zeros((added, k), dtype=np.float32))), fingerprints, self.complete)
+
+    def completed(self, combined):
+        # neighbors for rows [complete:] against the whole catalog; earlier rows keep theirs, so appended songs
+        # only show up in older songs' lists after a full build
+        if self.complete == len(self.neighbors):
+            return self
+        if self.complete == 0:
+            return SimilarityIndex.build(combined, self.fingerprints, self.neighbors.shape[1])
+        indptr, indices, data, n_features = feature_matrix(combined)
+        neighbors, scores = top_k_neighbors(indptr, indices, data, n_features, self.neighbors.shape[1], start=self.complete)
+        return SimilarityIndex(np.concatenate((self.neighbors[:self.complete], neighbors)),
+                               np.concatenate((self.scores[:self.complete], scores)), self.fingerprints)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as z:
+            return cls(z["neighbors"], z["scores"], z["fingerprints"])
+
+    def save(self, path):
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, neighbors=self.neighbors, scores=self.scores, fingerprints=self.fingerprints)
+        os.replace(tmp, path)
+
+    def row_of(self, fingerprint):
+        i = int(np.searchsorted(self.fp_sorted, fingerprint))
+        return int(self.fp_order[i]) if i < len(self.fp_sorted) and self.fp_sorted[i] == fingerprint else -1
+
+    def similar(self, row):
+        found = self.neighbors[row]
+        return found[found >= 0].astype(np.int64)
+
+def more_like_this(index, sim, row, n=10):
+    # neighbor rows for `row`, topped up with same-mood songs (in priority order) when it has fewer than n
+    rows = sim.similar(row)[:n]
+    if len(rows) < n:
+        mood = index.combined["mood_norm"].iloc[row]
+        extra = index.positions(mood)[:n + len(rows) + 1]
+        extra = extra[(extra != row) & ~np.isin(extra, rows)]
+        rows = np.concatenate((rows, extra[:n - len(rows)]))
+    return rows
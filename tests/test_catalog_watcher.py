@@ -0,0 +1,63 @@
+# CatalogWatcher: appends merge into the live catalog, anything else rebuilds, and dedupe priority holds.
+import pytest
+
+import catalog
+import link_health
+from catalog_watcher import CatalogWatcher
+
+TELUGU = ("Song Name,Artist,Movie,Mood\nButta Bomma,Armaan Malik,Ala Vaikuntapuramlo,love\n"
+          "Ramuloo Ramulaa,Anurag Kulkarni,Ala Vaikuntapuramlo,party\n")
+HINDI = "Song Name,Movie,Mood\nKesariya,Brahmastra,Romantic\nTum Hi Ho,Aashiqui 2,Emotional\n"
+
+@pytest.fixture
+def sources(monkeypatch, tmp_path):
+    # a private catalog (Telugu first, so it owns duplicates) and snapshot dir, no link verdicts
+    monkeypatch.setattr(catalog, "SNAPSHOT_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(catalog, "_memory", {})
+    monkeypatch.setattr(catalog, "_live", {})
+    monkeypatch.setattr(link_health, "current", lambda: None)
+    (tmp_path / "telugu.csv").write_text(TELUGU, encoding="utf-8")
+    (tmp_path / "hindi.csv").write_text(HINDI, encoding="utf-8")
+    return [(str(tmp_path / "telugu.csv"), "Telugu"), (str(tmp_path / "hindi.csv"), "Hindi")]
+
+def append(path, text):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(text)
+
+def titles(entry):
+    return sorted(entry["combined"]["Title"])
+
+def test_append_is_merged(sources):
+    watcher = CatalogWatcher(sources, persist=False)
+    index = watcher.entry["index"]
+    append(sources[1][0], "Channa Mereya,Ae Dil Hai Mushkil,Sad\n")
+    assert watcher.poll() == "append"
+    # merged into the existing index rather than rebuilt, and live for readers
+    assert watcher.entry["index"] is not index and catalog._load_entry(sources, False, print) is watcher.entry
+    assert titles(watcher.entry) == titles({"combined": catalog.build_catalog(sources)[0]})
+    assert watcher.entry["index"].query("sad")["Title"].tolist() == ["Channa Mereya"]
+    assert watcher.poll() is None
+
+@pytest.mark.parametrize("text", [TELUGU.replace("party", "happy"), TELUGU.splitlines(keepends=True)[0]])
+def test_rewrite_or_truncation_rebuilds(sources, text):
+    watcher = CatalogWatcher(sources, persist=False)
+    with open(sources[0][0], "w", encoding="utf-8") as f:
+        f.write(text)
+    assert watcher.poll() == "rebuild"
+    assert titles(watcher.entry) == titles({"combined": catalog.build_catalog(sources)[0]})
+
+def test_append_owned_by_higher_priority_dataset_is_dropped(sources):
+    watcher = CatalogWatcher(sources, persist=False)
+    before = titles(watcher.entry)
+    append(sources[1][0], "Butta Bomma,Some Other Movie,Happy\n")
+    assert watcher.poll() == "append"
+    assert titles(watcher.entry) == before
+    combined = watcher.entry["combined"]
+    assert combined.loc[combined["Title"] == "Butta Bomma", "Dataset"].tolist() == ["Telugu"]
+
+def test_append_taking_over_a_lower_priority_song_rebuilds(sources):
+    watcher = CatalogWatcher(sources, persist=False)
+    append(sources[0][0], "Kesariya,Arijit Singh,Brahmastra,love\n")
+    assert watcher.poll() == "rebuild"
+    combined = watcher.entry["combined"]
+    assert combined.loc[combined["Title"] == "Kesariya", "Dataset"].tolist() == ["Telugu"]
@@ -0,0 +1,66 @@
+# New link verdicts re-rank the catalog in the background: lookups keep the current entry until the swap.
+import os
+import threading
+
+import pytest
+
+import catalog
+import link_health
+from catalog import default_sources
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+@pytest.fixture
+def stamp(monkeypatch, tmp_path):
+    monkeypatch.setattr(catalog, "SNAPSHOT_DIR", str(tmp_path))
+    monkeypatch.setattr(catalog, "_memory", {})
+    monkeypatch.setattr(catalog, "_live", {})
+    monkeypatch.setattr(catalog, "_rerank_listeners", [])
+    current = [None]
+    monkeypatch.setattr(link_health, "current", lambda: current[0])
+    return current
+
+def held_build(monkeypatch):
+    # _build_index that signals `started` and then waits for `release`, so a test can act mid re-rank
+    started, release, build = threading.Event(), threading.Event(), catalog._build_index
+    def held(combined, sources):
+        started.set()
+        release.wait(5)
+        return build(combined, sources)
+    monkeypatch.setattr(catalog, "_build_index", held)
+    return started, release
+
+def finished():
+    # the re-rank thread holds _health_lock until it is done
+    with catalog._health_lock:
+        pass
+
+def test_lookup_does_not_wait_for_rerank(monkeypatch, stamp):
+    sources = default_sources(ROOT)
+    entry = catalog._load_entry(sources, False, print)
+    seen = []
+    catalog.on_rerank(seen.append)
+    started, release = held_build(monkeypatch)
+    stamp[0] = ("verdicts", 1)
+    assert catalog._load_entry(sources, False, print) is entry
+    assert started.wait(5)
+    release.set()
+    finished()
+    fresh = catalog._load_entry(sources, False, print)
+    assert fresh is not entry and fresh["health"] == ("verdicts", 1)
+    assert seen == [fresh]
+
+def test_update_during_rerank_wins(monkeypatch, stamp):
+    sources = default_sources(ROOT)
+    entry = catalog._load_entry(sources, False, print)
+    seen = []
+    catalog.on_rerank(seen.append)
+    started, release = held_build(monkeypatch)
+    stamp[0] = ("verdicts", 2)
+    catalog._load_entry(sources, False, print)
+    assert started.wait(5)
+    # what catalog_watcher does after an append, while the re-rank is still building
+    update = catalog.install_catalog(sources, entry["combined"], entry["index"], entry["fingerprints"], persist=False)
+    release.set()
+    finished()
+    assert catalog._current_entry(sources) is update and seen == []
@@ -0,0 +1,45 @@
+# Compound queries on MoodIndex: bitsets and position arrays give the same rows, before and after an append.
+import os
+
+import numpy as np
+import pytest
+
+import mood_index
+import mood_taxonomy
+from catalog import build_catalog, default_sources
+from mood_index import MoodIndex
+from mood_taxonomy import canonical_tags, mood_query
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+QUERIES = [
+    mood_query([], ["romantic", "happy"]),
+    mood_query([], ["sad"], ["Hindi"]),
+    mood_query(["happy", "energetic"], ["sad"], ["Telugu"]),
+    mood_query(["romantic", "sad"]),
+]
+
+def reference(index, query):
+    # per-row filter over canonical tags, in priority order
+    tags = index.combined["mood_norm"].map(canonical_tags)
+    keep = tags.map(lambda t: (not query.moods or bool(t & set(query.moods))) and not t & set(query.exclude))
+    if query.datasets is not None:
+        keep &= index.combined["Dataset"].isin(query.datasets)
+    return index.all_rows[keep.to_numpy()[index.all_rows]]
+
+@pytest.mark.parametrize("share", [1, 10 ** 9])
+def test_exclusions_by_bitset_or_positions(monkeypatch, share):
+    # share 1: nothing is dense (position arrays); 10**9: every mood is (bitsets)
+    monkeypatch.setattr(mood_index, "DENSE_SHARE", share)
+    monkeypatch.setattr(mood_taxonomy, "load_taxonomy", lambda: {})
+    combined, _ = build_catalog(default_sources(ROOT))
+    start = len(combined) - 9
+    old = MoodIndex(combined.iloc[:start].reset_index(drop=True))
+    for q in QUERIES:
+        assert np.array_equal(old.query_positions(q), reference(old, q)), q
+    assert bool(old.mood_bits().bits) == (share > 1)
+    grown = old.with_appended(combined, start)
+    for q in QUERIES:
+        assert np.array_equal(grown.query_positions(q), reference(grown, q)), q
+    # bitsets built before the append were extended, not dropped
+    assert set(grown.mood_bits().bits) == set(old.mood_bits().bits)
@@ -0,0 +1,29 @@
+# Query text -> MoodQuery: datasets are picked out word by word, "and" lists moods, unclear terms are errors.
+import pytest
+
+from mood_taxonomy import parse_query, query_resolver
+
+MOODS = ["devotional", "emotional", "energetic", "happy", "party", "patriotic", "romantic", "sad", "soothing"]
+DATASETS = ["Telugu", "Hindi"]
+
+@pytest.fixture(scope="module")
+def resolver():
+    return query_resolver(MOODS)
+
+@pytest.mark.parametrize("text,moods,exclude,datasets", [
+    ("happy or energetic, telugu only, not sad", ("energetic", "happy"), ("sad",), ("Telugu",)),
+    ("romantic hindi songs", ("romantic",), (), ("Hindi",)),
+    ("happy and energetic", ("energetic", "happy"), (), None),
+    ("sad hindi, not telugu", ("sad",), (), ("Hindi",)),
+    ("not hindi", (), (), ("Telugu",)),
+    ("hapy", ("happy",), (), None),
+    ("desh bhakti songs", ("patriotic",), (), None),
+])
+def test_parse(resolver, text, moods, exclude, datasets):
+    query = parse_query(text, DATASETS, resolver)
+    assert (query.moods, query.exclude, query.datasets) == (moods, exclude, datasets)
+
+@pytest.mark.parametrize("text,message", [("happy energetic", "Ambiguous"), ("blorp zzz", "Unknown")])
+def test_unclear_terms_raise(resolver, text, message):
+    with pytest.raises(ValueError, match=message):
+        parse_query(text, DATASETS, resolver)
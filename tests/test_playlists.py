@@ -0,0 +1,42 @@
+# A request that can't be served becomes an error record; the rest of the batch still renders.
+import json
+import os
+
+import pytest
+
+import playlists
+from catalog import build_catalog, default_sources
+from mood_index import MoodIndex
+from service import CatalogView
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+@pytest.fixture(scope="module")
+def view():
+    sources = default_sources(ROOT)
+    combined, _ = build_catalog(sources)
+    return CatalogView(MoodIndex(combined, [name for _, name in sources]))
+
+LINES = [
+    '{"id": "ok", "mood": "love", "n": 3, "seed": 7}',
+    '{"id": "inf-seed", "mood": "love", "seed": 1e400}',
+    '{"id": "inf-n", "mood": "love", "n": 1e400}',
+    '{"id": "neg-seed", "mood": "love", "seed": -1}',
+    '{"id": "frac-n", "mood": "love", "n": 2.5}',
+    '{"id": "nan-seed", "mood": "love", "seed": NaN}',
+    "not json",
+    '{"id": "last", "mood": "sad", "n": 2.0}',
+]
+
+def test_bad_requests_become_error_records(view, monkeypatch):
+    monkeypatch.setattr(playlists, "_load_view", lambda sources: view)
+    for workers in (1, 2):
+        out = [(json.loads(line), failed) for line, failed in playlists.generate(LINES, workers=workers, batch_size=3)]
+        assert [failed for _, failed in out] == [False, True, True, True, True, True, True, False]
+        assert [o.get("id") for o, _ in out] == ["ok", "inf-seed", "inf-n", "neg-seed", "frac-n", "nan-seed", None, "last"]
+        assert len(out[0][0]["songs"]) == 3 and len(out[-1][0]["songs"]) == 2
+        assert "seed" in out[1][0]["error"] and out[6][0]["line"] == 7
+
+def test_seeded_playlists_are_reproducible(view):
+    req = {"mood": "love", "n": 5, "seed": 3}
+    assert playlists.playlist(view, req) == playlists.playlist(view, dict(req))
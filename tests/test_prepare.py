@@ -0,0 +1,95 @@
+# prepare_dataset_vectorized must produce exactly what prepare_dataset does, column for column.
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from catalog import default_sources, prepare_dataset, prepare_dataset_vectorized, read_csv_try
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+LINKS = ["https://youtu.be/tflQ33g6I8I?si=ofBAPYve-PBURrNK", "tflQ33g6I8I", "www.youtube.com/watch?v=abc",
+         "HTTP://example.com/x", "not a link", "", np.nan, "nan", "bad id!",
+         "https://www.youtube.com/watch?feature=share&v=YO7rue3nKX0#t=5"]
+
+def assert_equivalent(df, name):
+    pd.testing.assert_frame_equal(prepare_dataset(df.copy(), name), prepare_dataset_vectorized(df.copy(), name))
+
+@pytest.mark.parametrize("path,name", [s for s in default_sources(ROOT) if os.path.exists(s[0])])
+def test_bundled_csvs(path, name):
+    assert_equivalent(read_csv_try(path), name)
+
+def telugu(rows=len(LINKS)):
+    return pd.DataFrame({
+        "S.No": range(1, rows + 1),
+        "Song Name": (["Kesariya", "Brahmāstra", np.nan, "", "Rock & Roll"] * rows)[:rows],
+        "Artist": (["Sid Sriram", np.nan, ""] * rows)[:rows],
+        "mood": ([" Love ", "SAD", np.nan, "happy"] * rows)[:rows],
+        "Movie": (["Jai Bhim", np.nan] * rows)[:rows],
+        "Youtube link": LINKS[:rows],
+        "Youtube link.1": ([np.nan, "tflQ33g6I8I", "https://youtube.com/shorts/tflQ33g6I8I"] * rows)[:rows],
+    })
+
+@pytest.mark.parametrize("drop", [[], ["Artist"], ["Movie"], ["Youtube link", "Youtube link.1"], ["Youtube link.1"],
+                                  ["Artist", "Movie"], ["Artist", "Movie", "Youtube link", "Youtube link.1"]])
+def test_missing_columns(drop):
+    assert_equivalent(telugu().drop(columns=drop), "Telugu")
+
+def test_missing_mood_column():
+    df = telugu().drop(columns=["mood"])
+    for prepare in (prepare_dataset, prepare_dataset_vectorized):
+        with pytest.raises(RuntimeError, match="mood column"):
+            prepare(df, "Telugu")
+
+def test_nans_everywhere():
+    df = telugu()
+    df.iloc[::2, 1:] = np.nan
+    assert_equivalent(df, "Telugu")
+
+def test_duplicate_keys():
+    # repeated titles / links and repeated link headers (read_csv names them "x", "x.1", ...)
+    df = pd.concat([telugu(), telugu()], ignore_index=True)
+    assert_equivalent(df, "Telugu")
+    hindi = pd.DataFrame({"Song Name": ["Tum Hi Ho", "Tum Hi Ho", np.nan], "Movie": ["Aashiqui 2", "Aashiqui 2", ""],
+                          "Mood": ["Romantic", "Romantic", "Sad"]})
+    assert_equivalent(hindi, "Hindi")
+
+def test_empty_frame():
+    assert_equivalent(telugu().iloc[:0], "Telugu")
+
+def test_csv_round_trip(tmp_path):
+    # what the loaders actually see: everything re-read from disk as strings / NaN
+    path = tmp_path / "telugu.csv"
+    pd.concat([telugu(), telugu()], ignore_index=True).to_csv(path, index=False)
+    assert_equivalent(read_csv_try(str(path)), "Telugu")
+
+def test_numeric_and_blank_columns(tmp_path):
+    # blank Artist / Movie columns read back as float64 NaN; numeric titles with gaps likewise
+    path = tmp_path / "hindi.csv"
+    path.write_text("Song Name,Artist,Movie,Mood\nTum Hi Ho,,,Romantic\n42,,,Sad\n,,,Happy\n0,,,Party\n", encoding="utf-8")
+    df = read_csv_try(str(path))
+    assert df["Artist"].dtype == np.float64
+    assert_equivalent(df, "Hindi")
+    assert len(prepare_dataset_vectorized(df, "Hindi")) == 4
+    numeric = pd.DataFrame({"Song Name": [1.0, np.nan, 0.0, 7.5], "Artist": [np.nan, 3, 0, np.nan], "Mood": ["a", "b", "c", "d"]})
+    assert_equivalent(numeric, "Hindi")
+
+@pytest.mark.parametrize("keys", ["", "Title,Artist,Movie"])
+def test_near_duplicates_collapse_across_datasets(tmp_path, monkeypatch, keys):
+    # case, width and spacing differences are the same song: the higher-priority dataset's row survives.
+    # Different songs (or, with more keys, the same title from another movie) are kept.
+    import catalog
+    monkeypatch.setattr(catalog, "DEDUPE_KEYS", keys)
+    telugu_csv, hindi_csv = tmp_path / "telugu.csv", tmp_path / "hindi.csv"
+    telugu_csv.write_text("Song Name,Artist,Movie,Mood\nPiya O Re Piya,Atif Aslam,Tere Naal,love\n"
+                          "Love Me Again,Sid Sriram,Ala,happy\nSrivalli,Sid Sriram,Pushpa,love\n", encoding="utf-8")
+    hindi_csv.write_text("Song Name,Artist,Movie,Mood\n  piya o re  PIYA ,atif aslam,tere naal,Romantic\n"
+                         "Ｌｏｖｅ ｍｅ ａｇａｉｎ,SID SRIRAM,ALA,Sad\nSrivalli,Javed Ali,Pushpa (Hindi),Romantic\n"
+                         "Kesariya,Arijit Singh,Brahmastra,Romantic\n", encoding="utf-8")
+    combined, fps = catalog.build_catalog([(str(telugu_csv), "Telugu"), (str(hindi_csv), "Hindi")])
+    assert len(set(fps.tolist())) == len(combined) == len(fps)
+    by_title = combined.groupby("Title")["Dataset"].apply(list).to_dict()
+    assert by_title["Piya O Re Piya"] == ["Telugu"] and by_title["Love Me Again"] == ["Telugu"]
+    assert by_title["Kesariya"] == ["Hindi"]
+    assert by_title["Srivalli"] == (["Telugu"] if not keys else ["Telugu", "Hindi"])
+    assert len(combined) == (4 if not keys else 5)
@@ -0,0 +1,66 @@
+# ResultCache: LRU by entries and by rows, TTL expiry, oversized results skipped; Recommender keys carry the
+# catalog version, so an update misses every old result.
+import time
+
+import pandas as pd
+import pytest
+
+from mood_index import MoodIndex
+from recommender import Recommender, ResultCache
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    return now
+
+def test_lru_by_entries():
+    cache = ResultCache(max_entries=2, max_rows=100, ttl=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "b" is now the least recently used
+    cache.put("c", 3)
+    assert cache.get("b") is None and cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+def test_lru_by_rows():
+    cache = ResultCache(max_entries=10, max_rows=10, ttl=60)
+    cache.put("a", "A", rows=4)
+    cache.put("b", "B", rows=4)
+    cache.put("c", "C", rows=4)
+    assert cache.get("a") is None and cache.get("b") == "B" and cache.get("c") == "C"
+    assert cache.stats()["rows"] == 8
+    # replacing a key counts its rows once
+    cache.put("c", "C2", rows=2)
+    assert cache.stats()["rows"] == 6 and cache.get("c") == "C2"
+
+def test_ttl_expiry(clock):
+    cache = ResultCache(max_entries=10, max_rows=100, ttl=5)
+    cache.put("a", 1, rows=3)
+    clock[0] += 4.9
+    assert cache.get("a") == 1
+    clock[0] += 0.2
+    assert cache.get("a") is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "evictions": 0, "entries": 0, "rows": 0, "hit_rate": 0.5}
+
+def test_result_larger_than_max_rows_is_not_cached():
+    cache = ResultCache(max_entries=10, max_rows=5, ttl=60)
+    cache.put("small", "s", rows=5)
+    cache.put("big", "b", rows=6)
+    assert cache.get("big") is None and cache.get("small") == "s"
+    assert cache.stats()["evictions"] == 0
+
+def test_version_change_misses_old_keys(monkeypatch):
+    index = MoodIndex(pd.DataFrame({"Title": ["a", "b", "c"], "mood_norm": ["love", "love", "sad"],
+                                    "Dataset": ["Telugu", "Hindi", "Telugu"]}))
+    entry = {"index": index, "version": 1}
+    cache = ResultCache(max_entries=10, max_rows=100, ttl=60)
+    engine = Recommender(watch=False, cache=cache, store="memory", service_url="")
+    monkeypatch.setattr(engine, "_entry", lambda: entry)
+    first = engine.recommend("love")
+    assert engine.recommend("love") is first and cache.stats()["hits"] == 1
+    # a catalog update (watcher append, rebuild, link re-rank) comes with a new version
+    entry = {"index": index, "version": 2}
+    again = engine.recommend("love")
+    assert again is not first and again[0].equals(first[0])
+    assert cache.stats()["misses"] == 2
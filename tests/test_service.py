@@ -0,0 +1,42 @@
+# The HTTP layer: malformed requests get an error response rather than a dropped connection.
+import asyncio
+import json
+import os
+
+import pytest
+
+import service
+from catalog import build_catalog, default_sources
+from mood_index import MoodIndex
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+@pytest.fixture(scope="module")
+def index():
+    sources = default_sources(ROOT)
+    combined, _ = build_catalog(sources)
+    return MoodIndex(combined, [name for _, name in sources])
+
+def exchange(index, raw):
+    # one connection to a fresh server: send raw, read until the server closes it
+    async def run():
+        server = await asyncio.start_server(lambda r, w: service._serve_connection([service.CatalogView(index)], r, w),
+                                            "127.0.0.1", 0)
+        reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+        writer.write(raw)
+        data = await asyncio.wait_for(reader.read(), 5)
+        writer.close()
+        server.close()
+        return data
+    head, _, body = asyncio.run(run()).partition(b"\r\n\r\n")
+    return int(head.split()[1]), head.decode("latin1"), body
+
+@pytest.mark.parametrize("length", [b"abc", b"-5", b"1e3"])
+def test_bad_content_length_is_400(index, length):
+    status, head, body = exchange(index, b"POST /recommend/batch HTTP/1.1\r\nContent-Length: " + length + b"\r\n\r\n{}")
+    assert status == 400 and "Connection: close" in head
+    assert "Content-Length" in json.loads(body)["error"]
+
+def test_good_request_still_served(index):
+    status, _, body = exchange(index, b"GET /recommend?mood=love&n=2 HTTP/1.1\r\nConnection: close\r\n\r\n")
+    assert status == 200 and len(json.loads(body)["songs"]) == 2
@@ -0,0 +1,31 @@
+# A catalog that only appended rows keeps its neighbor index: old rows as they were, new rows as a full build.
+import os
+
+import numpy as np
+
+from catalog import build_catalog, default_sources
+from similarity import SimilarityIndex, more_like_this
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+def test_extended_then_completed_matches_build():
+    combined, fps = build_catalog(default_sources(ROOT))
+    start = len(combined) - 7
+    old = SimilarityIndex.build(combined.iloc[:start].reset_index(drop=True), fps[:start])
+    pending = old.extended(fps)
+    assert pending.complete == start and (pending.neighbors[start:] == -1).all()
+    assert pending.row_of(fps[-1]) == len(fps) - 1
+    done = pending.completed(combined)
+    full = SimilarityIndex.build(combined, fps)
+    assert done.complete == len(fps)
+    assert np.array_equal(done.neighbors[:start], old.neighbors)
+    assert np.array_equal(done.neighbors[start:], full.neighbors[start:])
+    assert np.allclose(done.scores[start:], full.scores[start:])
+
+def test_pending_rows_top_up_by_mood():
+    from mood_index import MoodIndex
+    combined, fps = build_catalog(default_sources(ROOT))
+    index = MoodIndex(combined)
+    rows = more_like_this(index, SimilarityIndex.pending(fps), 0, n=5)
+    assert len(rows) == 5 and 0 not in rows
+    assert (combined["mood_norm"].take(rows) == combined["mood_norm"].iloc[0]).all()
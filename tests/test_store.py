@@ -0,0 +1,60 @@
+# The SQLite store answers like the in-memory index: compound queries and "more like this", page by page.
+import os
+import sqlite3
+import threading
+
+import pytest
+
+from catalog import build_catalog, default_sources
+from catalog_store import SqliteStore, build_store
+from mood_index import MoodIndex
+from mood_taxonomy import mood_query
+from similarity import SimilarityIndex, more_like_this
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+@pytest.fixture(scope="module")
+def built(tmp_path_factory):
+    sources = default_sources(ROOT)
+    path = str(tmp_path_factory.mktemp("store") / "store.sqlite")
+    build_store(sources, path)
+    combined, fps = build_catalog(sources)
+    return SqliteStore(path), MoodIndex(combined, [n for _, n in sources]), fps
+
+@pytest.mark.parametrize("query", [
+    mood_query(["happy", "energetic"], ["sad"], ["Telugu"]),
+    mood_query(["romantic"]),
+    mood_query(["romantic", "sad"], [], ["Hindi", "Telugu"]),
+    mood_query([], ["romantic", "happy"]),
+    mood_query([], [], ["Hindi"]),
+    mood_query(["no such mood"]),
+    mood_query(),
+])
+def test_recommend_query_matches_index(built, query):
+    store, index, _ = built
+    for n, offset in [(None, 0), (7, 0), (5, 3), (10, 40)]:
+        want, total = index.recommend_query(query, n, offset)
+        got, count = store.recommend_query(query, n, offset)
+        assert count == total
+        assert got.equals(want.astype("str"))
+
+def test_similar_matches_catalog(built):
+    store, index, fps = built
+    sim = SimilarityIndex.build(index.combined, fps)
+    for row in (0, 5, len(fps) - 1):
+        song = index.combined.iloc[row].to_dict()
+        want = index.combined.take(more_like_this(index, sim, row, 8)).reset_index(drop=True)
+        assert store.similar(song, 8, wait=True).equals(want.astype("str"))
+    assert store.similar({"Title": "no such song"}, 8).empty
+
+def test_close_releases_every_thread(built):
+    store = SqliteStore(built[0].path)
+    conns = []
+    for _ in range(2):
+        t = threading.Thread(target=lambda: conns.append(store._conn()))
+        t.start()
+        t.join()
+    store.close()
+    for conn in conns:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
@@ -0,0 +1,151 @@
+import queue
+import threading
+from tkinter import ttk
+
+# ---------- Row materialization ----------
+def table_rows(df, start, stop):
+    # fill_table's row tuples for df[start:stop] only (numbered from 1); links were resolved at catalog build
+    return page_rows(df.iloc[start:stop], start)
+
+def page_rows(page, start):
+    # row tuples for a page that was fetched on its own (recommend(..., n, offset=start)), numbered from start + 1
+    cols = [page[c] for c in ("Title", "Artist", "Movie", "Mood", "Dataset", "Link")]
+    return list(zip(range(start + 1, start + 1 + len(page)), *cols))
+
+# ---------- Virtualized Treeview ----------
+class VirtualTable:
+    # A Treeview that only ever holds the rows on screen. The scrollbar drives a virtual offset into
+    # `total` rows; rows are pulled from rows_fn(start, stop) with `buffer` extra rows cached on each side,
+    # so scrolling a 100K-row result touches a few dozen rows at a time.
+
+    def __init__(self, parent, columns, buffer=50):
+        self.frame = ttk.Frame(parent)
+        self.tree = ttk.Treeview(self.frame, columns=columns, show="headings")
+        for c in columns:
+            self.tree.heading(c, text=c)
+        self.vsb = ttk.Scrollbar(self.frame, orient="vertical", command=self._on_scrollbar)
+        self.hsb = ttk.Scrollbar(self.frame, orient="horizontal", command=self.tree.xview)
+        self.tree.configure(xscrollcommand=self.hsb.set)
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.vsb.grid(row=0, column=1, sticky="ns")
+        self.hsb.grid(row=1, column=0, sticky="ew")
+        self.frame.rowconfigure(0, weight=1)
+        self.frame.columnconfigure(0, weight=1)
+        self.buffer = buffer
+        self.total = 0
+        self.offset = 0
+        self.rows_fn = None
+        self.cache_start = 0
+        self.cache = []
+        self.tree.bind("<Configure>", lambda e: self._render())
+        self.tree.bind("<MouseWheel>", lambda e: self.scroll(-1 if e.delta > 0 else 1, "units"))
+        self.tree.bind("<Button-4>", lambda e: self.scroll(-1, "units"))
+        self.tree.bind("<Button-5>", lambda e: self.scroll(1, "units"))
+        self.tree.bind("<Prior>", lambda e: self.scroll(-1, "pages"))
+        self.tree.bind("<Next>", lambda e: self.scroll(1, "pages"))
+
+    def set_rows(self, total, rows_fn):
+        self.total = total
+        self.rows_fn = rows_fn
+        self.offset = 0
+        self.cache = []
+        self._render()
+
+    def visible_count(self):
+        height = self.tree.winfo_height()
+        row_h = int(ttk.Style(self.tree).lookup("Treeview", "rowheight") or 20)
+        # before the first layout winfo_height is 1; fall back to the widget's requested height
+        rows = (height // row_h) - 1 if height > row_h else int(self.tree.cget("height"))
+        return max(1, rows)
+
+    def scroll(self, n, what):
+        step = self.visible_count() if what == "pages" else 1
+        self._move_to(self.offset + int(n) * step)
+        return "break"
+
+    def _on_scrollbar(self, *args):
+        if args[0] == "moveto":
+            self._move_to(int(float(args[1]) * self.total))
+        elif args[0] == "scroll":
+            self.scroll(args[1], args[2])
+
+    def _move_to(self, offset):
+        offset = max(0, min(offset, max(0, self.total - self.visible_count())))
+        if offset != self.offset:
+            self.offset = offset
+            # items are reused for other rows, so a selection would silently move to a different song
+            self.tree.selection_remove(*self.tree.selection())
+            self._render()
+
+    def selected_row(self):
+        # the row tuple (as rows_fn returned it) behind the first selected item, or None; it is on screen, so
+        # it comes from the cache rather than a new fetch
+        sel = self.tree.selection()
+        if not sel:
+            return None
+        i = self.offset + self.tree.index(sel[0]) - self.cache_start
+        return self.cache[i] if 0 <= i < len(self.cache) else None
+
+    def _rows(self, start, stop):
+        if not (self.cache_start <= start and stop <= self.cache_start + len(self.cache)):
+            self.cache_start = max(0, start - self.buffer)
+            self.cache = self.rows_fn(self.cache_start, min(self.total, stop + self.buffer)) if self.rows_fn else []
+        return self.cache[start - self.cache_start:stop - self.cache_start]
+
+    def _render(self):
+        count = min(self.visible_count(), max(0, self.total - self.offset))
+        rows = self._rows(self.offset, self.offset + count)
+        items = self.tree.get_children()
+        # reuse the existing items; only create/delete the difference
+        for iid, values in zip(items, rows):
+            self.tree.item(iid, values=values)
+        for values in rows[len(items):]:
+            self.tree.insert("", "end", values=values)
+        if len(items) > len(rows):
+            self.tree.delete(*items[len(rows):])
+        if self.total:
+            self.vsb.set(self.offset / self.total, (self.offset + count) / self.total)
+        else:
+            self.vsb.set(0, 1)
+
+# ---------- Background queries ----------
+class BackgroundQuery:
+    # runs fn() on a worker thread and hands the result (or exception) to on_done on the Tk thread;
+    # a newer submit() supersedes any query still in flight
+    POLL_MS = 30
+
+    def __init__(self, widget):
+        self.widget = widget
+        self.results = queue.Queue()
+        self.generation = 0
+        self.pending = False
+        self.polling = False
+
+    def submit(self, fn, on_done):
+        self.generation += 1
+        gen = self.generation
+        self.pending = True
+
+        def work():
+            try:
+                self.results.put((gen, on_done, fn(), None))
+            except Exception as e:
+                self.results.put((gen, on_done, None, e))
+        threading.Thread(target=work, daemon=True).start()
+        if not self.polling:
+            self.polling = True
+            self.widget.after(self.POLL_MS, self._poll)
+
+    def _poll(self):
+        while True:
+            try:
+                gen, on_done, result, error = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if gen == self.generation:
+                self.pending = False
+                on_done(result, error)
+        if self.pending:
+            self.widget.after(self.POLL_MS, self._poll)
+        else:
+            self.polling = False